@@ -1,16 +1,27 @@
-from flask import Flask, request, render_template
-from src.pipline.prediction_pipeline import PredictionPipeline
+import os
+import threading
+from flask import Flask, request, render_template, jsonify
+
+from src.utils.recovery_strategy import assign_recovery_strategy
 
 app = Flask(__name__)
 
-# Risk strategy logic
-def assign_recovery_strategy(risk_score):
-    if risk_score > 0.75:
-        return "Immediate legal notices & aggressive recovery attempts"
-    elif 0.50 <= risk_score <= 0.75:
-        return "Settlement offers & repayment plans"
-    else:
-        return "Automated reminders & monitoring"
+# The prediction pipeline (pandas, joblib, sklearn and the pickled artifacts) is
+# imported and loaded on first use so the worker binds its port immediately.
+_prediction_pipeline = None
+_pipeline_lock = threading.Lock()
+
+MAX_SIMILAR_CASES = int(os.getenv("MAX_SIMILAR_CASES", "100"))  # per /similar_cases request
+
+
+def get_prediction_pipeline():
+    global _prediction_pipeline
+    if _prediction_pipeline is None:
+        with _pipeline_lock:
+            if _prediction_pipeline is None:
+                from src.pipline.prediction_pipeline import PredictionPipeline
+                _prediction_pipeline = PredictionPipeline()
+    return _prediction_pipeline
 
 
 @app.route('/')
@@ -47,18 +58,81 @@ def predict():
             "Collection_Method": safe_get("Collection_Method"),
             "Legal_Action_Taken": safe_get("Legal_Action_Taken")
         }
+        # Optional: selects the per-loan-type model when one was trained.
+        if request.form.get("Loan_Type"):
+            input_data["Loan_Type"] = request.form["Loan_Type"]
 
         # Run prediction
-        pipeline = PredictionPipeline()
+        pipeline = get_prediction_pipeline()
         result = pipeline.predict(input_data)
         result["Recovery_Strategy"] = assign_recovery_strategy(result["Risk_Score"])
 
+        # Opt-in: explanations cost more than the prediction itself.
+        if request.form.get("explain") or request.args.get("explain"):
+            result.update(pipeline.top_contributors(input_data, int(request.args.get("top", 5))))
+
         return render_template("index.html", prediction=result)
 
     except Exception as e:
         return render_template("index.html", error=str(e))
 
 
+@app.route('/similar_cases', methods=['POST'])
+def similar_cases():
+    try:
+        input_data = request.get_json(silent=True) or request.form.to_dict()
+        k = int(request.args.get("k", input_data.pop("k", 5)))
+        if not 1 <= k <= MAX_SIMILAR_CASES:
+            raise ValueError(f"k must be between 1 and {MAX_SIMILAR_CASES}, got {k}")
+        cases = get_prediction_pipeline().similar_cases(input_data, k)
+        return jsonify({"k": k, "cases": cases})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/scenarios', methods=['POST'])
+def scenarios():
+    try:
+        payload = request.get_json(force=True)
+        results = get_prediction_pipeline().score_scenarios(
+            payload["loan"], grid=payload.get("grid"), scenarios=payload.get("scenarios")
+        )
+        return jsonify({"n_scenarios": len(results), "scenarios": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/allocate', methods=['POST'])
+def allocate():
+    try:
+        import pandas as pd
+
+        payload = request.get_json(force=True)
+        allocation_df, summary = get_prediction_pipeline().allocate_portfolio(
+            pd.DataFrame(payload["loans"]), payload.get("capacity", {}), method=payload.get("method", "price")
+        )
+        return jsonify({"summary": summary, "loans": allocation_df.to_dict(orient="records")})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/portfolio/summary', methods=['GET'])
+def portfolio_summary():
+    # Served from running totals (the rescoring worker's snapshot when present); never rescores.
+    try:
+        by = request.args.get("by")
+        return jsonify(get_prediction_pipeline().portfolio_summary(by.split(",") if by else None))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/drift', methods=['GET'])
+def drift():
+    monitor = get_prediction_pipeline().drift_monitor
+    if monitor is None:
+        return jsonify({"error": "No drift reference found for the loaded model"}), 404
+    return jsonify(monitor.report())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
-
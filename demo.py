@@ -1,14 +1,31 @@
 from src.pipline.training_pipeline import TrainPipeline
 from src.logger import logging
 from src.exception import USvisaException
-import sys, time
+import sys, time, argparse
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the loan recovery training pipeline.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage time and memory into artifact/<ts>/profiling/")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Also dump a cProfile .prof file per stage")
+    parser.add_argument("--resume", metavar="ARTIFACT_DIR", default=None,
+                        help="Continue an earlier run (e.g. artifact/<ts>) from its first incomplete stage")
+    parser.add_argument("--max-workers", type=int, default=2,
+                        help="Threads for running independent stages concurrently (1 = sequential)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Train out-of-core, processing at most this many rows at a time")
+    parser.add_argument("--loan-type-models", action="store_true",
+                        help="Also train one model per Loan_Type for routed serving")
+    args = parser.parse_args()
+
     try:
         start = time.time()
         logging.info("🚦 Starting test pipeline...")
 
-        pipeline = TrainPipeline()
+        pipeline = TrainPipeline(profile=args.profile, cprofile=args.cprofile, resume_dir=args.resume,
+                                 max_workers=args.max_workers, chunk_size=args.chunk_size,
+                                 loan_type_models=args.loan_type_models)
         pipeline.run_pipeline()
 
         end = time.time()
@@ -0,0 +1,152 @@
+"""
+Load time and memory of the model in the memory-mapped artifact format against joblib.
+
+K worker processes load the same model at once and, while all of them hold it,
+each reports its load time, RSS growth and its proportional (PSS) and private
+(USS) memory from ``/proc/self/smaps_rollup``. Mapped node arrays live in the
+shared page cache, so their PSS is split between the workers; joblib copies
+every tree into private memory in each one.
+
+    python -m src.benchmark.artifact_bench --artifact-dir artifact/<ts> --processes 4
+    python -m src.benchmark.artifact_bench --synthetic-estimators 300 --synthetic-depth 14
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+FORMATS = ("joblib", "mapped")
+
+
+def smaps_rollup_mb() -> dict:
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {"pss_mb": fields.get("Pss", 0.0),
+            "uss_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)}
+
+
+def probe(artifact_format: str, model_path: str) -> None:
+    """
+    Worker process: load, report readiness, wait until every worker has loaded, then report memory.
+    """
+    import joblib
+    import numpy as np
+    import sklearn.ensemble  # noqa: F401  (import cost is not load cost)
+    from src.utils.mapped_artifact import load_mapped_model, mapped_artifact_path
+    from src.utils.profiling import current_rss_bytes
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    if artifact_format == "mapped":
+        model = load_mapped_model(mapped_artifact_path(model_path))
+    else:
+        model = joblib.load(model_path)
+    # One prediction touches every tree, as a serving worker's first request would.
+    model.predict_proba(np.zeros((1, model.n_features_in_), dtype=np.float32))
+    load_s = time.perf_counter() - start
+
+    print("ready", flush=True)
+    sys.stdin.readline()
+    print(json.dumps({"load_ms": load_s * 1000, "rss_growth_mb": (current_rss_bytes() - rss_before) / 2**20,
+                      **smaps_rollup_mb()}), flush=True)
+
+
+def bench_format(artifact_format: str, model_path: str, n_processes: int) -> dict:
+    import numpy as np
+
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "src.benchmark.artifact_bench", "--probe", artifact_format,
+                          "--model-path", model_path],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(n_processes)
+    ]
+    for worker in workers:
+        if worker.stdout.readline().strip() != "ready":
+            raise RuntimeError(f"{artifact_format} probe failed to load {model_path}")
+    for worker in workers:
+        worker.stdin.write("go\n")
+        worker.stdin.flush()
+    reports = [json.loads(worker.stdout.readline()) for worker in workers]
+    for worker in workers:
+        worker.wait()
+
+    summary = {key: float(np.mean([report[key] for report in reports])) for key in reports[0]}
+    if "pss_mb" in summary:
+        summary["total_pss_mb"] = float(sum(report["pss_mb"] for report in reports))
+    return summary
+
+
+def synthetic_model(work_dir: str, n_estimators: int, max_depth: int, n_features: int = 40) -> str:
+    """
+    A forest larger than the demo model, saved in both formats.
+    """
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from src.utils.mapped_artifact import mapped_artifact_path, save_mapped_model
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((50_000, n_features)).astype(np.float32)
+    y = (X[:, :5].sum(axis=1) + rng.standard_normal(len(X)) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, n_jobs=-1, random_state=0).fit(X, y)
+    model_path = os.path.join(work_dir, "synthetic_forest.pkl")
+    joblib.dump(model, model_path)
+    save_mapped_model(mapped_artifact_path(model_path), model)
+    return model_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare mapped and joblib model artifacts.")
+    parser.add_argument("--artifact-dir", default=None, help="Model run (artifact/<ts>); defaults to the latest")
+    parser.add_argument("--synthetic-estimators", type=int, default=None,
+                        help="Benchmark a freshly trained synthetic forest of this size instead")
+    parser.add_argument("--synthetic-depth", type=int, default=14)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--probe", choices=FORMATS, help=argparse.SUPPRESS)
+    parser.add_argument("--model-path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        return probe(args.probe, args.model_path)
+
+    with tempfile.TemporaryDirectory(prefix="artifact_bench_") as work_dir:
+        if args.synthetic_estimators:
+            model_path = synthetic_model(work_dir, args.synthetic_estimators, args.synthetic_depth)
+        else:
+            from src.pipline.prediction_pipeline import get_latest_artifact_path
+            model_dir = (os.path.join(args.artifact_dir, "model_trainer") if args.artifact_dir
+                         else get_latest_artifact_path("model_trainer"))
+            model_path = os.path.join(model_dir, "risk_classifier.pkl")
+
+        from src.utils.mapped_artifact import mapped_artifact_path
+        results = {
+            "model_path": model_path,
+            "joblib_file_mb": os.path.getsize(model_path) / 2**20,
+            "mapped_file_mb": os.path.getsize(mapped_artifact_path(model_path)) / 2**20,
+            "processes": args.processes,
+            "formats": {fmt: bench_format(fmt, model_path, args.processes) for fmt in FORMATS},
+        }
+
+    for fmt, summary in results["formats"].items():
+        print(f"{fmt:>7}: load {summary['load_ms']:.1f} ms, RSS +{summary['rss_growth_mb']:.1f} MB, "
+              f"USS {summary.get('uss_mb', 0):.1f} MB, total PSS {summary.get('total_pss_mb', 0):.1f} MB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
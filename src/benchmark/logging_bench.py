@@ -0,0 +1,128 @@
+"""
+``/predict`` latency with file logging on a slow disk, before and after the
+queue-based logging setup in ``src.logger``.
+
+A slow disk is simulated by a ``FileHandler`` that sleeps after every flush.
+Requests go through the Flask test client, so the measurement covers form
+parsing, prediction and every log record written on the request path:
+
+- ``sync``: the handler is attached to the root logger directly (the former
+  ``logging.basicConfig(filename=...)`` setup), so each request waits for the disk.
+- ``queue``: records are enqueued and written by the listener thread.
+- ``queue_sampled``: as ``queue``, with ``prediction_pipeline`` INFO records sampled at 1%.
+
+    python -m src.benchmark.logging_bench --artifact-dir artifact/<ts> --disk-latency-ms 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import src.logger as src_logger
+
+FORM_FIELDS = (
+    "Age", "Gender", "Employment_Type", "Monthly_Income", "Num_Dependents", "Loan_Amount",
+    "Loan_Tenure", "Interest_Rate", "Collateral_Value", "Outstanding_Loan_Amount", "Monthly_EMI",
+    "Payment_History", "Num_Missed_Payments", "Days_Past_Due", "Collection_Attempts",
+    "Collection_Method", "Legal_Action_Taken",
+)
+# Rendered by templates/index.html only for a successful prediction.
+PREDICT_SUCCESS_MARKER = b"Risk Score:"
+MODES = ("sync", "queue", "queue_sampled")
+
+
+class SlowFileHandler(logging.FileHandler):
+    """
+    A ``FileHandler`` whose every flush takes ``latency_s`` longer, like a busy or network disk.
+    """
+
+    def __init__(self, file_path: str, latency_s: float):
+        super().__init__(file_path, mode="a")
+        self.latency_s = latency_s
+        self.setFormatter(logging.Formatter(src_logger.LOG_FORMAT))
+
+    def flush(self) -> None:
+        super().flush()
+        time.sleep(self.latency_s)
+
+
+def configure(mode: str, file_path: str, latency_s: float):
+    """
+    Install the logging setup for ``mode`` in place of the root logger's handlers
+    (the default listener then idles); returns the listener to stop afterwards, if any.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    src_logger.module_filter.sample_rates.pop("prediction_pipeline", None)
+
+    handler = SlowFileHandler(file_path, latency_s)
+    if mode == "sync":
+        root.addHandler(handler)
+        return None
+    if mode == "queue_sampled":
+        src_logger.module_filter.set_sample_rate("prediction_pipeline", 0.01)
+    return src_logger.start_queue_logging(handler)
+
+
+def bench_mode(client, forms: list, mode: str, file_path: str, latency_s: float) -> dict:
+    from src.benchmark.pipeline_bench import percentiles_ms
+
+    listener = configure(mode, file_path, latency_s)
+    try:
+        for form in forms[:10]:
+            client.post("/predict", data=form)
+        latencies, errors = [], 0
+        for form in forms:
+            start = time.perf_counter()
+            response = client.post("/predict", data=form)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200 or PREDICT_SUCCESS_MARKER not in response.data
+    finally:
+        if listener is not None:
+            listener.stop()
+    return {"latency_ms": percentiles_ms(latencies), "requests": len(latencies), "errors": int(errors)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /predict latency under slow-disk file logging.")
+    parser.add_argument("--artifact-dir", default=None, help="Model run (artifact/<ts>); defaults to the latest")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--disk-latency-ms", type=float, default=5.0)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    import app
+    from src.data_access.synthetic_data import SyntheticLoanDataGenerator
+    from src.pipline.prediction_pipeline import PredictionPipeline
+
+    app._prediction_pipeline = PredictionPipeline(artifact_dir=args.artifact_dir, audit_dir="")
+    client = app.app.test_client()
+    records = SyntheticLoanDataGenerator(seed=args.seed).generate(args.requests, start_index=10**9)
+    forms = [{field: str(record[field]) for field in FORM_FIELDS} for record in records.to_dict("records")]
+
+    # One untimed pass so the first mode measured is not also paying for warm-up.
+    for form in forms:
+        client.post("/predict", data=form)
+
+    latency_s = args.disk_latency_ms / 1000
+    results = {"disk_latency_ms": args.disk_latency_ms, "modes": {}}
+    with tempfile.TemporaryDirectory(prefix="logging_bench_") as tmp_dir:
+        for mode in args.modes.split(","):
+            results["modes"][mode] = bench_mode(client, forms, mode, os.path.join(tmp_dir, f"{mode}.log"), latency_s)
+            print(f"{mode:>14}: p50 {results['modes'][mode]['latency_ms']['p50']:.2f} ms, "
+                  f"p99 {results['modes'][mode]['latency_ms']['p99']:.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
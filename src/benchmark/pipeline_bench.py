@@ -0,0 +1,386 @@
+"""
+Reproducible benchmark for the training pipeline and the prediction paths.
+
+For every requested scale a synthetic loan book (same schema as loan.csv) is
+loaded into the file-backed ``local://`` Mongo stand-in, ``TrainPipeline`` runs stage by stage
+against a throwaway artifact directory and a local sqlite MLflow store, and the
+resulting model is used to measure single-row ``PredictionPipeline.predict``
+latency and ``predict_batch`` throughput. It also reports how much memory the
+schema dtype policy saves per stage compared with pandas/numpy defaults.
+Nothing touches the network.
+
+    python -m src.benchmark.pipeline_bench --scales 1k,100k --output bench.json
+    python -m src.benchmark.pipeline_bench --scales 1k --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCALE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1] in SCALE_SUFFIXES:
+        return int(float(value[:-1]) * SCALE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def measure(fn, use_tracemalloc: bool = False):
+    """
+    Run ``fn`` and return ``(result, metrics)`` with wall/CPU seconds and peak memory.
+    """
+    from src.utils.profiling import PeakMemorySampler
+
+    with PeakMemorySampler(use_tracemalloc=use_tracemalloc) as sampler:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = fn()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    metrics = {
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_rss_mb": sampler.peak_rss / 2**20,
+        "rss_growth_mb": (sampler.peak_rss - sampler.start_rss) / 2**20,
+    }
+    if sampler.peak_traced is not None:
+        metrics["peak_traced_mb"] = sampler.peak_traced / 2**20
+    return result, metrics
+
+
+def percentiles_ms(samples: list) -> dict:
+    import numpy as np
+    values = np.asarray(samples) * 1000
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+    }
+
+
+def bench_training(n_rows: int, work_dir: str, seed: int, use_tracemalloc: bool) -> tuple:
+    import mlflow
+    from src.configuration.mongo_db_connection import MongoDBClient
+    from src.constants import MLFLOW_EXPERIMENT_NAME, DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME
+    from src.data_access.synthetic_data import SyntheticLoanDataGenerator
+    from src.entity.config_entity import TrainingPipelineConfig
+    from src.pipline.training_pipeline import TrainPipeline
+
+    # Loading the stand-in collection is set-up, not part of the measured pipeline.
+    client = MongoDBClient().client
+    collection = client[DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+    collection.drop()
+    SyntheticLoanDataGenerator(seed=seed).load_into_collection(collection, n_rows)
+
+    if mlflow.get_experiment_by_name(MLFLOW_EXPERIMENT_NAME) is None:
+        mlflow.create_experiment(MLFLOW_EXPERIMENT_NAME, artifact_location=os.path.join(work_dir, "mlruns"))
+
+    artifact_dir = os.path.join(work_dir, "artifact", f"rows_{n_rows}")
+    pipeline = TrainPipeline(TrainingPipelineConfig(artifact_dir=artifact_dir, timestamp=f"rows_{n_rows}"))
+
+    stages = {}
+    with mlflow.start_run(run_name=f"benchmark_{n_rows}"):
+        ingestion, stages["data_ingestion"] = measure(pipeline.start_data_ingestion, use_tracemalloc)
+        validation, stages["data_validation"] = measure(
+            lambda: pipeline.start_data_validation(ingestion), use_tracemalloc)
+        if not validation.validation_status:
+            raise RuntimeError(f"Synthetic data failed validation: {validation.message}")
+        transformation, stages["data_transformation"] = measure(
+            lambda: pipeline.start_data_transformation(ingestion), use_tracemalloc)
+        pipeline.model_trainer_config.transformed_train_file_path = transformation.transformed_train_file_path
+        trainer, stages["model_trainer"] = measure(pipeline.start_model_training, use_tracemalloc)
+        _, stages["model_evaluation"] = measure(
+            lambda: pipeline.start_model_evaluation(trainer, transformation), use_tracemalloc)
+
+    collection.drop()
+    return artifact_dir, stages
+
+
+def bench_dtype_memory(artifact_dir: str) -> dict:
+    """
+    Memory of each stage's main in-memory object with default dtypes versus the
+    compact ``DtypePolicy`` ones, using the files the benchmarked run produced.
+    """
+    import numpy as np
+    import pandas as pd
+    from src.entity.config_entity import DataIngestionConfig, DataTransformationConfig, TrainingPipelineConfig
+    from src.utils.dtype_policy import DtypePolicy, frame_memory_mb
+
+    policy = DtypePolicy.from_schema()
+    config = TrainingPipelineConfig(artifact_dir=artifact_dir, timestamp=os.path.basename(artifact_dir))
+    feature_store_path = DataIngestionConfig(config).feature_store_file_path
+    train_path = DataTransformationConfig(config).transformed_train_file_path
+
+    def entry(default_mb: float, compact_mb: float) -> dict:
+        return {"default_mb": default_mb, "compact_mb": compact_mb, "saved_mb": default_mb - compact_mb}
+
+    # Ingestion exports, and validation/transformation read back, the whole loan book.
+    frame = entry(
+        frame_memory_mb(pd.read_csv(feature_store_path)),
+        frame_memory_mb(policy.apply(pd.read_csv(feature_store_path, dtype=policy.read_csv_dtypes())))
+    )
+
+    # Training: the transformed matrix (written as MODEL_INPUT_DTYPE; float64 is the default).
+    train = np.load(train_path, mmap_mode="r")
+    float64_mb = train.size * np.dtype(np.float64).itemsize / 2**20
+
+    return {
+        "data_ingestion": frame,
+        "data_validation": frame,
+        "data_transformation": frame,
+        "model_trainer": entry(float64_mb, train.nbytes / 2**20),
+    }
+
+
+def bench_prediction(artifact_dir: str, seed: int, n_single: int, batch_size: int, n_batches: int) -> dict:
+    from src.data_access.synthetic_data import SyntheticLoanDataGenerator
+    from src.pipline.prediction_pipeline import PredictionPipeline
+
+    audit_dir = os.path.join(os.path.dirname(os.path.dirname(artifact_dir)), "audit")
+    pipeline, load_metrics = measure(lambda: PredictionPipeline(artifact_dir=artifact_dir, audit_dir=audit_dir))
+
+    # Held-out rows: IDs past anything used for training.
+    requests_df = SyntheticLoanDataGenerator(seed=seed + 1).generate(max(n_single, batch_size), start_index=10**9)
+    records = requests_df.head(n_single).to_dict("records")
+
+    for record in records[:10]:
+        pipeline.predict(record)
+
+    latencies = []
+    for record in records:
+        start = time.perf_counter()
+        pipeline.predict(record)
+        latencies.append(time.perf_counter() - start)
+
+    batch_df = requests_df.head(batch_size)
+    pipeline.predict_batch(batch_df)
+    batch_times = []
+    for _ in range(n_batches):
+        start = time.perf_counter()
+        pipeline.predict_batch(batch_df)
+        batch_times.append(time.perf_counter() - start)
+
+    best = min(batch_times)
+    results = {
+        "load": load_metrics,
+        "single_row_latency_ms": percentiles_ms(latencies),
+        "single_row_requests": len(latencies),
+        "batch_size": batch_size,
+        "batch_latency_ms": percentiles_ms(batch_times),
+        "batch_throughput_rows_per_s": batch_size / best,
+    }
+    if os.path.exists(pipeline.similar_cases_path):
+        pipeline.similar_cases(records[0])
+        lookups = []
+        for record in records:
+            start = time.perf_counter()
+            pipeline.similar_cases(record, k=5)
+            lookups.append(time.perf_counter() - start)
+        results["similar_cases_latency_ms"] = percentiles_ms(lookups)
+    if pipeline.drift_monitor is not None:
+        results["drift_overhead"] = bench_drift_overhead(pipeline, records, batch_df)
+    results["portfolio_overhead"] = bench_portfolio_overhead(pipeline, records, batch_df)
+    results["allocation"] = bench_allocation(pipeline, batch_df)
+    pipeline.explain(batch_df.head(10))
+    start = time.perf_counter()
+    pipeline.explain(batch_df)
+    results["explain_batch_ms"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def bench_portfolio_overhead(pipeline, records: list, batch_df) -> dict:
+    """
+    Cost of updating the portfolio aggregates, per single request and per batch
+    row (every loan is already known, so each update is a rescore), and of a summary.
+    """
+    portfolio = pipeline.portfolio
+    results = [pipeline.predict(record) for record in records]
+    batch_result = pipeline.predict_batch(batch_df)
+
+    start = time.perf_counter()
+    for record, result in zip(records, results):
+        portfolio.observe_record(record, result)
+    per_record = (time.perf_counter() - start) / len(records)
+
+    start = time.perf_counter()
+    portfolio.observe_batch(batch_df, batch_result)
+    per_batch_row = (time.perf_counter() - start) / len(batch_df)
+
+    start = time.perf_counter()
+    portfolio.summary()
+    return {
+        "observe_record_us": per_record * 1e6,
+        "observe_batch_row_us": per_batch_row * 1e6,
+        "summary_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def bench_allocation(pipeline, batch_df) -> dict:
+    """
+    Capacity-aware strategy allocation of the scored batch, with legal and
+    settlement capacity for 5% and 15% of it.
+    """
+    scored_df = batch_df.assign(Risk_Score=pipeline.predict_batch(batch_df)["Risk_Score"].to_numpy())
+    capacity = {"legal": len(batch_df) // 20, "settlement": 3 * len(batch_df) // 20}
+    start = time.perf_counter()
+    _, summary = pipeline.allocate_portfolio(scored_df, capacity)
+    elapsed = time.perf_counter() - start
+    return {
+        "allocate_ms": elapsed * 1000,
+        "expected_recovery": summary["expected_recovery"],
+        "threshold_rule_expected_recovery": summary["threshold_rule_expected_recovery"],
+    }
+
+
+def bench_drift_overhead(pipeline, records: list, batch_df) -> dict:
+    """
+    Cost of updating the drift sketches, per single request and per batch row.
+    """
+    monitor = pipeline.drift_monitor
+    results = [pipeline.predict(record) for record in records]
+    batch_result = pipeline.predict_batch(batch_df)
+
+    start = time.perf_counter()
+    for record, result in zip(records, results):
+        monitor.observe_record(record, result)
+    per_record = (time.perf_counter() - start) / len(records)
+
+    start = time.perf_counter()
+    monitor.observe_batch(batch_df, batch_result)
+    per_batch_row = (time.perf_counter() - start) / len(batch_df)
+
+    return {
+        "observe_record_us": per_record * 1e6,
+        "observe_batch_row_us": per_batch_row * 1e6,
+        "n_features": len(monitor.feature_columns),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def flatten_metrics(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+# Metrics where a larger value is an improvement; everything else is lower-is-better.
+HIGHER_IS_BETTER = ("throughput",)
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return ``(metric, baseline, current, relative_change, is_regression)`` rows
+    for the timing and memory metrics present in both result files.
+    """
+    rows = []
+    cur = flatten_metrics(current["results"])
+    base = flatten_metrics(baseline["results"])
+    for name in sorted(set(cur) & set(base)):
+        if not any(token in name for token in ("_s", "_ms", "_mb", "throughput")) or base[name] == 0:
+            continue
+        change = (cur[name] - base[name]) / base[name]
+        worse = -change if any(token in name for token in HIGHER_IS_BETTER) else change
+        rows.append((name, base[name], cur[name], change, worse > threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TrainPipeline stages and PredictionPipeline paths.")
+    parser.add_argument("--scales", default="1k,100k",
+                        help="Comma separated row counts, e.g. 1k,100k,1m,10m")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--single-requests", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also record Python heap peaks (slows stages down noticeably).")
+    parser.add_argument("--work-dir", default=None, help="Keep artifacts here instead of a temp dir.")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="Baseline result file to compare against.")
+    parser.add_argument("--regression-threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="loan_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    # Must be set before src.constants is imported.
+    os.environ["MONGODB_URL"] = f"local://{os.path.join(os.path.abspath(work_dir), 'mongo')}"
+    os.environ["MLFLOW_TRACKING_URI"] = f"sqlite:///{os.path.join(os.path.abspath(work_dir), 'mlflow.db')}"
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "results": {},
+    }
+
+    try:
+        for scale in args.scales.split(","):
+            n_rows = parse_scale(scale)
+            print(f"== {n_rows} rows")
+            artifact_dir, stages = bench_training(n_rows, work_dir, args.seed, args.tracemalloc)
+            dtype_memory = bench_dtype_memory(artifact_dir)
+            for stage, metrics in stages.items():
+                saved = dtype_memory[stage]["saved_mb"] if stage in dtype_memory else 0.0
+                print(f"  {stage:<20} {metrics['wall_s']:9.3f} s  peak RSS {metrics['peak_rss_mb']:9.1f} MB"
+                      f"  dtypes save {saved:8.1f} MB")
+
+            prediction = bench_prediction(artifact_dir, args.seed, args.single_requests,
+                                          args.batch_size, args.batches)
+            latency = prediction["single_row_latency_ms"]
+            print(f"  predict p50 {latency['p50']:.2f} ms  p99 {latency['p99']:.2f} ms  "
+                  f"batch {prediction['batch_throughput_rows_per_s']:,.0f} rows/s")
+
+            report["results"][str(n_rows)] = {
+                "stages": stages,
+                "total_training_s": sum(metrics["wall_s"] for metrics in stages.values()),
+                "dtype_memory": dtype_memory,
+                "prediction": prediction,
+            }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, base, cur, change, regressed in compare_results(report, baseline, args.regression_threshold):
+            marker = "REGRESSION" if regressed else ""
+            regressions += regressed
+            print(f"  {name:<60} {base:12.4f} -> {cur:12.4f} ({change:+.1%}) {marker}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Open-loop traffic replay against ``app.py`` for capacity planning.
+
+Recorded requests (a ``.jsonl`` with one loan per line, as written by
+``src.monitoring.audit.export_requests_jsonl``, or the audit log directory
+itself) are replayed at a fixed offered rate: request ``i`` is due at
+``start + i / qps`` whether or not earlier ones have finished, so a slow
+server builds a queue instead of silently slowing the load down. Latency is
+measured from the due time (what a client would see) and from the send time
+(service time). A line may also be ``{"endpoint": "/scenarios", "json": {...}}``
+to replay JSON API calls alongside form posts to ``/predict``.
+
+Targets:
+
+- ``inprocess``: the Flask test client, one per worker thread; every
+  combination of ``--artifact-dirs`` and ``--artifact-formats`` is a variant.
+- ``socket``: the app is served by werkzeug on a local port, requests go over HTTP.
+- ``http``: an already running server at ``--url`` (e.g. gunicorn).
+
+With several ``--qps`` steps the throughput ceiling is the highest offered rate
+that is sustained (>= 95% achieved) within ``--slo-p99-ms`` and under 1% errors.
+
+    python -m src.benchmark.replay --requests-file requests.jsonl --qps 20,50,100 --concurrency 8
+    python -m src.benchmark.replay --audit-dir logs/audit --target socket --qps 50
+    python -m src.benchmark.replay --requests-file requests.jsonl --artifact-formats mapped,joblib
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from src.benchmark.logging_bench import FORM_FIELDS, PREDICT_SUCCESS_MARKER
+from src.benchmark.pipeline_bench import percentiles_ms
+
+MAX_ERROR_RATE = 0.01
+MIN_ACHIEVED_RATIO = 0.95
+
+
+def _read_lines(file_path: str):
+    with open(file_path, "r", encoding="utf-8") as f:
+        yield from f
+
+
+def load_requests(requests_file: str = None, audit_dir: str = None, limit: int = None) -> list:
+    """
+    Recorded requests as ``(endpoint, kind, payload)``: ``kind`` is ``"form"`` for
+    ``/predict`` posts and ``"json"`` for JSON API calls.
+    """
+    if audit_dir:
+        from src.monitoring.audit import iter_audit_records
+        lines = (record["inputs"] for record in iter_audit_records(audit_dir, columns=["inputs"]))
+    else:
+        lines = _read_lines(requests_file)
+
+    requests = []
+    for line in itertools.islice((line for line in lines if line.strip()), limit):
+        record = json.loads(line)
+        if "endpoint" in record:
+            requests.append((record["endpoint"], "json", record["json"]))
+        else:
+            requests.append(("/predict", "form", {field: str(record[field]) for field in FORM_FIELDS}))
+    if not requests:
+        raise ValueError("No requests to replay")
+    return requests
+
+
+class InProcessTarget:
+    """
+    The Flask app through its test client, serving ``pipeline``.
+    """
+
+    def __init__(self, pipeline):
+        import app
+        app._prediction_pipeline = pipeline
+        self.app = app.app
+        self._local = threading.local()
+
+    def send(self, endpoint: str, kind: str, payload) -> bool:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(endpoint, data=payload) if kind == "form" else client.post(endpoint, json=payload)
+        return response.status_code == 200 and (kind != "form" or PREDICT_SUCCESS_MARKER in response.data)
+
+
+class HttpTarget:
+    def __init__(self, url: str, timeout_s: float = 10.0):
+        self.url = url.rstrip("/")
+        self.timeout_s = timeout_s
+
+    def send(self, endpoint: str, kind: str, payload) -> bool:
+        if kind == "form":
+            body, content_type = urllib.parse.urlencode(payload).encode(), "application/x-www-form-urlencoded"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        request = urllib.request.Request(self.url + endpoint, data=body, headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout_s) as response:
+                data = response.read()
+                return response.status == 200 and (kind != "form" or PREDICT_SUCCESS_MARKER in data)
+        except (urllib.error.URLError, OSError):
+            return False
+
+
+def serve_locally(pipeline):
+    """
+    Serve the app on a free local port from a background thread; returns ``(url, server)``.
+    """
+    from werkzeug.serving import make_server
+    import app
+
+    app._prediction_pipeline = pipeline
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def replay(target, requests: list, qps: float, duration_s: float, concurrency: int) -> dict:
+    """
+    Offer ``qps`` requests per second for ``duration_s`` (cycling through
+    ``requests``) from ``concurrency`` worker threads.
+    """
+    n_requests = max(1, int(qps * duration_s))
+    response_times, service_times, errors = [], [], 0
+    lock = threading.Lock()
+
+    def run(index: int, due: float) -> None:
+        nonlocal errors
+        sent = time.perf_counter()
+        try:
+            ok = target.send(*requests[index % len(requests)])
+        except Exception:
+            ok = False
+        done = time.perf_counter()
+        with lock:
+            response_times.append(done - due)
+            service_times.append(done - sent)
+            errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index in range(n_requests):
+            due = start + index / qps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, index, due)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "offered_qps": qps,
+        "achieved_qps": n_requests / elapsed,
+        "requests": n_requests,
+        "errors": errors,
+        "error_rate": errors / n_requests,
+        "response_ms": percentiles_ms(response_times),
+        "service_ms": percentiles_ms(service_times),
+    }
+
+
+def throughput_ceiling(steps: list, slo_p99_ms: float) -> float:
+    sustained = [
+        step["offered_qps"] for step in steps
+        if step["achieved_qps"] >= MIN_ACHIEVED_RATIO * step["offered_qps"]
+        and step["error_rate"] < MAX_ERROR_RATE and step["response_ms"]["p99"] <= slo_p99_ms
+    ]
+    return max(sustained) if sustained else 0.0
+
+
+def run_variant(target, requests: list, args) -> dict:
+    # Warm up caches and lazy imports without recording.
+    for request in requests[:min(len(requests), 20)]:
+        target.send(*request)
+    steps = [replay(target, requests, qps, args.duration, args.concurrency) for qps in args.qps]
+    return {"steps": steps, "ceiling_qps": throughput_ceiling(steps, args.slo_p99_ms)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded requests against the service at a fixed rate.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--requests-file", help="JSONL of recorded requests")
+    source.add_argument("--audit-dir", help="Replay the inputs stored in a prediction audit log")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many recorded requests")
+    parser.add_argument("--target", choices=["inprocess", "socket", "http"], default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Server for --target http")
+    parser.add_argument("--qps", default="20", help="Comma-separated offered rates, one step each")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slo-p99-ms", type=float, default=200.0)
+    parser.add_argument("--artifact-dirs", default="", help="Comma-separated model runs to compare (default: latest)")
+    parser.add_argument("--artifact-formats", default="mapped", help="Comma-separated: mapped, joblib")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+    args.qps = [float(qps) for qps in args.qps.split(",")]
+
+    requests = load_requests(args.requests_file, args.audit_dir, args.limit)
+    results = {"target": args.target, "recorded_requests": len(requests), "concurrency": args.concurrency,
+               "duration_s": args.duration, "slo_p99_ms": args.slo_p99_ms, "variants": {}}
+
+    if args.target == "http":
+        results["variants"][args.url] = run_variant(HttpTarget(args.url), requests, args)
+    else:
+        from src.pipline.prediction_pipeline import PredictionPipeline
+        artifact_dirs = [d for d in args.artifact_dirs.split(",") if d] or [None]
+        for artifact_dir, artifact_format in itertools.product(artifact_dirs, args.artifact_formats.split(",")):
+            name = f"{os.path.basename(os.path.normpath(artifact_dir)) if artifact_dir else 'latest'}/{artifact_format}"
+            pipeline = PredictionPipeline(artifact_dir=artifact_dir, artifact_format=artifact_format, audit_dir="")
+            if args.target == "socket":
+                url, server = serve_locally(pipeline)
+                try:
+                    results["variants"][name] = run_variant(HttpTarget(url), requests, args)
+                finally:
+                    server.shutdown()
+            else:
+                results["variants"][name] = run_variant(InProcessTarget(pipeline), requests, args)
+
+    for name, variant in results["variants"].items():
+        for step in variant["steps"]:
+            print(f"{name:>32} @ {step['offered_qps']:>6.0f} qps: achieved {step['achieved_qps']:.1f}, "
+                  f"p50 {step['response_ms']['p50']:.1f} ms, p99 {step['response_ms']['p99']:.1f} ms, "
+                  f"errors {step['error_rate']:.1%}")
+        print(f"{name:>32} ceiling: {variant['ceiling_qps']:.0f} qps (p99 <= {args.slo_p99_ms:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
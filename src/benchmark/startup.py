@@ -0,0 +1,135 @@
+"""
+Cold-start benchmark for the serving entry point.
+
+Runs ``python -X importtime`` against ``app`` in fresh interpreters, reports the
+slowest imports and fails (exit code 1) when training-only modules leak onto the
+inference path or the import budget is exceeded. Meant to be run from the repo
+root, e.g. in CI:
+
+    python -m src.benchmark.startup --repeat 5 --max-import-ms 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must never be imported by ``app`` or by the first prediction.
+FORBIDDEN_SERVING_MODULES = (
+    "mlflow",
+    "pymongo",
+    "dotenv",
+    "src.components",
+    "src.configuration.mongo_db_connection",
+    "src.data_access",
+    "src.pipline.training_pipeline",
+)
+
+COLD_START_PROBE = "import app"
+FIRST_REQUEST_PROBE = (
+    "import sys, json, app\n"
+    "app.get_prediction_pipeline()\n"
+    "print(json.dumps(sorted(sys.modules)))"
+)
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse ``-X importtime`` output into ``(module, self_us, cumulative_us)`` rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_probe(code: str, importtime: bool = True) -> subprocess.CompletedProcess:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", code]
+    return subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd(), check=True)
+
+
+def leaked_modules(loaded: list, forbidden=FORBIDDEN_SERVING_MODULES) -> list:
+    return sorted(
+        name for name in loaded
+        if any(name == prefix or name.startswith(prefix + ".") for prefix in forbidden)
+    )
+
+
+def benchmark_startup(repeat: int = 5, top: int = 15, first_request: bool = True) -> dict:
+    totals_ms = []
+    rows = []
+    for _ in range(repeat):
+        rows = parse_importtime(run_probe(COLD_START_PROBE).stderr)
+        app_row = next(row for row in rows if row[0] == "app")
+        totals_ms.append(app_row[2] / 1000)
+
+    cold_modules = [row[0] for row in rows]
+    report = {
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "import_app_ms": {
+            "median": statistics.median(totals_ms),
+            "min": min(totals_ms),
+            "max": max(totals_ms),
+        },
+        "slowest_imports": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+        ],
+        "cold_start_leaks": leaked_modules(cold_modules),
+    }
+
+    if first_request:
+        loaded = json.loads(run_probe(FIRST_REQUEST_PROBE, importtime=False).stdout.strip().splitlines()[-1])
+        report["first_request_leaks"] = leaked_modules(loaded)
+
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import cost of the serving app.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Fail when the median 'import app' time exceeds this budget.")
+    parser.add_argument("--skip-first-request", action="store_true",
+                        help="Do not load the model artifacts (e.g. when artifact/ is empty).")
+    parser.add_argument("--output", default=None, help="Optional JSON report path.")
+    args = parser.parse_args(argv)
+
+    report = benchmark_startup(args.repeat, args.top, first_request=not args.skip_first_request)
+
+    print(f"import app: median {report['import_app_ms']['median']:.1f} ms "
+          f"(min {report['import_app_ms']['min']:.1f}, max {report['import_app_ms']['max']:.1f})")
+    for row in report["slowest_imports"]:
+        print(f"  {row['self_ms']:8.2f} ms self  {row['cumulative_ms']:8.2f} ms cum  {row['module']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if report["cold_start_leaks"]:
+        failures.append(f"modules loaded by 'import app': {report['cold_start_leaks']}")
+    if report.get("first_request_leaks"):
+        failures.append(f"modules loaded by first prediction: {report['first_request_leaks']}")
+    if args.max_import_ms is not None and report["import_app_ms"]["median"] > args.max_import_ms:
+        failures.append(f"median import time {report['import_app_ms']['median']:.1f} ms "
+                        f"exceeds budget {args.max_import_ms:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
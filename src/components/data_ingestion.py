@@ -25,16 +25,30 @@ class DataIngestion:
     def export_data_into_feature_store(self) -> pd.DataFrame:
         """
         Export data from MongoDB to a CSV file in the feature store directory.
+        In chunked mode nothing is kept in memory and ``None`` is returned.
         """
         try:
             logging.info("📥 Exporting data from MongoDB to feature store")
             usvisa_data = USvisaData()
+            feature_store_path = self.data_ingestion_config.feature_store_file_path
+            os.makedirs(os.path.dirname(feature_store_path), exist_ok=True)
+
+            chunk_size = self.data_ingestion_config.training_pipeline_config.chunk_size
+            if chunk_size:
+                # Out-of-core mode: append chunk by chunk instead of materialising the collection.
+                dataframe = None
+                chunks = usvisa_data.export_collection_in_chunks(
+                    collection_name=self.data_ingestion_config.collection_name, chunk_size=chunk_size
+                )
+                for index, chunk in enumerate(chunks):
+                    chunk.to_csv(feature_store_path, mode="w" if index == 0 else "a",
+                                 index=False, header=index == 0)
+                logging.info(f"✅ Data exported to CSV at: {feature_store_path}")
+                return dataframe
+
             dataframe = usvisa_data.export_collection_as_dataframe(
                 collection_name=self.data_ingestion_config.collection_name
             )
-
-            feature_store_path = self.data_ingestion_config.feature_store_file_path
-            os.makedirs(os.path.dirname(feature_store_path), exist_ok=True)
             dataframe.to_csv(feature_store_path, index=False, header=True)
 
             logging.info(f"✅ Data exported to CSV at: {feature_store_path}")
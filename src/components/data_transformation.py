@@ -4,14 +4,46 @@ import pandas as pd
 import numpy as np
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 
 from src.logger import logging
 from src.exception import USvisaException
 from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import DataTransformationArtifact, DataIngestionArtifact
-from src.utils.main_utils import save_object, read_yaml_file
-from src.constants import SCHEMA_FILE_PATH
+from src.utils.main_utils import save_object, save_mapped_object, read_yaml_file
+from src.utils.mapped_artifact import mapped_artifact_path
+from src.utils.dtype_policy import DtypePolicy
+from src.utils.similar_cases import SimilarCaseIndex, combine_case_chunks, encode_case_chunk
+from src.monitoring.drift import build_feature_sketches, write_drift_reference
+from src.monitoring.portfolio import write_segment_model
+from src.constants import (
+    SCHEMA_FILE_PATH, TEST_SPLIT_PERCENT, LOAN_TYPE_COLUMN, SIMILAR_CASE_COLUMNS, SIMILAR_CASES_EXACT_MAX_ROWS
+)
+
+
+CLUSTER_FEATURES = [
+    'Age', 'Monthly_Income', 'Loan_Amount', 'Loan_Tenure', 'Interest_Rate',
+    'Collateral_Value', 'Outstanding_Loan_Amount', 'Monthly_EMI',
+    'Num_Missed_Payments', 'Days_Past_Due'
+]
+
+SEGMENT_NAMES = {
+    0: 'Moderate Income, High Loan Burden',
+    1: 'High Income, Low Default Risk',
+    2: 'Moderate Income, Medium Risk',
+    3: 'High Loan, Higher Default Risk'
+}
+
+HIGH_RISK_SEGMENTS = ['High Loan, Higher Default Risk', 'Moderate Income, High Loan Burden']
+
+
+def loan_id_test_mask(loan_ids: pd.Series, test_percent: int = TEST_SPLIT_PERCENT) -> np.ndarray:
+    """
+    Deterministic train/test assignment from a hash of ``Loan_ID``: the same loan
+    always lands in the same split, whatever chunk it arrives in.
+    """
+    buckets = pd.util.hash_pandas_object(loan_ids.astype(str), index=False).to_numpy() % 100
+    return buckets < test_percent
 
 
 class DataTransformation:
@@ -20,6 +52,7 @@ class DataTransformation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_transformation_config = data_transformation_config
             self.schema_config = read_yaml_file(SCHEMA_FILE_PATH)["loan_recovery"]
+            self.dtype_policy = DtypePolicy(self.schema_config["column_dtypes"])
         except Exception as e:
             raise USvisaException(e, sys)
 
@@ -37,33 +70,63 @@ class DataTransformation:
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def save_similar_case_index(self, scaler: StandardScaler, points: np.ndarray, cases: dict) -> None:
+        """
+        Persist the nearest-neighbour index over the scaled cluster features, so
+        agents can look up the most similar past loans and how they were recovered.
+        """
+        config = self.data_transformation_config
+        mode = config.similar_cases_mode
+        if mode == "auto":
+            mode = "exact" if len(points) <= SIMILAR_CASES_EXACT_MAX_ROWS else "approximate"
+        index = SimilarCaseIndex(CLUSTER_FEATURES, scaler.mean_, scaler.scale_, cases, mode=mode).build(points)
+        save_object(config.similar_cases_file_path, index)
+        logging.info(f"🔎 Indexed {len(points)} historical loans for similar-case lookup ({mode})")
+
+    def save_segment_model(self, scaler: StandardScaler, kmeans) -> None:
+        """
+        Persist the borrower segmentation so served loans can be assigned a
+        ``Segment_Name`` for the portfolio aggregates.
+        """
+        write_segment_model(self.data_transformation_config.segments_file_path, CLUSTER_FEATURES,
+                            scaler.mean_, scaler.scale_, kmeans.cluster_centers_,
+                            [SEGMENT_NAMES[i] for i in range(len(kmeans.cluster_centers_))])
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
+            if self.data_transformation_config.training_pipeline_config.chunk_size:
+                return self.initiate_chunked_data_transformation()
+
             logging.info("📊 Starting data transformation step")
-            df = pd.read_csv(self.data_ingestion_artifact.feature_store_file_path)
+            df = self.dtype_policy.apply(pd.read_csv(
+                self.data_ingestion_artifact.feature_store_file_path, dtype=self.dtype_policy.read_csv_dtypes()
+            ))
+            # Not a model feature, but kept per row so models can be trained per loan type.
+            loan_types = df[LOAN_TYPE_COLUMN].astype(str).to_numpy(dtype=str)
+            cases = {col: combine_case_chunks([encode_case_chunk(df[col])])
+                     for col in SIMILAR_CASE_COLUMNS if col in df.columns}
             df.drop(columns=self.schema_config["dropped_columns"], inplace=True)
 
+            # 📡 Reference distributions for serving-time drift monitoring
+            write_drift_reference(
+                self.data_transformation_config.drift_reference_file_path,
+                build_feature_sketches(df, self.schema_config["column_dtypes"], self.schema_config["required_columns"])
+            )
+
             # 📈 KMeans clustering
-            cluster_features = [
-                'Age', 'Monthly_Income', 'Loan_Amount', 'Loan_Tenure', 'Interest_Rate',
-                'Collateral_Value', 'Outstanding_Loan_Amount', 'Monthly_EMI',
-                'Num_Missed_Payments', 'Days_Past_Due'
-            ]
+            cluster_features = CLUSTER_FEATURES
 
             scaler = StandardScaler()
             df_scaled = scaler.fit_transform(df[cluster_features])
+            self.save_similar_case_index(scaler, df_scaled, cases)
 
             kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
             df['Borrower_Segment'] = kmeans.fit_predict(df_scaled)
-            df['Segment_Name'] = df['Borrower_Segment'].map({
-                0: 'Moderate Income, High Loan Burden',
-                1: 'High Income, Low Default Risk',
-                2: 'Moderate Income, Medium Risk',
-                3: 'High Loan, Higher Default Risk'
-            })
+            self.save_segment_model(scaler, kmeans)
+            df['Segment_Name'] = df['Borrower_Segment'].map(SEGMENT_NAMES)
 
             df['High_Risk_Flag'] = df['Segment_Name'].apply(
-                lambda x: 1 if x in ['High Loan, Higher Default Risk', 'Moderate Income, High Loan Burden'] else 0
+                lambda x: 1 if x in HIGH_RISK_SEGMENTS else 0
             )
 
             # 🔄 Apply transformers
@@ -72,6 +135,7 @@ class DataTransformation:
 
             os.makedirs(os.path.dirname(self.data_transformation_config.transformer_object_path), exist_ok=True)
             save_object(self.data_transformation_config.transformer_object_path, transformer)
+            save_mapped_object(mapped_artifact_path(self.data_transformation_config.transformer_object_path), transformer)
 
             # 🧪 Final transformed DataFrame
             transformed_df = pd.DataFrame(
@@ -84,15 +148,160 @@ class DataTransformation:
             transformed_df.to_csv(self.data_transformation_config.transformed_data_path, index=False)
 
             # Save to .npy for training
-            train_array = transformed_df.drop(columns=["Segment_Name"]).values
+            train_array = transformed_df.drop(columns=["Segment_Name"]).to_numpy(dtype=self.dtype_policy.model_input_dtype)
             np.save(self.data_transformation_config.transformed_train_file_path, train_array)
+            np.save(self.data_transformation_config.loan_type_file_path, loan_types)
 
             logging.info("✅ Data transformation complete")
 
             return DataTransformationArtifact(
                 transformed_data_path=self.data_transformation_config.transformed_data_path,
                 transformer_object_path=self.data_transformation_config.transformer_object_path,
-                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path
+                transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
+                loan_type_file_path=self.data_transformation_config.loan_type_file_path,
+                drift_reference_file_path=self.data_transformation_config.drift_reference_file_path,
+                similar_cases_file_path=self.data_transformation_config.similar_cases_file_path,
+                segments_file_path=self.data_transformation_config.segments_file_path
+            )
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _read_chunks(self, usecols: list):
+        reader = pd.read_csv(
+            self.data_ingestion_artifact.feature_store_file_path,
+            usecols=usecols,
+            dtype=self.dtype_policy.read_csv_dtypes(),
+            chunksize=self.data_transformation_config.training_pipeline_config.chunk_size
+        )
+        return (self.dtype_policy.apply(chunk) for chunk in reader)
+
+    def initiate_chunked_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Out-of-core variant of ``initiate_data_transformation`` whose peak memory is
+        bounded by the chunk size:
+
+        1. stream once to fit scaler moments (``partial_fit``) and collect one-hot category sets,
+        2. stream again to fit MiniBatchKMeans segments on the scaled cluster features,
+        3. stream a last time to transform and write the training matrix into a
+           memory-mapped ``.npy`` together with a Loan_ID-hash test mask.
+        """
+        try:
+            logging.info("📊 Starting chunked data transformation step")
+            config = self.data_transformation_config
+            required_columns = self.schema_config["required_columns"]
+            num_features = [col for col, dtype in self.schema_config["column_dtypes"].items() if dtype in ["int", "float"]]
+            cat_features = [col for col, dtype in self.schema_config["column_dtypes"].items() if dtype == "str"]
+            usecols = list(dict.fromkeys(required_columns + ["Loan_ID", LOAN_TYPE_COLUMN] + SIMILAR_CASE_COLUMNS))
+
+            # Pass 1: streaming statistics
+            cluster_scaler, feature_scaler = StandardScaler(), StandardScaler()
+            categories = {col: set() for col in cat_features}
+            loan_type_width, n_rows = 1, 0
+            sketches = None  # drift reference: bins from the first chunk, counts over all rows
+            for chunk in self._read_chunks(usecols):
+                if sketches is None:
+                    sketches = build_feature_sketches(chunk, self.schema_config["column_dtypes"], required_columns)
+                else:
+                    for col, sketch in sketches.items():
+                        sketch.update(chunk[col])
+                cluster_scaler.partial_fit(chunk[CLUSTER_FEATURES])
+                feature_scaler.partial_fit(chunk[num_features])
+                for col in cat_features:
+                    categories[col].update(chunk[col].dropna().unique())
+                loan_type_width = max(loan_type_width, chunk[LOAN_TYPE_COLUMN].astype(str).str.len().max())
+                n_rows += len(chunk)
+            logging.info(f"📏 Fitted streaming statistics over {n_rows} rows")
+            write_drift_reference(config.drift_reference_file_path, sketches)
+
+            # Pass 2: segments
+            kmeans = MiniBatchKMeans(n_clusters=4, random_state=42, n_init=3)
+            for chunk in self._read_chunks(usecols):
+                kmeans.partial_fit(cluster_scaler.transform(chunk[CLUSTER_FEATURES]))
+            self.save_segment_model(cluster_scaler, kmeans)
+
+            # Same ColumnTransformer as the in-memory path; the encoder gets the full
+            # category sets up front and the scaler is swapped for the streamed one.
+            transformer = ColumnTransformer([
+                ("num", StandardScaler(), num_features),
+                ("cat", OneHotEncoder(handle_unknown='ignore',
+                                      categories=[sorted(categories[col]) for col in cat_features]), cat_features)
+            ])
+            transformer.fit(next(iter(self._read_chunks(usecols)))[required_columns])
+            transformer.transformers_[0] = ("num", feature_scaler, num_features)
+
+            os.makedirs(os.path.dirname(config.transformer_object_path), exist_ok=True)
+            save_object(config.transformer_object_path, transformer)
+            save_mapped_object(mapped_artifact_path(config.transformer_object_path), transformer)
+
+            # Pass 3: transform into memory-mapped outputs
+            n_features = len(num_features) + sum(len(categories[col]) for col in cat_features)
+            train_array = np.lib.format.open_memmap(
+                config.transformed_train_file_path, mode="w+", dtype=self.dtype_policy.model_input_dtype,
+                shape=(n_rows, n_features + 1)
+            )
+            split_mask = np.lib.format.open_memmap(
+                config.split_file_path, mode="w+", dtype=bool, shape=(n_rows,)
+            )
+            loan_types = np.lib.format.open_memmap(
+                config.loan_type_file_path, mode="w+", dtype=f"<U{loan_type_width}", shape=(n_rows,)
+            )
+
+            # Index input: points go to disk like the training matrix, case columns
+            # are kept as categorical codes per chunk.
+            similar_points = np.lib.format.open_memmap(
+                config.similar_points_file_path, mode="w+", dtype=np.float32,
+                shape=(n_rows, len(CLUSTER_FEATURES))
+            )
+            cases = {col: [] for col in SIMILAR_CASE_COLUMNS}
+
+            offset = 0
+            for index, chunk in enumerate(self._read_chunks(usecols)):
+                cluster_scaled = cluster_scaler.transform(chunk[CLUSTER_FEATURES])
+                segment = kmeans.predict(cluster_scaled)
+                segment_name = pd.Series(segment).map(SEGMENT_NAMES)
+                high_risk_flag = segment_name.isin(HIGH_RISK_SEGMENTS).astype(int).to_numpy()
+
+                transformed = self.dtype_policy.to_model_input(transformer.transform(chunk[required_columns]))
+
+                rows = slice(offset, offset + len(chunk))
+                train_array[rows, :-1] = transformed
+                train_array[rows, -1] = high_risk_flag
+                split_mask[rows] = loan_id_test_mask(chunk["Loan_ID"])
+                loan_types[rows] = chunk[LOAN_TYPE_COLUMN].astype(str).to_numpy(dtype=str)
+                similar_points[rows] = cluster_scaled
+                for col in SIMILAR_CASE_COLUMNS:
+                    cases[col].append(encode_case_chunk(chunk[col]))
+                offset += len(chunk)
+
+                transformed_df = pd.DataFrame(transformed)
+                transformed_df["High_Risk_Flag"] = high_risk_flag
+                transformed_df["Segment_Name"] = segment_name.values
+                transformed_df.to_csv(config.transformed_data_path, mode="w" if index == 0 else "a",
+                                      header=index == 0, index=False)
+
+            for output in (train_array, split_mask, loan_types, similar_points):
+                output.flush()
+            del train_array, split_mask, loan_types, similar_points
+
+            self.save_similar_case_index(
+                cluster_scaler, np.load(config.similar_points_file_path, mmap_mode="r"),
+                {col: combine_case_chunks(chunks) for col, chunks in cases.items()}
+            )
+            del cases
+            os.remove(config.similar_points_file_path)
+
+            logging.info(f"✅ Chunked data transformation complete ({n_rows} rows, {n_features} features)")
+
+            return DataTransformationArtifact(
+                transformed_data_path=config.transformed_data_path,
+                transformer_object_path=config.transformer_object_path,
+                transformed_train_file_path=config.transformed_train_file_path,
+                split_file_path=config.split_file_path,
+                loan_type_file_path=config.loan_type_file_path,
+                drift_reference_file_path=config.drift_reference_file_path,
+                similar_cases_file_path=config.similar_cases_file_path,
+                segments_file_path=config.segments_file_path
             )
 
         except Exception as e:
@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from src.exception import USvisaException
 from src.logger import logging
 from src.utils.main_utils import read_yaml_file
+from src.utils.dtype_policy import DtypePolicy
 from src.constants import SCHEMA_FILE_PATH
 from src.entity.config_entity import DataValidationConfig
 from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
@@ -19,13 +20,17 @@ class DataValidation:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)["loan_recovery"]
+            self.dtype_policy = DtypePolicy(self._schema_config["column_dtypes"])
         except Exception as e:
             raise USvisaException(e, sys)
 
     @staticmethod
-    def read_data(file_path: str) -> DataFrame:
+    def read_data(file_path: str, nrows: int = None, dtype_policy: DtypePolicy = None) -> DataFrame:
         try:
-            return pd.read_csv(file_path)
+            if dtype_policy is None:
+                return pd.read_csv(file_path, nrows=nrows)
+            df = pd.read_csv(file_path, nrows=nrows, dtype=dtype_policy.read_csv_dtypes())
+            return dtype_policy.apply(df)
         except Exception as e:
             raise USvisaException(e, sys)
 
@@ -48,16 +53,49 @@ class DataValidation:
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def validate_column_dtypes(self, df: DataFrame) -> bool:
+        """
+        Schema ``int``/``float`` columns must be numeric and ``str`` columns
+        categorical (or plain strings), whatever width the dtype policy picked.
+        """
+        try:
+            mismatched = []
+            for column, dtype in self._schema_config["column_dtypes"].items():
+                if column not in df.columns:
+                    continue
+                series = df[column]
+                if dtype in ("int", "float"):
+                    ok = pd.api.types.is_numeric_dtype(series)
+                else:
+                    ok = (isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object
+                          or pd.api.types.is_string_dtype(series.dtype))
+                if not ok:
+                    mismatched.append(f"{column}: expected {dtype}, got {series.dtype}")
+
+            if mismatched:
+                logging.info(f"⚠️ Columns with unexpected dtypes: {mismatched}")
+                return False
+
+            return True
+        except Exception as e:
+            raise USvisaException(e, sys)
+
     def initiate_data_validation(self) -> DataValidationArtifact:
         try:
             logging.info("🚀 Starting data validation")
-            df = self.read_data(self.data_ingestion_artifact.feature_store_file_path)
+            # Only the columns are checked, so in chunked mode a sample is enough.
+            chunk_size = self.data_validation_config.training_pipeline_config.chunk_size
+            df = self.read_data(self.data_ingestion_artifact.feature_store_file_path, nrows=chunk_size,
+                                dtype_policy=self.dtype_policy)
 
             error_messages = []
 
             if not self.validate_required_columns_exist(df):
                 error_messages.append("❌ Some required columns are missing.")
 
+            if not self.validate_column_dtypes(df):
+                error_messages.append("❌ Some columns have unexpected dtypes.")
+
             validation_status = len(error_messages) == 0
             message = "✅ Data validation successful." if validation_status else " | ".join(error_messages)
 
@@ -0,0 +1,119 @@
+import os
+import re
+import sys
+import json
+import multiprocessing
+import numpy as np
+from collections import Counter
+import mlflow
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import train_test_split
+
+from src.logger import logging
+from src.exception import USvisaException
+from src.entity.config_entity import LoanTypeTrainerConfig
+from src.entity.artifact_entity import DataTransformationArtifact, LoanTypeModelsArtifact
+from src.components.model_trainer import N_ESTIMATORS, FOREST_PARAMS
+from src.utils.chunked_training import fit_loan_type_forest, iter_row_blocks
+
+
+class LoanTypeModelTrainer:
+    """
+    Trains one RandomForestClassifier per ``Loan_Type`` on the shared transformed
+    matrix, each in its own process, and writes an index mapping loan types to
+    model files. Types with too few training rows (or a single class) get no
+    model and are served by the global one.
+    """
+
+    def __init__(self, data_transformation_artifact: DataTransformationArtifact,
+                 loan_type_trainer_config: LoanTypeTrainerConfig):
+        try:
+            logging.info("🔧 Initializing LoanTypeModelTrainer")
+            self.data_transformation_artifact = data_transformation_artifact
+            self.loan_type_trainer_config = loan_type_trainer_config
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _split_file_path(self, n_rows: int) -> str:
+        """
+        The global model's held-out rows: the Loan_ID-hash mask in chunked mode,
+        otherwise the same ``train_test_split`` permutation ModelTrainer uses,
+        saved so worker processes can memory-map it instead of receiving a copy.
+        """
+        split_file_path = self.data_transformation_artifact.split_file_path
+        if split_file_path and os.path.exists(split_file_path):
+            return split_file_path
+        test_mask = np.zeros(n_rows, dtype=bool)
+        _, test_index = train_test_split(np.arange(n_rows), test_size=0.2, random_state=42)
+        test_mask[test_index] = True
+        os.makedirs(os.path.dirname(self.loan_type_trainer_config.split_file_path), exist_ok=True)
+        np.save(self.loan_type_trainer_config.split_file_path, test_mask)
+        return self.loan_type_trainer_config.split_file_path
+
+    def _train_counts(self, split_file_path: str) -> Counter:
+        """
+        Training rows per loan type, counted one chunk at a time.
+        """
+        loan_types = np.load(self.data_transformation_artifact.loan_type_file_path, mmap_mode="r")
+        test_mask = np.load(split_file_path, mmap_mode="r")
+        chunk_size = self.loan_type_trainer_config.training_pipeline_config.chunk_size or len(loan_types)
+        counts = Counter()
+        for start, stop in iter_row_blocks(len(loan_types), chunk_size):
+            types, block_counts = np.unique(
+                np.asarray(loan_types[start:stop])[~np.asarray(test_mask[start:stop])], return_counts=True
+            )
+            counts.update(dict(zip(map(str, types), block_counts.tolist())))
+        return counts
+
+    def initiate_loan_type_training(self) -> LoanTypeModelsArtifact:
+        try:
+            config = self.loan_type_trainer_config
+            artifact = self.data_transformation_artifact
+            n_rows = np.load(artifact.loan_type_file_path, mmap_mode="r").shape[0]
+            split_file_path = self._split_file_path(n_rows)
+            train_counts = self._train_counts(split_file_path)
+
+            eligible = sorted(t for t, count in train_counts.items() if count >= config.min_train_rows)
+            too_small = sorted(set(train_counts) - set(eligible))
+            if too_small:
+                logging.info(f"ℹ️ Loan types served by the global model (< {config.min_train_rows} rows): {too_small}")
+
+            os.makedirs(config.models_dir, exist_ok=True)
+            file_names = {t: f"{re.sub(r'[^A-Za-z0-9_-]+', '_', t)}_{i}.pkl" for i, t in enumerate(eligible)}
+
+            logging.info(f"🌲 Training {len(eligible)} loan type models in parallel: {eligible}")
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=config.n_jobs, mp_context=spawn) as executor:
+                futures = {
+                    t: executor.submit(fit_loan_type_forest, artifact.transformed_train_file_path,
+                                       artifact.loan_type_file_path, t, split_file_path,
+                                       os.path.join(config.models_dir, file_names[t]),
+                                       N_ESTIMATORS, 42, FOREST_PARAMS,
+                                       config.training_pipeline_config.chunk_size)
+                    for t in eligible
+                }
+                results = {t: future.result() for t, future in futures.items()}
+
+            models = {t: {"file": file_names[t], **metrics} for t, metrics in results.items() if metrics is not None}
+            single_class = sorted(t for t, metrics in results.items() if metrics is None)
+            if single_class:
+                logging.warning(f"⚠️ Loan types with a single class, served by the global model: {single_class}")
+
+            with open(config.index_file_path, "w") as f:
+                json.dump({"models": models, "fallback": too_small + single_class}, f, indent=2)
+
+            for loan_type, metrics in models.items():
+                for name in ("accuracy", "roc_auc"):
+                    if name in metrics:
+                        mlflow.log_metric(f"loan_type_{file_names[loan_type][:-4]}_{name}", metrics[name],
+                                          run_id=config.mlflow_run_id)
+            mlflow.log_artifacts(config.models_dir, artifact_path="loan_type_models", run_id=config.mlflow_run_id)
+
+            logging.info(f"📦 Loan type models saved to: {config.models_dir}")
+            return LoanTypeModelsArtifact(
+                index_file_path=config.index_file_path,
+                loan_types=sorted(models)
+            )
+
+        except Exception as e:
+            raise USvisaException(e, sys)
@@ -15,6 +15,7 @@ from src.entity.artifact_entity import (
 )
 from src.entity.config_entity import ModelEvaluationConfig
 from src.utils.main_utils import load_object, write_yaml_file
+from src.utils.chunked_training import StreamingBinaryMetrics, iter_row_blocks
 
 
 class ModelEvaluation:
@@ -23,21 +24,36 @@ class ModelEvaluation:
         self.data_transformation_artifact = data_transformation_artifact
         self.model_evaluation_config = model_evaluation_config
 
+    def _evaluate_in_chunks(self, model):
+        """
+        Score the memory-mapped test array chunk by chunk (out-of-core mode).
+        """
+        test_data = np.load(self.model_trainer_artifact.test_array_path, mmap_mode="r")
+        metrics = StreamingBinaryMetrics()
+        for start, stop in iter_row_blocks(test_data.shape[0], self.model_evaluation_config.chunk_size):
+            block = np.asarray(test_data[start:stop])
+            metrics.update(block[:, -1], model.predict_proba(block[:, :-1])[:, 1])
+        logging.info(f"🧪 Evaluated {metrics.n_samples} test rows in chunks")
+        return metrics.accuracy(), metrics.roc_auc(), metrics.classification_report()
+
     def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
         try:
             model = load_object(self.model_trainer_artifact.model_path)
             transformer = load_object(self.data_transformation_artifact.transformer_object_path)
 
-            test_data = np.load(self.model_trainer_artifact.test_array_path, allow_pickle=True)
-            X_test = test_data[:, :-1]
-            y_test = test_data[:, -1].astype(int)
+            if self.model_evaluation_config.chunk_size:
+                accuracy, roc_auc, report = self._evaluate_in_chunks(model)
+            else:
+                test_data = np.load(self.model_trainer_artifact.test_array_path, allow_pickle=True)
+                X_test = test_data[:, :-1]
+                y_test = test_data[:, -1].astype(int)
 
-            y_pred = model.predict(X_test)
-            y_prob = model.predict_proba(X_test)[:, 1]
+                y_pred = model.predict(X_test)
+                y_prob = model.predict_proba(X_test)[:, 1]
 
-            accuracy = accuracy_score(y_test, y_pred)
-            roc_auc = roc_auc_score(y_test, y_prob)
-            report = classification_report(y_test, y_pred, output_dict=True)
+                accuracy = accuracy_score(y_test, y_pred)
+                roc_auc = roc_auc_score(y_test, y_prob)
+                report = classification_report(y_test, y_pred, output_dict=True)
 
             # Save evaluation YAML
             evaluation_result = {
@@ -51,16 +67,18 @@ class ModelEvaluation:
             write_yaml_file(self.model_evaluation_config.report_file_path, evaluation_result)
 
             # ✅ MLflow logging
-            mlflow.log_metric("eval_accuracy", accuracy)
-            mlflow.log_metric("eval_roc_auc", roc_auc)
+            run_id = self.model_evaluation_config.mlflow_run_id
+            mlflow.log_metric("eval_accuracy", accuracy, run_id=run_id)
+            mlflow.log_metric("eval_roc_auc", roc_auc, run_id=run_id)
 
             # Log report file
             report_path = os.path.join(os.path.dirname(self.model_evaluation_config.report_file_path), "classification_report.json")
             with open(report_path, "w") as f:
                 json.dump(report, f, indent=2)
 
-            mlflow.log_artifact(report_path, artifact_path="evaluation")
-            mlflow.log_artifact(self.model_evaluation_config.report_file_path, artifact_path="evaluation")
+            mlflow.log_artifact(report_path, artifact_path="evaluation", run_id=run_id)
+            mlflow.log_artifact(self.model_evaluation_config.report_file_path, artifact_path="evaluation",
+                                run_id=run_id)
 
             return ModelEvaluationArtifact(
                 report_file_path=self.model_evaluation_config.report_file_path,
@@ -2,6 +2,8 @@ import os
 import sys
 import numpy as np
 import mlflow
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
@@ -11,7 +13,16 @@ from src.logger import logging
 from src.exception import USvisaException
 from src.entity.config_entity import ModelTrainerConfig
 from src.entity.artifact_entity import ModelTrainerArtifact
-from src.utils.main_utils import load_numpy_array_data, save_object
+from src.utils.main_utils import load_numpy_array_data, load_object, save_object, save_mapped_object
+from src.utils.mapped_artifact import mapped_artifact_path
+from src.monitoring.drift import SCORE_COLUMN, score_sketch, write_drift_reference
+from src.utils.chunked_training import (
+    StreamingBinaryMetrics, fit_sub_forest, iter_row_blocks, merge_forests, plan_sub_forests
+)
+
+
+N_ESTIMATORS = 100
+FOREST_PARAMS = {"max_depth": 5, "min_samples_leaf": 10}
 
 
 class ModelTrainer:
@@ -22,8 +33,30 @@ class ModelTrainer:
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def _write_score_reference(self, scores) -> None:
+        """
+        Add the held-out Risk_Score distribution to the transformation's drift reference.
+        """
+        if self.model_trainer_config.drift_reference_file_path:
+            write_drift_reference(self.model_trainer_config.drift_reference_file_path, {SCORE_COLUMN: scores})
+
+    def _save_model(self, model) -> None:
+        """
+        Save the model with joblib (evaluation, MLflow) and in the mapped format
+        for serving, recording the transformer's output columns as its feature order.
+        """
+        config = self.model_trainer_config
+        save_object(config.model_path, model)
+        feature_names = None
+        if config.transformer_object_path and os.path.exists(config.transformer_object_path):
+            feature_names = list(load_object(config.transformer_object_path).get_feature_names_out())
+        save_mapped_object(mapped_artifact_path(config.model_path), model, feature_names=feature_names)
+
     def train_model(self) -> ModelTrainerArtifact:
         try:
+            if self.model_trainer_config.training_pipeline_config.chunk_size:
+                return self.train_model_chunked()
+
             logging.info("📥 Loading transformed training data from .npy")
             data = load_numpy_array_data(self.model_trainer_config.transformed_train_file_path)
 
@@ -37,10 +70,9 @@ class ModelTrainer:
 
             logging.info("🌲 Training RandomForestClassifier")
             model = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=5,
-                min_samples_leaf=10,
-                random_state=42
+                n_estimators=N_ESTIMATORS,
+                random_state=42,
+                **FOREST_PARAMS
             )
             model.fit(X_train, y_train)
 
@@ -51,27 +83,34 @@ class ModelTrainer:
             accuracy = accuracy_score(y_test, y_pred)
             roc_auc = roc_auc_score(y_test, y_prob)
 
+            scores = score_sketch()
+            scores.update(y_prob)
+            self._write_score_reference(scores)
+
             logging.info(f"✅ Accuracy: {accuracy:.4f}")
             logging.info(f"✅ ROC-AUC: {roc_auc:.4f}")
 
             # Save model and test array
-            save_object(self.model_trainer_config.model_path, model)
+            self._save_model(model)
             np.save(self.model_trainer_config.test_array_path, np.c_[X_test, y_test])
 
             logging.info(f"📦 Model saved to: {self.model_trainer_config.model_path}")
             logging.info(f"🧪 Test array saved to: {self.model_trainer_config.test_array_path}")
 
             # ✅ Log to MLflow (params + metrics)
-            mlflow.log_param("model_type", "RandomForest")
-            mlflow.log_param("n_estimators", 100)
-            mlflow.log_param("max_depth", 5)
-            mlflow.log_param("min_samples_leaf", 10)
+            run_id = self.model_trainer_config.mlflow_run_id
+            mlflow.log_params({
+                "model_type": "RandomForest",
+                "n_estimators": 100,
+                "max_depth": 5,
+                "min_samples_leaf": 10,
+            }, run_id=run_id)
 
-            mlflow.log_metric("accuracy", accuracy)
-            mlflow.log_metric("roc_auc", roc_auc)
+            mlflow.log_metric("accuracy", accuracy, run_id=run_id)
+            mlflow.log_metric("roc_auc", roc_auc, run_id=run_id)
 
             # ✅ Manually upload model as artifact (safe for DagsHub)
-            mlflow.log_artifact(self.model_trainer_config.model_path, artifact_path="model_artifacts")
+            mlflow.log_artifact(self.model_trainer_config.model_path, artifact_path="model_artifacts", run_id=run_id)
 
             return ModelTrainerArtifact(
                 model_path=self.model_trainer_config.model_path,
@@ -83,7 +122,96 @@ class ModelTrainer:
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def train_model_chunked(self) -> ModelTrainerArtifact:
+        """
+        Out-of-core training on the memory-mapped transformed array.
 
+        Each chunk's training rows fit a sub-forest with a share of the trees in a
+        separate process; the sub-forests are merged into one RandomForestClassifier
+        and the held-out rows (Loan_ID-hash split) are scored chunk by chunk.
+        """
+        try:
+            config = self.model_trainer_config
+            chunk_size = config.training_pipeline_config.chunk_size
+            data = np.load(config.transformed_train_file_path, mmap_mode="r")
+            test_mask = np.load(config.split_file_path, mmap_mode="r")
+
+            blocks = list(iter_row_blocks(data.shape[0], chunk_size))
+            plan = plan_sub_forests(data.shape[0], chunk_size, N_ESTIMATORS)
+            logging.info(f"🌲 Training {len(plan)} sub-forests on {len(blocks)} chunks of {chunk_size} rows")
+
+            # Spawn rather than fork: stages run on scheduler threads alongside MLflow's.
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=config.n_jobs, mp_context=spawn) as executor:
+                futures = [
+                    executor.submit(fit_sub_forest, config.transformed_train_file_path, config.split_file_path,
+                                    start, stop, n_trees, 42 + index, FOREST_PARAMS, chunk_size)
+                    for index, (start, stop, n_trees) in enumerate(plan)
+                ]
+                forests = [future.result() for future in futures]
+
+                fitted = [(rows, forest) for rows, forest in zip(plan, forests) if forest is not None]
+                if not fitted:
+                    raise ValueError("No chunk contained both classes; cannot train a classifier")
+                missing = N_ESTIMATORS - sum(len(forest.estimators_) for _, forest in fitted)
+                if missing:
+                    # Refit the trees lost to single-class samples on a range that has both classes.
+                    logging.warning(f"⚠️ Refitting {missing} trees whose chunk sample held a single class")
+                    (start, stop, _), _ = fitted[0]
+                    forests.append(executor.submit(
+                        fit_sub_forest, config.transformed_train_file_path, config.split_file_path,
+                        start, stop, missing, 42 + len(plan), FOREST_PARAMS, chunk_size
+                    ).result())
+            model = merge_forests([forest for forest in forests if forest is not None])
+
+            logging.info("🧪 Evaluating model on held-out chunks")
+            metrics = StreamingBinaryMetrics()
+            scores = score_sketch()
+            os.makedirs(os.path.dirname(config.test_array_path), exist_ok=True)
+            test_array = np.lib.format.open_memmap(
+                config.test_array_path, mode="w+", dtype=data.dtype,
+                shape=(int(np.count_nonzero(test_mask)), data.shape[1])
+            )
+            offset = 0
+            for start, stop in blocks:
+                test_rows = np.asarray(data[start:stop])[np.asarray(test_mask[start:stop])]
+                if len(test_rows):
+                    y_prob = model.predict_proba(test_rows[:, :-1])[:, 1]
+                    metrics.update(test_rows[:, -1], y_prob)
+                    scores.update(y_prob)
+                    test_array[offset:offset + len(test_rows)] = test_rows
+                    offset += len(test_rows)
+            test_array.flush()
+            del test_array
+            self._write_score_reference(scores)
+
+            accuracy, roc_auc = metrics.accuracy(), metrics.roc_auc()
+            logging.info(f"✅ Accuracy: {accuracy:.4f}")
+            logging.info(f"✅ ROC-AUC: {roc_auc:.4f}")
 
+            self._save_model(model)
+            logging.info(f"📦 Model saved to: {config.model_path}")
+            logging.info(f"🧪 Test array saved to: {config.test_array_path}")
 
+            mlflow.log_params({
+                "model_type": "RandomForest",
+                "n_estimators": model.n_estimators,
+                "max_depth": FOREST_PARAMS["max_depth"],
+                "min_samples_leaf": FOREST_PARAMS["min_samples_leaf"],
+                "chunk_size": chunk_size,
+                "n_sub_forests": len(plan),
+            }, run_id=config.mlflow_run_id)
 
+            mlflow.log_metric("accuracy", accuracy, run_id=config.mlflow_run_id)
+            mlflow.log_metric("roc_auc", roc_auc, run_id=config.mlflow_run_id)
+            mlflow.log_artifact(config.model_path, artifact_path="model_artifacts", run_id=config.mlflow_run_id)
+
+            return ModelTrainerArtifact(
+                model_path=config.model_path,
+                test_array_path=config.test_array_path,
+                accuracy=accuracy,
+                roc_auc=roc_auc
+            )
+
+        except Exception as e:
+            raise USvisaException(e, sys)
@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from src.exception import USvisaException
+from src.logger import logging
+
+
+LOCAL_URL_SCHEME = "local://"
+
+
+def is_local_url(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(LOCAL_URL_SCHEME)
+
+
+def _matches(document: dict, query: Optional[dict]) -> bool:
+    if not query:
+        return True
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if isinstance(operand, datetime):
+                    # Documents are stored with json.dumps(default=str), so datetimes are compared as str().
+                    operand = str(operand)
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$exists" and (field in document) != bool(operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return document
+    excluded = {field for field, keep in projection.items() if not keep}
+    included = {field for field, keep in projection.items() if keep}
+    if included:
+        return {field: document[field] for field in included if field in document}
+    return {field: value for field, value in document.items() if field not in excluded}
+
+
+def _update_parts(request) -> tuple:
+    """
+    ``(filter, update)`` of a ``pymongo.UpdateOne``; only ``$set`` by ``_id`` is supported.
+    """
+    query, update = getattr(request, "_filter", None), getattr(request, "_doc", None)
+    if query is None or set(query) != {"_id"} or not update or set(update) != {"$set"}:
+        raise NotImplementedError("Local store bulk_write only supports UpdateOne({'_id': ...}, {'$set': ...})")
+    if getattr(request, "_upsert", False):
+        raise NotImplementedError("Local store bulk_write does not support upserts")
+    return query, update
+
+
+class LocalBulkWriteResult:
+    def __init__(self, matched_count: int, modified_count: int):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_count = 0
+
+
+class LocalCursor:
+    """
+    Lazily evaluated result of ``LocalCollection.find`` supporting ``sort``/``limit``.
+    """
+
+    def __init__(self, collection: "LocalCollection", query: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key: str, direction: int = 1) -> "LocalCursor":
+        self._sort = (key, direction)
+        return self
+
+    def limit(self, count: int) -> "LocalCursor":
+        self._limit = count
+        return self
+
+    def __iter__(self) -> Iterator[dict]:
+        documents = (doc for doc in self._collection._scan() if _matches(doc, self._query))
+        if self._sort:
+            key, direction = self._sort
+            documents = iter(sorted(documents, key=lambda doc: doc.get(key), reverse=direction < 0))
+        for count, document in enumerate(documents, start=1):
+            yield _project(document, self._projection)
+            if self._limit and count >= self._limit:
+                break
+
+
+class LocalCollection:
+    """
+    A collection stored as one JSON document per line. Reads are streamed, so
+    ``find()`` over tens of millions of documents runs in constant memory.
+
+    ``bulk_write`` appends its ``$set``s to an update log next to the file
+    instead of rewriting the file; reads apply the pending updates. The log is
+    folded into the file (compacted) when the collection is opened, on
+    ``close()``, and whenever it grows past half the size of the file, so the
+    rewrite cost is amortised over many micro-batches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.log_path = f"{path}.updates"
+        self.compact()
+
+    def _pending_updates(self) -> dict:
+        updates = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        updates.setdefault(entry["_id"], {}).update(entry["$set"])
+        return updates
+
+    def _scan(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        updates = self._pending_updates()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    document = json.loads(line)
+                    changes = updates.get(document.get("_id"))
+                    if changes:
+                        document.update(changes)
+                    yield document
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> LocalCursor:
+        return LocalCursor(self, filter, projection)
+
+    def count_documents(self, filter: Optional[dict] = None) -> int:
+        return sum(1 for doc in self._scan() if _matches(doc, filter))
+
+    def insert_many(self, documents: Iterable[dict], ordered: bool = True) -> int:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        count = 0
+        id_prefix = os.urandom(6).hex()
+        with open(self.path, "a", encoding="utf-8") as f:
+            for document in documents:
+                document = dict(document)
+                document.setdefault("_id", f"{id_prefix}-{count}")
+                f.write(json.dumps(document, default=str))
+                f.write("\n")
+                count += 1
+        return count
+
+    def bulk_write(self, requests: Iterable, ordered: bool = True) -> LocalBulkWriteResult:
+        """
+        Append ``UpdateOne`` requests to the update log (assumes a single writer).
+        Ids are not looked up in the collection file, so every distinct ``_id``
+        is reported as matched and modified; updates to missing ids are dropped
+        at compaction.
+        """
+        updates = {}
+        for request in requests:
+            query, update = _update_parts(request)
+            updates.setdefault(query["_id"], {}).update(update["$set"])
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            for document_id, changes in updates.items():
+                f.write(json.dumps({"_id": document_id, "$set": changes}, default=str))
+                f.write("\n")
+        if os.path.exists(self.path) and os.path.getsize(self.log_path) > os.path.getsize(self.path) // 2:
+            self.compact()
+        return LocalBulkWriteResult(len(updates), len(updates))
+
+    def compact(self) -> None:
+        """
+        Apply the update log to the collection file in one rewrite (the file is
+        replaced atomically) and remove the log.
+        """
+        if not os.path.exists(self.log_path):
+            return
+        if os.path.exists(self.path):
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for document in self._scan():
+                    f.write(json.dumps(document, default=str))
+                    f.write("\n")
+            os.replace(tmp_path, self.path)
+        # Removed only after the rewrite: replaying a log twice repeats the same $sets.
+        os.remove(self.log_path)
+
+    def close(self) -> None:
+        self.compact()
+
+    def drop(self) -> None:
+        for path in (self.path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class LocalDatabase:
+    def __init__(self, path: str):
+        self.path = path
+
+    def __getitem__(self, collection_name: str) -> LocalCollection:
+        return LocalCollection(os.path.join(self.path, f"{collection_name}.jsonl"))
+
+
+class LocalDocumentClient:
+    """
+    File-backed stand-in for ``pymongo.MongoClient`` used for offline development
+    and scale testing. Point ``MONGODB_URL`` at ``local://<directory>`` to use it;
+    each database is a sub-directory and each collection a JSONL file.
+
+    Only the subset of the pymongo API the project relies on is implemented.
+    """
+
+    def __init__(self, url: str):
+        try:
+            self.root_dir = url[len(LOCAL_URL_SCHEME):] if is_local_url(url) else url
+            os.makedirs(self.root_dir, exist_ok=True)
+            logging.info(f"🗂️ Using local document store at: {self.root_dir}")
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def __getitem__(self, database_name: str) -> LocalDatabase:
+        return LocalDatabase(os.path.join(self.root_dir, database_name))
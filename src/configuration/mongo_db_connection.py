@@ -1,21 +1,32 @@
 import pymongo
 import certifi
 import sys
-from src.constants import DATABASE_NAME, MONGODB_URL_key
+from src.constants import DATABASE_NAME, MONGODB_URL_key, MONGODB_MAX_POOL_SIZE
 from src.exception import USvisaException
 from src.logger import logging
+from src.configuration.local_document_store import LocalDocumentClient, is_local_url
 
 ca = certifi.where()
 
 class MongoDBClient:
     client = None
 
-    def __init__(self, database_name=DATABASE_NAME):
+    def __init__(self, database_name=DATABASE_NAME, max_pool_size: int = MONGODB_MAX_POOL_SIZE):
+        """
+        :param max_pool_size: connections kept by the shared client; only the first
+            ``MongoDBClient`` created in a process decides it.
+        """
         try:
             if MongoDBClient.client is None:
                 if MONGODB_URL_key is None:
                     raise ValueError("MongoDB URL is not set.")
-                MongoDBClient.client = pymongo.MongoClient(MONGODB_URL_key, tlsCAFile=ca)
+                if is_local_url(MONGODB_URL_key):
+                    # local://<dir> points at the file-backed stand-in used for offline scale tests
+                    MongoDBClient.client = LocalDocumentClient(MONGODB_URL_key)
+                else:
+                    MongoDBClient.client = pymongo.MongoClient(
+                        MONGODB_URL_key, tlsCAFile=ca, maxPoolSize=max_pool_size
+                    )
             self.client = MongoDBClient.client
             self.database = self.client[database_name]
             logging.info("✅ MongoDB connection successful.")
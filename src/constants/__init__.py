@@ -13,9 +13,16 @@ DATABASE_NAME = "stock_project"
 COLLECTION_NAME = "stocks"
 
 MONGODB_URL_key = os.getenv("MONGODB_URL")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+
+MLFLOW_TRACKING_URI = os.getenv(
+    "MLFLOW_TRACKING_URI", "https://dagshub.com/shobanjatoth/News-dashboard-MLops.mlflow"
+)
+MLFLOW_EXPERIMENT_NAME = "LoanRecoveryExperiment"
 
 PIPELINE_NAME: str = "src"
 ARTIFACT_DIR: str = "artifact"
+RUN_MANIFEST_FILE_NAME: str = "run_manifest.json"
 
 FILE_NAME: str = "loan.csv"
 
@@ -37,6 +44,20 @@ DATA_TRANSFORMATION_DIR = "data_transformation"
 TRANSFORMED_DATA_FILE = "transformed_data.csv"
 TRANSFORMER_OBJECT_FILE = "transformer.pkl"
 TRANSFORMED_TRAIN_FILE = "transformed_train.npy"
+TRANSFORMED_SPLIT_FILE = "transformed_split.npy"
+TRANSFORMED_LOAN_TYPE_FILE = "transformed_loan_type.npy"  # Loan_Type per matrix row, for per-type models
+LOAN_TYPE_COLUMN = "Loan_Type"
+DRIFT_REFERENCE_FILE = "drift_reference.json"  # training-time feature/score sketches for drift monitoring
+SIMILAR_CASES_FILE = "similar_cases.pkl"  # nearest-neighbour index over historical loans
+SIMILAR_POINTS_FILE = "similar_points.npy"  # scaled points the index is built from (chunked mode, removed after)
+SEGMENTS_FILE = "segments.json"  # borrower segment centroids, for portfolio aggregates at serving time
+SIMILAR_CASE_COLUMNS = ["Loan_ID", "Loan_Type", "Recovery_Status", "Collection_Method"]  # returned per match
+SIMILAR_CASES_EXACT_MAX_ROWS = 200_000  # larger books get the approximate (inverted-file) index
+TEST_SPLIT_PERCENT = 20  # share of Loan_ID hash buckets held out in chunked mode
+
+# Dtype policy
+MODEL_INPUT_DTYPE = "float32"  # transformed matrices, test arrays
+MAX_CATEGORY_RATIO = 0.5       # non-schema strings become categoricals below this unique/rows ratio
 
 # Model Trainer
 
@@ -45,11 +66,35 @@ MODEL_FILE_NAME = "risk_classifier.pkl"
 TEST_ARRAY_FILE_NAME = "test.npy"         # ✅ (optional but recommended)
 REPORT_FILE_NAME = "report.txt"           # If you use text report (not YAML)
 
+# Per-loan-type models
+LOAN_TYPE_MODELS_DIR = "loan_type_models"
+LOAN_TYPE_MODELS_INDEX_FILE = "loan_type_models.json"
+LOAN_TYPE_MIN_TRAIN_ROWS = 200  # smaller loan types are served by the global model
+LOAN_TYPE_SPLIT_FILE = "loan_type_split.npy"  # held-out mask when the transformation wrote none
+
 
 # Model Evaluation
 # -------------------------------
 MODEL_EVALUATION_FILE_NAME = "report.yaml"
 
+# Profiling
+PROFILING_DIR_NAME = "profiling"
+PROFILE_REPORT_FILE_NAME = "profile.json"
+
+# Rescoring worker
+RESCORING_DIR_NAME = "rescoring"
+RESCORING_STATE_FILE_NAME = "rescoring_state.json"
+# Book-wide portfolio totals written by the worker and read by /portfolio/summary
+PORTFOLIO_SNAPSHOT_PATH = os.getenv(
+    "PORTFOLIO_SNAPSHOT_PATH", os.path.join(ARTIFACT_DIR, RESCORING_DIR_NAME, "portfolio_snapshot.npz")
+)
+RESCORING_BATCH_SIZE = 500
+RESCORING_MAX_BATCH_WAIT_S = 1.0     # flush a partial micro-batch after this long
+RESCORING_POLL_INTERVAL_S = 5.0
+RESCORING_WATERMARK_LAG_S = 60.0    # polling re-reads this window, for loans committed after a pass read past them
+UPDATED_AT_FIELD = "Updated_At"      # set by whoever changes a loan; polled when change streams are unavailable
+SCORED_AT_FIELD = "Scored_At"
+
 
 
 
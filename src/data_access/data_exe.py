@@ -1,31 +1,36 @@
 import sys
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Iterator, Optional
 from src.configuration.mongo_db_connection import MongoDBClient
+from src.utils.dtype_policy import DtypePolicy
 from src.exception import USvisaException
 from src.logger import logging
 
 class USvisaData:
     """
     Provides functionality to extract data from MongoDB and return it as a Pandas DataFrame.
+    Frames come back with the compact dtypes of ``dtype_policy`` (schema.yaml by default).
     """
 
-    def __init__(self):
+    def __init__(self, dtype_policy: Optional[DtypePolicy] = None):
         try:
             self.mongo_client = MongoDBClient()
+            self.dtype_policy = dtype_policy or DtypePolicy.from_schema()
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def _get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name:
+            return self.mongo_client.client[database_name][collection_name]
+        return self.mongo_client.database[collection_name]
+
     def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
         """
         Export the specified MongoDB collection to a Pandas DataFrame.
         """
         try:
-            if database_name:
-                collection = self.mongo_client.client[database_name][collection_name]
-            else:
-                collection = self.mongo_client.database[collection_name]
+            collection = self._get_collection(collection_name, database_name)
 
             df = pd.DataFrame(list(collection.find()))
             logging.info(f"📊 Extracted {len(df)} records from collection '{collection_name}'")
@@ -33,6 +38,28 @@ class USvisaData:
             if "_id" in df.columns:
                 df.drop(columns=["_id"], inplace=True)
             df.replace({"na": np.nan}, inplace=True)
-            return df
+            return self.dtype_policy.apply(df)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def export_collection_in_chunks(self, collection_name: str, chunk_size: int,
+                                    database_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream the specified MongoDB collection as DataFrames of at most ``chunk_size``
+        rows, so collections larger than memory can be exported.
+        """
+        try:
+            collection = self._get_collection(collection_name, database_name)
+            batch, total = [], 0
+            for document in collection.find({}, {"_id": 0}):
+                batch.append(document)
+                if len(batch) >= chunk_size:
+                    total += len(batch)
+                    yield self.dtype_policy.apply(pd.DataFrame(batch).replace({"na": np.nan}))
+                    batch = []
+            if batch:
+                total += len(batch)
+                yield self.dtype_policy.apply(pd.DataFrame(batch).replace({"na": np.nan}))
+            logging.info(f"📊 Streamed {total} records from collection '{collection_name}'")
         except Exception as e:
             raise USvisaException(e, sys)
@@ -0,0 +1,213 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional
+
+from src.exception import USvisaException
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file
+from src.constants import SCHEMA_FILE_PATH, DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME
+
+
+# Column order of the loan.csv export produced by DataIngestion.
+LOAN_COLUMNS = [
+    "Borrower_ID", "Age", "Gender", "Employment_Type", "Monthly_Income", "Num_Dependents",
+    "Loan_ID", "Loan_Amount", "Loan_Tenure", "Interest_Rate", "Loan_Type", "Collateral_Value",
+    "Outstanding_Loan_Amount", "Monthly_EMI", "Payment_History", "Num_Missed_Payments",
+    "Days_Past_Due", "Recovery_Status", "Collection_Attempts", "Collection_Method",
+    "Legal_Action_Taken",
+]
+
+# Schema dtype names -> pandas dtypes used for the generated frames.
+SCHEMA_DTYPES = {"int": "int64", "float": "float64", "str": "object"}
+
+# Columns sampled from observed level frequencies rather than numeric ranges.
+CATEGORICAL_COLUMNS = [
+    "Gender", "Employment_Type", "Loan_Type", "Payment_History", "Recovery_Status",
+    "Collection_Method", "Legal_Action_Taken", "Loan_Tenure",
+]
+
+# Level frequencies observed in the 500-row loan.csv sample.
+DEFAULT_CATEGORY_LEVELS = {
+    "Gender": {"Male": 0.622, "Female": 0.378},
+    "Employment_Type": {"Salaried": 0.584, "Self-Employed": 0.31, "Business Owner": 0.106},
+    "Loan_Type": {"Personal": 0.44, "Home": 0.288, "Auto": 0.174, "Business": 0.098},
+    "Payment_History": {"On-Time": 0.612, "Delayed": 0.28, "Missed": 0.108},
+    "Recovery_Status": {"Fully Recovered": 0.592, "Partially Recovered": 0.308, "Written Off": 0.1},
+    "Collection_Method": {"Calls": 0.258, "Legal Notice": 0.252, "Debt Collectors": 0.25, "Settlement Offer": 0.24},
+    "Legal_Action_Taken": {"No": 0.952, "Yes": 0.048},
+    "Loan_Tenure": {60: 0.224, 48: 0.218, 36: 0.192, 72: 0.158, 24: 0.118, 12: 0.09},
+}
+
+
+class SyntheticLoanDataGenerator:
+    """
+    Generates loan records with the same columns, dtypes and value ranges as loan.csv.
+
+    Numeric ranges and the relationships between them (EMI = outstanding / tenure,
+    no collateral on personal loans, missed payments driven by payment history)
+    follow the sample export, so the pipeline sees realistic data at any scale.
+    """
+
+    def __init__(self, seed: int = 42, category_levels: Optional[dict] = None,
+                 schema_file_path: str = SCHEMA_FILE_PATH):
+        try:
+            self.seed = seed
+            self.category_levels = category_levels or DEFAULT_CATEGORY_LEVELS
+            self.column_dtypes = read_yaml_file(schema_file_path)["loan_recovery"]["column_dtypes"]
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @classmethod
+    def from_reference(cls, reference_csv_path: str, seed: int = 42, **kwargs) -> "SyntheticLoanDataGenerator":
+        """
+        Build a generator whose categorical levels and frequencies are taken from
+        an existing export such as the ingested loan.csv.
+        """
+        try:
+            reference = pd.read_csv(reference_csv_path, usecols=CATEGORICAL_COLUMNS)
+            category_levels = {
+                column: reference[column].value_counts(normalize=True).to_dict()
+                for column in CATEGORICAL_COLUMNS
+            }
+            logging.info(f"🧬 Loaded categorical levels from reference data: {reference_csv_path}")
+            return cls(seed=seed, category_levels=category_levels, **kwargs)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def conform_to_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the schema's ``column_dtypes`` columns to the declared int/float/str types.
+        """
+        return df.astype({column: SCHEMA_DTYPES[dtype] for column, dtype in self.column_dtypes.items()})
+
+    def _choice(self, rng: np.random.Generator, column: str, n_rows: int) -> np.ndarray:
+        levels = self.category_levels[column]
+        values = np.array(list(levels.keys()))
+        probs = np.array(list(levels.values()), dtype=float)
+        return values[rng.choice(len(values), size=n_rows, p=probs / probs.sum())]
+
+    def generate(self, n_rows: int, start_index: int = 1) -> pd.DataFrame:
+        """
+        Generate ``n_rows`` records whose IDs start at ``start_index``.
+
+        The RNG is seeded from ``(seed, start_index)`` so chunks are reproducible
+        independently of how a large dataset is split.
+        """
+        try:
+            rng = np.random.default_rng([self.seed, start_index])
+            ids = np.arange(start_index, start_index + n_rows).astype(str)
+
+            loan_type = self._choice(rng, "Loan_Type", n_rows)
+            loan_amount = rng.integers(50_000, 2_000_000, size=n_rows)
+            loan_tenure = self._choice(rng, "Loan_Tenure", n_rows).astype(np.int64)
+            collateral = np.where(
+                loan_type == "Personal", 0.0, loan_amount * rng.uniform(0.5, 1.5, size=n_rows)
+            )
+            outstanding = loan_amount * rng.uniform(0.1, 1.0, size=n_rows)
+
+            payment_history = self._choice(rng, "Payment_History", n_rows)
+            missed_rate = np.where(payment_history == "Missed", 5.5, 1.5)
+            days_past_due = np.where(
+                rng.random(n_rows) < 0.24, 0, rng.integers(1, 181, size=n_rows)
+            )
+
+            df = pd.DataFrame({
+                "Borrower_ID": np.char.add("BRW_", ids),
+                "Age": rng.integers(21, 65, size=n_rows),
+                "Gender": self._choice(rng, "Gender", n_rows),
+                "Employment_Type": self._choice(rng, "Employment_Type", n_rows),
+                "Monthly_Income": rng.integers(15_000, 250_000, size=n_rows),
+                "Num_Dependents": rng.integers(0, 4, size=n_rows),
+                "Loan_ID": np.char.add("LN_", ids),
+                "Loan_Amount": loan_amount,
+                "Loan_Tenure": loan_tenure,
+                "Interest_Rate": np.round(rng.uniform(5.0, 18.0, size=n_rows), 2),
+                "Loan_Type": loan_type,
+                "Collateral_Value": collateral,
+                "Outstanding_Loan_Amount": outstanding,
+                "Monthly_EMI": np.round(outstanding / loan_tenure, 2),
+                "Payment_History": payment_history,
+                "Num_Missed_Payments": np.clip(rng.poisson(missed_rate), 0, 12),
+                "Days_Past_Due": days_past_due,
+                "Recovery_Status": self._choice(rng, "Recovery_Status", n_rows),
+                "Collection_Attempts": np.clip(rng.poisson(3.0, size=n_rows), 0, 10),
+                "Collection_Method": self._choice(rng, "Collection_Method", n_rows),
+                "Legal_Action_Taken": self._choice(rng, "Legal_Action_Taken", n_rows),
+            }, columns=LOAN_COLUMNS)
+            return self.conform_to_schema(df)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def iter_chunks(self, n_rows: int, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Yield ``n_rows`` records as consecutive DataFrames of at most ``chunk_size`` rows.
+        """
+        logging.info(f"🧬 Generating {n_rows} synthetic loan records in chunks of {chunk_size}")
+        for start in range(0, n_rows, chunk_size):
+            yield self.generate(min(chunk_size, n_rows - start), start_index=start + 1)
+
+    def write_csv(self, file_path: str, n_rows: int, chunk_size: int = 100_000) -> str:
+        """
+        Stream ``n_rows`` records to a CSV file without holding them all in memory.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            for index, chunk in enumerate(self.iter_chunks(n_rows, chunk_size)):
+                chunk.to_csv(file_path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+            logging.info(f"✅ Wrote {n_rows} synthetic records to: {file_path}")
+            return file_path
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def load_into_collection(self, collection, n_rows: int, chunk_size: int = 100_000) -> int:
+        """
+        Stream ``n_rows`` records into a pymongo (or local stand-in) collection.
+        """
+        try:
+            inserted = 0
+            for chunk in self.iter_chunks(n_rows, chunk_size):
+                collection.insert_many(chunk.to_dict("records"), ordered=False)
+                inserted += len(chunk)
+            logging.info(f"✅ Inserted {inserted} synthetic records into collection")
+            return inserted
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic loan records at scale.")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--reference", default=None,
+                        help="Existing loan.csv to take categorical levels from.")
+    parser.add_argument("--csv", default=None, help="Write the records to this CSV file.")
+    parser.add_argument("--mongo-url", default=None,
+                        help="Insert into this MongoDB (or local://<dir> stand-in) instead.")
+    parser.add_argument("--database", default=DATABASE_NAME)
+    parser.add_argument("--collection", default=DATA_INGESTION_COLLECTION_NAME)
+    args = parser.parse_args(argv)
+
+    generator = (
+        SyntheticLoanDataGenerator.from_reference(args.reference, seed=args.seed)
+        if args.reference else SyntheticLoanDataGenerator(seed=args.seed)
+    )
+    if args.csv:
+        generator.write_csv(args.csv, args.rows, args.chunk_size)
+    if args.mongo_url:
+        from src.configuration.local_document_store import LocalDocumentClient, is_local_url
+        if is_local_url(args.mongo_url):
+            client = LocalDocumentClient(args.mongo_url)
+        else:
+            import pymongo
+            client = pymongo.MongoClient(args.mongo_url)
+        generator.load_into_collection(client[args.database][args.collection], args.rows, args.chunk_size)
+    if not args.csv and not args.mongo_url:
+        parser.error("one of --csv or --mongo-url is required")
+
+
+if __name__ == "__main__":
+    main()
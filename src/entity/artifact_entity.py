@@ -21,6 +21,11 @@ class DataTransformationArtifact:
     transformed_data_path: str
     transformer_object_path: str
     transformed_train_file_path: str
+    split_file_path: str = None
+    loan_type_file_path: str = None
+    drift_reference_file_path: str = None
+    similar_cases_file_path: str = None
+    segments_file_path: str = None
 
 
 
@@ -32,6 +37,12 @@ class ModelTrainerArtifact:
     roc_auc: float
 
 
+@dataclass
+class LoanTypeModelsArtifact:
+    index_file_path: str
+    loan_types: list
+
+
 @dataclass
 class ModelEvaluationArtifact:
     report_file_path: str
@@ -39,6 +50,12 @@ class ModelEvaluationArtifact:
     roc_auc: float
 
 
+@dataclass
+class ProfilingArtifact:
+    report_file_path: str
+    total_wall_s: float
+
+
 
 
 
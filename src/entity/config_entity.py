@@ -22,6 +22,7 @@ class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
     artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
     timestamp: str = TIMESTAMP
+    chunk_size: int = None  # ✅ rows per chunk for out-of-core training; None = in memory
 
 @dataclass
 class DataIngestionConfig:
@@ -62,6 +63,13 @@ class DataTransformationConfig:
     transformed_data_path: str = None
     transformer_object_path: str = None
     transformed_train_file_path: str = None  # ✅ For .npy
+    split_file_path: str = None  # ✅ Loan_ID-hash test mask (chunked mode)
+    loan_type_file_path: str = None  # ✅ Loan_Type per row of the training matrix
+    drift_reference_file_path: str = None  # ✅ feature sketches for drift monitoring
+    similar_cases_file_path: str = None  # ✅ nearest-neighbour index of historical loans
+    similar_points_file_path: str = None  # ✅ memory-mapped index input (chunked mode)
+    segments_file_path: str = None  # ✅ segment centroids for serving-time portfolio aggregates
+    similar_cases_mode: str = "auto"  # ✅ "exact" (KD-tree), "approximate" or "auto" by row count
 
     def __post_init__(self):
         self.data_transformation_dir = os.path.join(
@@ -76,6 +84,24 @@ class DataTransformationConfig:
         self.transformed_train_file_path = os.path.join(
             self.data_transformation_dir, TRANSFORMED_TRAIN_FILE
         )
+        self.split_file_path = os.path.join(
+            self.data_transformation_dir, TRANSFORMED_SPLIT_FILE
+        )
+        self.loan_type_file_path = os.path.join(
+            self.data_transformation_dir, TRANSFORMED_LOAN_TYPE_FILE
+        )
+        self.drift_reference_file_path = os.path.join(
+            self.data_transformation_dir, DRIFT_REFERENCE_FILE
+        )
+        self.similar_cases_file_path = os.path.join(
+            self.data_transformation_dir, SIMILAR_CASES_FILE
+        )
+        self.similar_points_file_path = os.path.join(
+            self.data_transformation_dir, SIMILAR_POINTS_FILE
+        )
+        self.segments_file_path = os.path.join(
+            self.data_transformation_dir, SEGMENTS_FILE
+        )
 # === config_entity.py ===
 
 
@@ -87,6 +113,11 @@ class ModelTrainerConfig:
     model_path: str = None
     test_array_path: str = None
     transformed_train_file_path: str = None
+    split_file_path: str = None
+    drift_reference_file_path: str = None  # ✅ Risk_Score reference sketch is added here
+    transformer_object_path: str = None  # ✅ its output columns are the model's feature order
+    n_jobs: int = None  # ✅ processes for per-chunk sub-forests (chunked mode)
+    mlflow_run_id: str = None  # ✅ run to log to; None uses the active run
 
     def __post_init__(self):
         self.model_trainer_dir = os.path.join(
@@ -104,6 +135,59 @@ class ModelTrainerConfig:
 
 
 
+@dataclass
+class LoanTypeTrainerConfig:
+    training_pipeline_config: 'TrainingPipelineConfig'
+    min_train_rows: int = LOAN_TYPE_MIN_TRAIN_ROWS
+    n_jobs: int = None  # ✅ processes training loan types in parallel
+    mlflow_run_id: str = None  # ✅ run to log to; None uses the active run
+    models_dir: str = None
+    index_file_path: str = None
+    split_file_path: str = None  # ✅ train_test_split mask, written in in-memory mode
+
+    def __post_init__(self):
+        self.models_dir = os.path.join(
+            self.training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR, LOAN_TYPE_MODELS_DIR
+        )
+        self.index_file_path = os.path.join(self.models_dir, LOAN_TYPE_MODELS_INDEX_FILE)
+        self.split_file_path = os.path.join(
+            self.training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR, LOAN_TYPE_SPLIT_FILE
+        )
+
+
 @dataclass
 class ModelEvaluationConfig:
     report_file_path: str
+    chunk_size: int = None
+    mlflow_run_id: str = None  # ✅ run to log to; None uses the active run
+
+
+@dataclass
+class ProfilingConfig:
+    training_pipeline_config: 'TrainingPipelineConfig'
+    use_tracemalloc: bool = True
+    use_cprofile: bool = False
+    profiling_dir: str = None
+    report_file_path: str = None
+
+    def __post_init__(self):
+        self.profiling_dir = os.path.join(
+            self.training_pipeline_config.artifact_dir, PROFILING_DIR_NAME
+        )
+        self.report_file_path = os.path.join(self.profiling_dir, PROFILE_REPORT_FILE_NAME)
+
+
+@dataclass
+class RescoringConfig:
+    collection_name: str = DATA_INGESTION_COLLECTION_NAME
+    mode: str = "auto"  # ✅ "change_stream", "poll", or "auto" (change stream when the server supports it)
+    batch_size: int = RESCORING_BATCH_SIZE
+    max_batch_wait_s: float = RESCORING_MAX_BATCH_WAIT_S
+    poll_interval_s: float = RESCORING_POLL_INTERVAL_S
+    watermark_lag_s: float = RESCORING_WATERMARK_LAG_S  # ✅ the watermark stays this far behind each pass
+    max_pool_size: int = MONGODB_MAX_POOL_SIZE
+    updated_at_field: str = UPDATED_AT_FIELD
+    scored_at_field: str = SCORED_AT_FIELD
+    model_artifact_dir: str = None  # ✅ artifact/<ts> to score with; None = latest run
+    state_file_path: str = os.path.join(ARTIFACT_DIR, RESCORING_DIR_NAME, RESCORING_STATE_FILE_NAME)
+    portfolio_snapshot_path: str = PORTFOLIO_SNAPSHOT_PATH  # ✅ the worker's portfolio totals, shared with serving
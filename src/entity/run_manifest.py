@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import threading
+from dataclasses import asdict, fields
+from datetime import datetime
+from typing import Optional
+
+from src.entity import artifact_entity
+from src.exception import USvisaException
+from src.logger import logging
+
+
+class RunManifest:
+    """
+    Records, per pipeline stage, whether it completed and the artifact dataclass
+    it returned, so an interrupted run can resume from the first incomplete stage.
+
+    Stored as JSON next to the stage directories (``artifact/<ts>/run_manifest.json``)
+    and rewritten atomically after every change.
+    """
+
+    def __init__(self, manifest_file_path: str):
+        try:
+            self.manifest_file_path = manifest_file_path
+            self.content = {"stages": {}}
+            # Stages may finish concurrently (see StageScheduler).
+            self._lock = threading.Lock()
+            if os.path.exists(manifest_file_path):
+                with open(manifest_file_path, "r") as f:
+                    self.content = json.load(f)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _write(self) -> None:
+        # Callers hold ``_lock`` and changed ``content`` under it, so no other stage
+        # can modify the dict while it is serialised or interleave its own write.
+        data = json.dumps(self.content, indent=2)
+        os.makedirs(os.path.dirname(self.manifest_file_path), exist_ok=True)
+        tmp_path = f"{self.manifest_file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, self.manifest_file_path)
+
+    @property
+    def mlflow_run_id(self) -> Optional[str]:
+        return self.content.get("mlflow_run_id")
+
+    @mlflow_run_id.setter
+    def mlflow_run_id(self, run_id: str) -> None:
+        with self._lock:
+            self.content["mlflow_run_id"] = run_id
+            self._write()
+
+    def is_completed(self, stage_name: str) -> bool:
+        """
+        A stage counts as completed only if it was recorded as such and every
+        ``*_path`` in its artifact still exists on disk.
+        """
+        stage = self.content["stages"].get(stage_name)
+        if not stage or stage.get("status") != "completed":
+            return False
+        paths = [value for key, value in stage["artifact"].items() if key.endswith("_path") and value]
+        return all(os.path.exists(path) for path in paths)
+
+    def get_artifact(self, stage_name: str):
+        stage = self.content["stages"][stage_name]
+        artifact_cls = getattr(artifact_entity, stage["artifact_type"])
+        field_names = {f.name for f in fields(artifact_cls)}
+        return artifact_cls(**{k: v for k, v in stage["artifact"].items() if k in field_names})
+
+    def mark_completed(self, stage_name: str, artifact) -> None:
+        with self._lock:
+            self.content["stages"][stage_name] = {
+                "status": "completed",
+                "artifact_type": type(artifact).__name__,
+                "artifact": asdict(artifact),
+                "completed_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._write()
+        logging.info(f"📌 Stage '{stage_name}' checkpointed in {self.manifest_file_path}")
+
+    def mark_failed(self, stage_name: str, error: str) -> None:
+        with self._lock:
+            stage = self.content["stages"].setdefault(stage_name, {})
+            stage.update({
+                "status": "failed",
+                "error": error,
+                "failed_at": datetime.now().isoformat(timespec="seconds"),
+            })
+            self._write()
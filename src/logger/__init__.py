@@ -1,11 +1,22 @@
+import atexit
 import logging
 import os
+import queue
+import random
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 
 # Constants
 LOG_DIR = "logs"
 LOG_FILE = "app.log"
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] - %(message)s"
+
+# Levels and sampling, e.g. LOG_MODULE_LEVELS="prediction_pipeline=WARNING,model_cache=DEBUG"
+# and LOG_SAMPLE_RATES="prediction_pipeline=0.01" (keys are module names, as in %(module)s).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_MODULE_LEVELS = os.getenv("LOG_MODULE_LEVELS", "")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
 
 # Ensure log directory exists (even in Docker)
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -13,13 +24,81 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # Final log file path
 LOG_PATH = os.path.join(LOG_DIR, LOG_FILE)
 
-# Basic configuration
-logging.basicConfig(
-    filename=LOG_PATH,
-    filemode="a",
-    format="%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] - %(message)s",
-    level=logging.INFO
-)
 
-# You can now use: from src.logger import logging
+def _parse_mapping(spec: str, cast) -> dict:
+    mapping = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        module, _, value = item.partition("=")
+        mapping[module.strip()] = cast(value.strip())
+    return mapping
+
+
+def _level(value) -> int:
+    return value if isinstance(value, int) else logging.getLevelName(str(value).upper())
+
+
+class ModuleFilter(logging.Filter):
+    """
+    Per-module levels and sampling for records sent to the root logger. Below
+    WARNING, a module with a sample rate keeps only that fraction of its records
+    (e.g. per-request inference logs); warnings and errors are always kept.
+    """
+
+    def __init__(self, default_level, module_levels: dict = None, sample_rates: dict = None):
+        super().__init__()
+        self.default_level = _level(default_level)
+        self.module_levels = {module: _level(level) for module, level in (module_levels or {}).items()}
+        self.sample_rates = dict(sample_rates or {})
+
+    def set_level(self, module: str, level) -> None:
+        self.module_levels[module] = _level(level)
+        _sync_root_level()
+
+    def set_sample_rate(self, module: str, rate: float) -> None:
+        self.sample_rates[module] = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.module_levels.get(record.module, self.default_level):
+            return False
+        rate = self.sample_rates.get(record.module)
+        if rate is not None and record.levelno < logging.WARNING and random.random() >= rate:
+            return False
+        return True
 
+
+module_filter = ModuleFilter(LOG_LEVEL, _parse_mapping(LOG_MODULE_LEVELS, str), _parse_mapping(LOG_SAMPLE_RATES, float))
+
+
+def _sync_root_level() -> None:
+    # The root level must let through the most verbose module; ModuleFilter does the rest.
+    logging.getLogger().setLevel(min([module_filter.default_level, *module_filter.module_levels.values()]))
+
+
+def start_queue_logging(target: logging.Handler) -> QueueListener:
+    """
+    Route all root-logger records through a queue to ``target``, which is then
+    written by a background thread instead of the thread that logged. The stock
+    ``QueueHandler`` still formats each message on the calling thread, so later
+    mutation of the arguments cannot change what gets logged.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(module_filter)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _sync_root_level()
+
+    listener = QueueListener(log_queue, target)
+    listener.start()
+    return listener
+
+
+file_handler = logging.FileHandler(LOG_PATH, mode="a")
+file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+listener = start_queue_logging(file_handler)
+# Drain pending records on interpreter exit.
+atexit.register(listener.stop)
+
+# You can now use: from src.logger import logging
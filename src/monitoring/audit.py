@@ -0,0 +1,239 @@
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.exception import USvisaException
+from src.logger import logging
+from src.utils.recovery_strategy import assign_recovery_strategies
+
+
+AUDIT_BATCH_SIZE = 1000  # records per row group
+AUDIT_FLUSH_INTERVAL_S = 2.0  # a partial batch is written after this long
+AUDIT_MAX_ROWS_PER_FILE = 1_000_000
+AUDIT_MAX_FILE_AGE_S = 3600.0
+AUDIT_MAX_QUEUE_SIZE = 100_000  # enqueued requests; beyond this, producers wait for the writer
+AUDIT_COMPRESSION = "zstd"
+AUDIT_FILE_SUFFIX = ".parquet"
+IN_PROGRESS_SUFFIX = ".inprogress"
+
+AUDIT_SCHEMA = pa.schema([
+    ("request_id", pa.string()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("model_version", pa.string()),
+    ("model", pa.string()),
+    ("inputs", pa.string()),  # the request as one JSON object, as in a requests .jsonl
+    ("Risk_Score", pa.float64()),
+    ("Predicted_High_Risk", pa.int8()),
+    ("Recovery_Strategy", pa.string()),
+])
+
+_FLUSH = object()
+_STOP = object()
+
+
+class AuditLog:
+    """
+    Records every scored request (inputs, model version, score and recovery
+    strategy) to rotated, zstd-compressed Parquet files under ``audit_dir``.
+
+    Registered as an observer of ``PredictionPipeline``: the request thread only
+    enqueues a copy of its input and result; a background thread serialises
+    them and writes one row group per ``batch_size`` records (or every
+    ``flush_interval_s``). Files are written as ``*.parquet.inprogress`` and
+    renamed when rotated, so readers only ever see complete files. ``close()``
+    (also run at interpreter exit) drains the queue and finalises the open file.
+    """
+
+    def __init__(self, audit_dir: str, model_version: str,
+                 model_name_for: Optional[Callable[[Optional[str]], str]] = None,
+                 batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval_s: float = AUDIT_FLUSH_INTERVAL_S,
+                 max_rows_per_file: int = AUDIT_MAX_ROWS_PER_FILE,
+                 max_file_age_s: float = AUDIT_MAX_FILE_AGE_S,
+                 max_queue_size: int = AUDIT_MAX_QUEUE_SIZE,
+                 compression: str = AUDIT_COMPRESSION):
+        """
+        :param model_version: the training run being served (its ``artifact/<ts>`` name).
+        :param model_name_for: maps a request's ``Loan_Type`` to the model that scored it.
+        """
+        try:
+            os.makedirs(audit_dir, exist_ok=True)
+            self.audit_dir = audit_dir
+            self.model_version = model_version
+            self.model_name_for = model_name_for or (lambda loan_type: "global")
+            self.batch_size = batch_size
+            self.flush_interval_s = flush_interval_s
+            self.max_rows_per_file = max_rows_per_file
+            self.max_file_age_s = max_file_age_s
+            self.compression = compression
+            self.stats = {"enqueued": 0, "written": 0, "files": 0, "errors": 0}
+
+            self._queue = queue.Queue(maxsize=max_queue_size)
+            self._writer = None
+            self._file_path = None
+            self._file_rows = 0
+            self._file_opened = 0.0
+            self._closed = False
+            self._lock = threading.Lock()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+            logging.info(f"🧾 Auditing predictions to: {audit_dir}")
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    # --- request thread -------------------------------------------------
+
+    def observe_record(self, record: dict, result: dict) -> None:
+        self._queue.put((datetime.now(timezone.utc), dict(record), dict(result)))
+        self.stats["enqueued"] += 1
+
+    def observe_batch(self, input_df: pd.DataFrame, result_df: pd.DataFrame) -> None:
+        # Copied: the caller may reuse or modify its frames before the writer gets to them.
+        results = result_df[["Risk_Score", "Predicted_High_Risk"]].copy()
+        self._queue.put((datetime.now(timezone.utc), input_df.copy(), results))
+        self.stats["enqueued"] += len(input_df)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until everything enqueued so far has been written. Returns at once
+        after ``close()``, which already drained the queue.
+        """
+        done = threading.Event()
+        with self._lock:
+            if self._closed:
+                return
+            self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+
+    # --- writer thread --------------------------------------------------
+
+    def _rows(self, timestamp, inputs, results) -> dict:
+        if isinstance(inputs, pd.DataFrame):
+            records = inputs.to_dict("records")
+            scores = results["Risk_Score"].to_numpy()
+            flags = results["Predicted_High_Risk"].tolist()
+        else:
+            records, scores, flags = [inputs], [results["Risk_Score"]], [results["Predicted_High_Risk"]]
+        return {
+            "request_id": [uuid.uuid4().hex for _ in records],
+            "timestamp": [timestamp] * len(records),
+            "model_version": [self.model_version] * len(records),
+            "model": [self.model_name_for(record.get("Loan_Type")) for record in records],
+            "inputs": [json.dumps(record, default=str) for record in records],
+            "Risk_Score": [float(score) for score in scores],
+            "Predicted_High_Risk": [int(flag) for flag in flags],
+            "Recovery_Strategy": list(assign_recovery_strategies(scores)),
+        }
+
+    def _run(self) -> None:
+        pending, n_pending = [], 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                item = None
+
+            marker = item[0] if item is not None else None
+            if item is not None and marker is not _FLUSH and marker is not _STOP:
+                pending.append(self._rows(*item))
+                n_pending += len(pending[-1]["request_id"])
+
+            due = time.monotonic() - last_flush >= self.flush_interval_s
+            if n_pending and (n_pending >= self.batch_size or due or marker is _FLUSH or marker is _STOP):
+                self._write(pending)
+                pending, n_pending = [], 0
+                last_flush = time.monotonic()
+            if self._writer is not None and (marker is _STOP
+                                             or time.monotonic() - self._file_opened >= self.max_file_age_s):
+                self._rotate()
+
+            if marker is _FLUSH:
+                item[1].set()
+            elif marker is _STOP:
+                return
+
+    def _write(self, pending: list) -> None:
+        try:
+            columns = {name: [value for rows in pending for value in rows[name]] for name in AUDIT_SCHEMA.names}
+            table = pa.Table.from_pydict(columns, schema=AUDIT_SCHEMA)
+            if self._writer is None:
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+                self._file_path = os.path.join(
+                    self.audit_dir, f"audit-{stamp}-{os.getpid()}-{self.stats['files']:04d}{AUDIT_FILE_SUFFIX}"
+                )
+                self._writer = pq.ParquetWriter(self._file_path + IN_PROGRESS_SUFFIX, AUDIT_SCHEMA,
+                                                compression=self.compression)
+                self._file_rows, self._file_opened = 0, time.monotonic()
+            self._writer.write_table(table)
+            self._file_rows += table.num_rows
+            self.stats["written"] += table.num_rows
+            if self._file_rows >= self.max_rows_per_file:
+                self._rotate()
+        except Exception as e:
+            # Never take the writer thread down: count and report the lost batch.
+            self.stats["errors"] += 1
+            logging.error(f"❌ Failed to write {sum(len(rows['request_id']) for rows in pending)} audit records: {e}")
+
+    def _rotate(self) -> None:
+        self._writer.close()
+        os.replace(self._file_path + IN_PROGRESS_SUFFIX, self._file_path)
+        self.stats["files"] += 1
+        logging.info(f"🧾 Audit file complete: {self._file_path} ({self._file_rows} records)")
+        self._writer = None
+
+
+def audit_files(audit_dir: str) -> list:
+    """
+    Completed audit files in write order.
+    """
+    return sorted(glob.glob(os.path.join(audit_dir, f"audit-*{AUDIT_FILE_SUFFIX}")))
+
+
+def iter_audit_records(audit_dir: str, columns: Optional[list] = None) -> Iterator[dict]:
+    """
+    Stream audit records one row group at a time.
+    """
+    for file_path in audit_files(audit_dir):
+        parquet_file = pq.ParquetFile(file_path)
+        for i in range(parquet_file.num_row_groups):
+            yield from parquet_file.read_row_group(i, columns=columns).to_pylist()
+
+
+def export_requests_jsonl(audit_dir: str, output_path: str) -> int:
+    """
+    Write the audited requests' inputs as one JSON object per line, for replay.
+    Returns the number of requests written.
+    """
+    try:
+        count = 0
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            for record in iter_audit_records(audit_dir, columns=["inputs"]):
+                f.write(record["inputs"])
+                f.write("\n")
+                count += 1
+        return count
+    except Exception as e:
+        raise USvisaException(e, sys)
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.exception import USvisaException
+from src.logger import logging
+from src.monitoring.sketches import (
+    CategoricalSketch, HistogramSketch, binned_ks_statistic, population_stability_index, sketch_from_dict
+)
+
+
+SCORE_COLUMN = "Risk_Score"
+SCORE_BIN_EDGES = np.linspace(0.05, 0.95, 19)  # 20 equal-width score bins
+PSI_DRIFT_THRESHOLD = 0.2  # conventional "significant shift" level
+
+
+def build_feature_sketches(df: pd.DataFrame, column_dtypes: Dict[str, str], columns: Iterable[str]) -> dict:
+    """
+    Reference sketches for ``columns``: quantile bins for schema int/float columns,
+    level counts for str columns. Layouts come from ``df``, which also gets counted;
+    more data can be added with ``sketch.update``.
+    """
+    sketches = {}
+    for column in columns:
+        if column_dtypes.get(column) in ("int", "float"):
+            sketch = HistogramSketch.from_sample(df[column])
+        else:
+            sketch = CategoricalSketch.from_sample(df[column])
+        sketch.update(df[column])
+        sketches[column] = sketch
+    return sketches
+
+
+def score_sketch() -> HistogramSketch:
+    return HistogramSketch(SCORE_BIN_EDGES)
+
+
+def write_drift_reference(file_path: str, sketches: dict) -> str:
+    """
+    Write (or extend) the JSON drift reference with ``sketches`` keyed by column.
+    """
+    try:
+        content = {}
+        if os.path.exists(file_path):
+            with open(file_path, "r") as f:
+                content = json.load(f)
+        content.update({column: sketch.to_dict() for column, sketch in sketches.items()})
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(content, f)
+        return file_path
+    except Exception as e:
+        raise USvisaException(e, sys)
+
+
+class DriftMonitor:
+    """
+    Compares live traffic against the training-time reference sketches.
+
+    Every prediction updates one fixed-size sketch per feature and one for
+    ``Risk_Score`` with the same bins as the reference, so memory is O(features)
+    however many requests are seen; PSI and a binned KS statistic are computed
+    from the counts on demand. Registered as an observer of ``PredictionPipeline``.
+    """
+
+    def __init__(self, reference: dict):
+        try:
+            self.reference = {column: sketch_from_dict(content) for column, content in reference.items()}
+            self.live = {column: sketch.empty_like() for column, sketch in self.reference.items()}
+            self.feature_columns = [column for column in self.reference if column != SCORE_COLUMN]
+            self.n_observed = 0
+            self._lock = threading.Lock()
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @classmethod
+    def from_file(cls, file_path: str) -> "DriftMonitor":
+        with open(file_path, "r") as f:
+            monitor = cls(json.load(f))
+        logging.info(f"📡 Drift monitoring {len(monitor.reference)} columns against: {file_path}")
+        return monitor
+
+    def observe_record(self, record: dict, result: dict) -> None:
+        with self._lock:
+            for column in self.feature_columns:
+                self.live[column].update_one(record.get(column))
+            if SCORE_COLUMN in self.live:
+                self.live[SCORE_COLUMN].update_one(result[SCORE_COLUMN])
+            self.n_observed += 1
+
+    def observe_batch(self, input_df: pd.DataFrame, result_df: pd.DataFrame) -> None:
+        with self._lock:
+            for column in self.feature_columns:
+                if column in input_df.columns:
+                    self.live[column].update(input_df[column])
+                else:
+                    self.live[column].missing += len(input_df)
+            if SCORE_COLUMN in self.live:
+                self.live[SCORE_COLUMN].update(result_df[SCORE_COLUMN])
+            self.n_observed += len(input_df)
+
+    def report(self, psi_threshold: float = PSI_DRIFT_THRESHOLD) -> dict:
+        with self._lock:
+            columns = {}
+            for column, reference in self.reference.items():
+                live = self.live[column]
+                columns[column] = {
+                    "psi": population_stability_index(reference.counts, live.counts),
+                    "ks": binned_ks_statistic(reference.counts, live.counts)
+                    if reference.kind == HistogramSketch.kind else None,
+                    "observed": int(live.counts.sum()),
+                    "missing": live.missing,
+                }
+            return {
+                "n_observed": self.n_observed,
+                "psi_threshold": psi_threshold,
+                "drifted": sorted(c for c, stats in columns.items()
+                                  if stats["psi"] is not None and stats["psi"] > psi_threshold),
+                "columns": columns,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.live = {column: sketch.empty_like() for column, sketch in self.reference.items()}
+            self.n_observed = 0
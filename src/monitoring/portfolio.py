@@ -0,0 +1,358 @@
+import os
+import sys
+import json
+import threading
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.exception import USvisaException
+from src.monitoring.drift import SCORE_BIN_EDGES, SCORE_COLUMN
+from src.utils.recovery_strategy import assign_recovery_strategy, assign_recovery_strategies
+
+
+SEGMENT_COLUMN = "Segment_Name"
+STRATEGY_COLUMN = "Recovery_Strategy"
+EXPOSURE_COLUMN = "Outstanding_Loan_Amount"
+KEY_COLUMN = "Loan_ID"
+DIMENSIONS = (SEGMENT_COLUMN, "Employment_Type", STRATEGY_COLUMN)
+UNKNOWN = "Unknown"
+
+
+def write_segment_model(file_path: str, features: list, mean, scale, centroids, names: list) -> str:
+    """
+    Write the borrower segmentation (scaler moments and k-means centroids over
+    ``features``) as JSON, so serving can assign ``Segment_Name`` without sklearn.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump({"features": list(features), "mean": np.asarray(mean).tolist(),
+                       "scale": np.asarray(scale).tolist(), "centroids": np.asarray(centroids).tolist(),
+                       "names": list(names)}, f)
+        return file_path
+    except Exception as e:
+        raise USvisaException(e, sys)
+
+
+class SegmentAssigner:
+    """
+    ``Segment_Name`` of live loans: the nearest training-time k-means centroid.
+    """
+
+    def __init__(self, features: list, mean, scale, centroids, names: list):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.names = np.asarray(names, dtype=object)
+
+    @classmethod
+    def from_file(cls, file_path: str) -> "SegmentAssigner":
+        with open(file_path, "r") as f:
+            return cls(**json.load(f))
+
+    def assign_record(self, record: dict) -> str:
+        if not all(feature in record for feature in self.features):
+            return UNKNOWN
+        scaled = (np.array([float(record[feature]) for feature in self.features]) - self.mean) / self.scale
+        return self.names[((self.centroids - scaled) ** 2).sum(axis=1).argmin()]
+
+    def assign(self, input_df: pd.DataFrame) -> np.ndarray:
+        if not set(self.features).issubset(input_df.columns):
+            return np.full(len(input_df), UNKNOWN, dtype=object)
+        scaled = (input_df[self.features].to_numpy(dtype=np.float64) - self.mean) / self.scale
+        distances = (scaled ** 2).sum(axis=1)[:, None] - 2 * scaled @ self.centroids.T + (self.centroids ** 2).sum(axis=1)
+        return self.names[distances.argmin(axis=1)]
+
+
+class PortfolioAggregator:
+    """
+    Running portfolio totals of every scored loan, for management reporting
+    without re-reading or re-scoring the book.
+
+    Totals are kept per cell, one cell per combination of ``DIMENSIONS``
+    (``Segment_Name`` x ``Employment_Type`` x ``Recovery_Strategy``): loans,
+    exposure (``Outstanding_Loan_Amount``), the ``Risk_Score`` sum, expected loss
+    (``Risk_Score`` x exposure) and a ``Risk_Score`` histogram on the drift
+    monitor's bins. A summary grouped by any subset of the dimensions is a
+    roll-up of the cells, so its cost depends on the number of cells, not loans.
+
+    Loans are identified by ``Loan_ID``. When a known loan is scored again its
+    previous contribution (cell, score, exposure) is subtracted before the new
+    one is added, so each loan counts once with its latest score. Requests
+    without a ``Loan_ID`` (e.g. ``/predict`` form posts) cannot be told apart
+    from a rescoring of the same loan, so they stay out of the book totals and
+    are only counted as ``n_unkeyed_requests``. Registered as an observer of
+    ``PredictionPipeline``.
+
+    Totals live in the process that scores, so the rescoring worker, which
+    scores the whole book by ``Loan_ID``, writes them to a snapshot file
+    (``save_snapshot``) that serving processes read (``load_snapshot``).
+    """
+
+    def __init__(self, segment_assigner: SegmentAssigner = None, dimensions: Iterable[str] = DIMENSIONS):
+        self.segment_assigner = segment_assigner
+        self.dimensions = tuple(dimensions)
+        self.n_bins = len(SCORE_BIN_EDGES) + 1
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._codes = {dimension: {} for dimension in self.dimensions}  # value -> code, per dimension
+            self._labels = {dimension: [] for dimension in self.dimensions}
+            self._cells = {}  # tuple of codes -> row
+            self._cell_keys = []
+            self._totals = np.zeros((0, 4))  # loans, exposure, score sum, expected loss
+            self._histograms = np.zeros((0, self.n_bins), dtype=np.int64)
+            # Latest contribution of every identified loan, by slot.
+            self._slots = {}
+            self._slot_cell = np.zeros(0, dtype=np.int64)
+            self._slot_values = np.zeros((0, 2))  # score, exposure
+            self.n_observed = 0
+            self.n_rescored = 0
+            self.n_unkeyed = 0
+
+    @classmethod
+    def from_segment_file(cls, file_path: str = None) -> "PortfolioAggregator":
+        segment_assigner = None
+        if file_path and os.path.exists(file_path):
+            segment_assigner = SegmentAssigner.from_file(file_path)
+        return cls(segment_assigner)
+
+    def observe_record(self, record: dict, result: dict) -> None:
+        # Scalar path: numpy calls on one-element arrays would cost more than the update.
+        key = record.get(KEY_COLUMN)
+        if key is None or key != key or key == "":  # None, NaN or empty
+            with self._lock:
+                self.n_unkeyed += 1
+            return
+        score = float(result[SCORE_COLUMN])
+        labels = []
+        for dimension in self.dimensions:
+            if dimension in result:
+                labels.append(result[dimension])
+            elif dimension == STRATEGY_COLUMN:
+                labels.append(assign_recovery_strategy(score))
+            elif dimension == SEGMENT_COLUMN and dimension not in record and self.segment_assigner:
+                labels.append(self.segment_assigner.assign_record(record))
+            else:
+                labels.append(record.get(dimension, UNKNOWN))
+        exposure = float(record.get(EXPOSURE_COLUMN, 0.0))
+        key = str(key)
+
+        with self._lock:
+            cell = self._cell_row(tuple(self._code(dimension, label)
+                                        for dimension, label in zip(self.dimensions, labels)))
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._new_slots(np.array([key]))[0]
+            else:
+                self._add_one(self._slot_cell[slot], *self._slot_values[slot], sign=-1)
+                self.n_rescored += 1
+            self._slot_cell[slot] = cell
+            self._slot_values[slot] = (score, exposure)
+            self._add_one(cell, score, exposure, sign=1)
+            self.n_observed += 1
+
+    def _add_one(self, cell: int, score: float, exposure: float, sign: int) -> None:
+        self._totals[cell] += (sign, sign * exposure, sign * score, sign * score * exposure)
+        self._histograms[cell, np.searchsorted(SCORE_BIN_EDGES, score, side="right")] += sign
+
+    def observe_batch(self, input_df: pd.DataFrame, result_df: pd.DataFrame) -> None:
+        keyed = np.zeros(len(input_df), dtype=bool)
+        if KEY_COLUMN in input_df.columns:
+            keyed = (input_df[KEY_COLUMN].notna() & (input_df[KEY_COLUMN].astype(str) != "")).to_numpy()
+        if not keyed.all():
+            with self._lock:
+                self.n_unkeyed += int((~keyed).sum())
+            if not keyed.any():
+                return
+            input_df, result_df = input_df[keyed], result_df[keyed]
+        scores = result_df[SCORE_COLUMN].to_numpy(dtype=np.float64)
+        exposure = (input_df[EXPOSURE_COLUMN].to_numpy(dtype=np.float64) if EXPOSURE_COLUMN in input_df.columns
+                    else np.zeros(len(input_df)))
+        values = {}
+        for dimension in self.dimensions:
+            if dimension in result_df.columns:
+                values[dimension] = result_df[dimension].to_numpy(dtype=object)
+            elif dimension == STRATEGY_COLUMN:
+                values[dimension] = assign_recovery_strategies(scores)
+            elif dimension == SEGMENT_COLUMN and dimension not in input_df.columns and self.segment_assigner:
+                values[dimension] = self.segment_assigner.assign(input_df)
+            elif dimension in input_df.columns:
+                values[dimension] = input_df[dimension].astype(str).to_numpy(dtype=object)
+            else:
+                values[dimension] = np.full(len(input_df), UNKNOWN, dtype=object)
+        self._observe(values, scores, exposure, input_df[KEY_COLUMN].astype(str).to_numpy())
+
+    def _observe(self, values: dict, scores: np.ndarray, exposure: np.ndarray, keys: np.ndarray) -> None:
+        with self._lock:
+            cells = self._cell_rows(values)
+            # A loan listed twice in one batch counts once, with its last score.
+            keep = ~pd.Series(keys).duplicated(keep="last").to_numpy()
+            keys, cells, scores, exposure = keys[keep], cells[keep], scores[keep], exposure[keep]
+            slots = np.array([self._slots.get(key, -1) for key in keys], dtype=np.int64)
+            known = slots >= 0
+            if known.any():
+                previous = slots[known]
+                self._accumulate(self._slot_cell[previous], self._slot_values[previous, 0],
+                                 self._slot_values[previous, 1], sign=-1)
+                self.n_rescored += int(known.sum())
+            slots[~known] = self._new_slots(keys[~known])
+            self._slot_cell[slots] = cells
+            self._slot_values[slots] = np.column_stack([scores, exposure])
+            self._accumulate(cells, scores, exposure, sign=1)
+            self.n_observed += len(cells)
+
+    def _cell_row(self, combination: tuple) -> int:
+        row = self._cells.get(combination)
+        if row is None:
+            row = self._cells[combination] = len(self._cell_keys)
+            self._cell_keys.append(combination)
+            self._totals = np.vstack([self._totals, np.zeros((1, 4))])
+            self._histograms = np.vstack([self._histograms, np.zeros((1, self.n_bins), dtype=np.int64)])
+        return row
+
+    def _cell_rows(self, values: dict) -> np.ndarray:
+        codes = np.column_stack([self._encode(dimension, values[dimension]) for dimension in self.dimensions])
+        combinations, inverse = np.unique(codes, axis=0, return_inverse=True)
+        rows = np.array([self._cell_row(combination) for combination in map(tuple, combinations.tolist())],
+                        dtype=np.int64)
+        return rows[inverse.ravel()]
+
+    def _code(self, dimension: str, value) -> int:
+        mapping = self._codes[dimension]
+        if value is None or value != value:  # None or NaN
+            value = UNKNOWN
+        code = mapping.get(value)
+        if code is None:
+            code = mapping[value] = len(self._labels[dimension])
+            self._labels[dimension].append(value)
+        return code
+
+    def _encode(self, dimension: str, values: np.ndarray) -> np.ndarray:
+        batch_codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna(UNKNOWN))
+        return np.array([self._code(dimension, value) for value in uniques], dtype=np.int64)[batch_codes]
+
+    def _new_slots(self, keys: np.ndarray) -> np.ndarray:
+        start = len(self._slots)
+        needed = start + len(keys)
+        if needed > len(self._slot_cell):
+            capacity = max(needed, 2 * len(self._slot_cell), 1024)
+            self._slot_cell = np.resize(self._slot_cell, capacity)
+            self._slot_values = np.resize(self._slot_values, (capacity, 2))
+        self._slots.update(zip(keys.tolist(), range(start, needed)))
+        return np.arange(start, needed)
+
+    def _accumulate(self, cells: np.ndarray, scores: np.ndarray, exposure: np.ndarray, sign: int) -> None:
+        n_cells = len(self._cell_keys)
+        for column, weights in enumerate((None, exposure, scores, scores * exposure)):
+            self._totals[:, column] += sign * np.bincount(cells, weights=weights, minlength=n_cells)
+        bins = np.searchsorted(SCORE_BIN_EDGES, scores, side="right")
+        self._histograms += sign * np.bincount(
+            cells * self.n_bins + bins, minlength=n_cells * self.n_bins
+        ).reshape(n_cells, self.n_bins)
+
+    def save_snapshot(self, file_path: str) -> str:
+        """
+        Write the totals and every identified loan's latest contribution to an
+        ``.npz`` file, atomically, so a reader never sees a partial snapshot.
+        """
+        try:
+            with self._lock:
+                arrays = {
+                    "totals": self._totals.copy(),
+                    "histograms": self._histograms.copy(),
+                    "cell_keys": np.array(self._cell_keys, dtype=np.int64).reshape(-1, len(self.dimensions)),
+                    "slot_keys": np.array(list(self._slots), dtype=str),
+                    "slot_cell": self._slot_cell[:len(self._slots)].copy(),
+                    "slot_values": self._slot_values[:len(self._slots)].copy(),
+                    "counters": np.array([self.n_observed, self.n_rescored, self.n_unkeyed], dtype=np.int64),
+                    "meta": np.array(json.dumps({"dimensions": list(self.dimensions), "labels": self._labels,
+                                                 "score_bin_edges": SCORE_BIN_EDGES.tolist()}, default=str)),
+                }
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, file_path)
+            return file_path
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def load_snapshot(self, file_path: str, with_keys: bool = True) -> "PortfolioAggregator":
+        """
+        Replace this aggregator's state with a snapshot from ``save_snapshot``.
+        ``with_keys=False`` loads only what ``summary`` needs; loans scored
+        afterwards are then counted as new.
+        """
+        try:
+            with np.load(file_path) as data:
+                meta = json.loads(str(data["meta"]))
+                if tuple(meta["dimensions"]) != self.dimensions:
+                    raise ValueError(f"Snapshot dimensions {meta['dimensions']} differ from {list(self.dimensions)}")
+                if meta["score_bin_edges"] != SCORE_BIN_EDGES.tolist():
+                    raise ValueError("Snapshot was taken with different Risk_Score bins")
+                with self._lock:
+                    self._labels = {dimension: list(meta["labels"][dimension]) for dimension in self.dimensions}
+                    self._codes = {dimension: {label: code for code, label in enumerate(labels)}
+                                   for dimension, labels in self._labels.items()}
+                    self._cell_keys = [tuple(cell) for cell in data["cell_keys"].tolist()]
+                    self._cells = {cell: row for row, cell in enumerate(self._cell_keys)}
+                    self._totals, self._histograms = data["totals"], data["histograms"]
+                    # Snapshots written before unkeyed requests were counted hold two counters.
+                    counters = data["counters"].tolist() + [0]
+                    self.n_observed, self.n_rescored, self.n_unkeyed = (int(count) for count in counters[:3])
+                    if with_keys:
+                        keys = data["slot_keys"].tolist()
+                        self._slots = dict(zip(keys, range(len(keys))))
+                        self._slot_cell, self._slot_values = data["slot_cell"], data["slot_values"]
+                    else:
+                        self._slots = {}
+                        self._slot_cell, self._slot_values = np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+            return self
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def summary(self, by: Iterable[str] = None) -> dict:
+        """
+        Portfolio totals grouped by ``by`` (a subset of ``dimensions``; each one
+        separately when omitted). Cost is O(cells x score bins).
+        """
+        groupings = [(dimension,) for dimension in self.dimensions] if by is None else [tuple(by)]
+        for grouping in groupings:
+            unknown = set(grouping) - set(self.dimensions)
+            if unknown:
+                raise ValueError(f"Cannot group by {sorted(unknown)}; dimensions are {list(self.dimensions)}")
+
+        with self._lock:
+            totals, histograms = self._totals.copy(), self._histograms.copy()
+            cell_keys = list(self._cell_keys)
+            labels = {dimension: list(values) for dimension, values in self._labels.items()}
+            report = {"n_loans": int(round(totals[:, 0].sum())), "n_observed": self.n_observed,
+                      "n_rescored": self.n_rescored, "n_unkeyed_requests": self.n_unkeyed,
+                      "score_bin_edges": SCORE_BIN_EDGES.tolist(), "groups": {}}
+
+        for grouping in groupings:
+            positions = [self.dimensions.index(dimension) for dimension in grouping]
+            group_rows = {}
+            for row, cell in enumerate(cell_keys):
+                key = " | ".join(str(labels[self.dimensions[p]][cell[p]]) for p in positions)
+                group_rows.setdefault(key, []).append(row)
+            groups = {}
+            for key, rows in group_rows.items():
+                loans, exposure, score_sum, expected_loss = totals[rows].sum(axis=0)
+                if round(loans) == 0:
+                    continue
+                groups[key] = {
+                    "loans": int(round(loans)),
+                    "exposure": float(exposure),
+                    "mean_risk_score": float(score_sum / loans),
+                    "expected_loss": float(expected_loss),
+                    "score_histogram": histograms[rows].sum(axis=0).tolist(),
+                }
+            report["groups"][" x ".join(grouping)] = groups
+        return report
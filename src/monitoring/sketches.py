@@ -0,0 +1,125 @@
+"""
+Fixed-size sketches of a feature's distribution. Their size depends only on the
+number of bins/levels, never on how many values were observed, and two sketches
+with the same layout can be compared with PSI and a binned KS statistic.
+"""
+
+import math
+from bisect import bisect_right
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+PSI_EPSILON = 1e-4  # floor for empty bins so PSI stays finite
+
+
+class HistogramSketch:
+    """
+    Counts of a numeric feature over fixed bins ``(-inf, e0], (e0, e1], ..., (ek, inf)``
+    plus a missing-value count.
+    """
+
+    kind = "numeric"
+
+    def __init__(self, edges, counts=None, missing: int = 0):
+        self.edges = [float(edge) for edge in edges]
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64) if counts is None \
+            else np.asarray(counts, dtype=np.int64)
+        self.missing = int(missing)
+
+    @classmethod
+    def from_sample(cls, values, n_bins: int = 10) -> "HistogramSketch":
+        """
+        Bin edges at the sample's quantiles, so each reference bin holds a similar share.
+        """
+        values = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+        quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]) if len(values) else []
+        return cls(np.unique(quantiles))
+
+    def empty_like(self) -> "HistogramSketch":
+        return HistogramSketch(self.edges)
+
+    def update_one(self, value) -> None:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            self.missing += 1
+        else:
+            self.counts[bisect_right(self.edges, float(value))] += 1
+
+    def update(self, values) -> None:
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+        missing = np.isnan(values)
+        self.missing += int(missing.sum())
+        bins = np.searchsorted(self.edges, values[~missing], side="right")
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "edges": self.edges, "counts": self.counts.tolist(), "missing": self.missing}
+
+
+class CategoricalSketch:
+    """
+    Counts per reference level, with unseen levels pooled into one extra bucket.
+    """
+
+    kind = "categorical"
+
+    def __init__(self, levels, counts=None, missing: int = 0):
+        self.levels = [str(level) for level in levels]
+        self._index = {level: i for i, level in enumerate(self.levels)}
+        self.counts = np.zeros(len(self.levels) + 1, dtype=np.int64) if counts is None \
+            else np.asarray(counts, dtype=np.int64)
+        self.missing = int(missing)
+
+    @classmethod
+    def from_sample(cls, values) -> "CategoricalSketch":
+        return cls(sorted(pd.Series(values).dropna().astype(str).unique()))
+
+    def empty_like(self) -> "CategoricalSketch":
+        return CategoricalSketch(self.levels)
+
+    def update_one(self, value) -> None:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            self.missing += 1
+        else:
+            self.counts[self._index.get(str(value), len(self.levels))] += 1
+
+    def update(self, values) -> None:
+        values = pd.Series(values)
+        missing = values.isna()
+        self.missing += int(missing.sum())
+        codes = pd.Categorical(values[~missing].astype(str), categories=self.levels).codes
+        # Unseen levels have code -1 and land in the last (pooled) bucket.
+        self.counts += np.bincount(np.where(codes < 0, len(self.levels), codes), minlength=len(self.counts))
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "levels": self.levels, "counts": self.counts.tolist(), "missing": self.missing}
+
+
+def sketch_from_dict(content: dict):
+    if content["kind"] == HistogramSketch.kind:
+        return HistogramSketch(content["edges"], content["counts"], content.get("missing", 0))
+    return CategoricalSketch(content["levels"], content["counts"], content.get("missing", 0))
+
+
+def _shares(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum()
+    return counts / total if total else np.zeros(len(counts))
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> Optional[float]:
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    e = np.clip(_shares(expected), PSI_EPSILON, None)
+    a = np.clip(_shares(actual), PSI_EPSILON, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks_statistic(expected: np.ndarray, actual: np.ndarray) -> Optional[float]:
+    """
+    Largest gap between the two CDFs at the bin edges (a lower bound on the exact KS).
+    """
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    return float(np.max(np.abs(np.cumsum(_shares(expected)) - np.cumsum(_shares(actual)))))
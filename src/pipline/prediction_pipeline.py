@@ -1,20 +1,53 @@
 # === prediction_pipeline.py ===
 
 import os
+import re
 import sys
+import json
+import threading
 import warnings
+import itertools
+import math
+import numpy as np
 import pandas as pd
 
-from src.utils.main_utils import load_object
+from src.utils.main_utils import load_object, load_mapped_object
+from src.utils.mapped_artifact import ArtifactIntegrityError, mapped_artifact_path
+from src.utils.model_cache import LRUModelCache
+from src.utils.recovery_strategy import assign_recovery_strategies
+from src.utils.portfolio_allocator import allocate_strategies
+from src.utils.tree_explainer import TreeExplainer, source_features
+from src.monitoring.drift import DriftMonitor
+from src.monitoring.audit import AuditLog
+from src.monitoring.portfolio import PortfolioAggregator
 from src.exception import USvisaException
 from src.logger import logging
 
 
-def get_latest_artifact_path(subdir_name: str) -> str:
+# Requests are routed to per-loan-type models on this column when they are available.
+# (src.constants is not imported on the serving path; see src/benchmark/startup.py.)
+ROUTING_COLUMN = "Loan_Type"
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "512"))
+DRIFT_REFERENCE_FILE = "drift_reference.json"
+SIMILAR_CASES_FILE = "similar_cases.pkl"
+SEGMENTS_FILE = "segments.json"
+# "mapped" serves the memory-mapped twins of the joblib artifacts when present; "joblib" ignores them.
+MODEL_ARTIFACT_FORMAT = os.getenv("MODEL_ARTIFACT_FORMAT", "mapped")
+MAX_SCENARIOS = int(os.getenv("MAX_SCENARIOS", "10000"))  # per what-if request
+# Every scored request is recorded here; set PREDICTION_AUDIT_DIR="" to disable.
+PREDICTION_AUDIT_DIR = os.getenv("PREDICTION_AUDIT_DIR", os.path.join("logs", "audit"))
+RUN_DIR_PATTERN = re.compile(r"\d{2}_\d{2}_\d{4}_\d{2}_\d{2}_\d{2}")  # artifact/<ts>, as in TrainingPipelineConfig
+# Book-wide portfolio totals written by the rescoring worker (same default as src.constants).
+PORTFOLIO_SNAPSHOT_PATH = os.getenv("PORTFOLIO_SNAPSHOT_PATH",
+                                    os.path.join("artifact", "rescoring", "portfolio_snapshot.npz"))
+
+
+def get_latest_artifact_path(subdir_name: str, base_artifact_path: str = "artifact") -> str:
     try:
-        base_artifact_path = "artifact"
+        # Only timestamped run directories: artifact/ also holds the rescoring worker's state.
         subdirs = sorted(
-            [d for d in os.listdir(base_artifact_path) if os.path.isdir(os.path.join(base_artifact_path, d))],
+            [d for d in os.listdir(base_artifact_path)
+             if RUN_DIR_PATTERN.fullmatch(d) and os.path.isdir(os.path.join(base_artifact_path, d))],
             reverse=True
         )
         if not subdirs:
@@ -32,18 +65,362 @@ def get_latest_artifact_path(subdir_name: str) -> str:
 
 
 class PredictionPipeline:
-    def __init__(self):
+    def __init__(self, artifact_dir: str = None, model_cache_max_mb: float = MODEL_CACHE_MAX_MB,
+                 audit_dir: str = PREDICTION_AUDIT_DIR, artifact_format: str = MODEL_ARTIFACT_FORMAT,
+                 portfolio_snapshot_path: str = PORTFOLIO_SNAPSHOT_PATH):
+        """
+        :param artifact_dir: a single timestamped run directory (e.g. ``artifact/<ts>``)
+            to load from; defaults to the latest run under ``artifact/``.
+        :param model_cache_max_mb: memory budget for per-loan-type models, which are
+            loaded on first use and evicted least-recently-used first.
+        :param audit_dir: where the audit log of scored requests is written; empty
+            or ``None`` disables auditing.
+        :param artifact_format: ``"mapped"`` to memory-map the model and transformer
+            (shared between worker processes, checksummed) or ``"joblib"``.
+        :param portfolio_snapshot_path: the rescoring worker's portfolio snapshot,
+            which ``portfolio_summary`` reports when it exists.
+        """
         try:
-            # Automatically resolve paths to latest model and transformer
-            self.model_path = os.path.join(get_latest_artifact_path("model_trainer"), "risk_classifier.pkl")
-            self.transformer_path = os.path.join(get_latest_artifact_path("data_transformation"), "transformer.pkl")
+            self.artifact_format = artifact_format
+            if artifact_dir:
+                model_dir = os.path.join(artifact_dir, "model_trainer")
+                transformation_dir = os.path.join(artifact_dir, "data_transformation")
+            else:
+                # Automatically resolve paths to latest model and transformer
+                model_dir = get_latest_artifact_path("model_trainer")
+                transformation_dir = get_latest_artifact_path("data_transformation")
+
+            self.model_path = os.path.join(model_dir, "risk_classifier.pkl")
+            self.model_version = os.path.basename(os.path.dirname(os.path.normpath(model_dir)))
+            self.transformer_path = os.path.join(transformation_dir, "transformer.pkl")
+            self.similar_cases_path = os.path.join(transformation_dir, SIMILAR_CASES_FILE)
+            self._similar_case_index = None
+            self._similar_case_lock = threading.Lock()
+            self._explainer = None  # the global model's; per-loan-type ones live in model_cache
+            self._explainer_lock = threading.Lock()
 
             logging.info(f"📦 Loading model from: {self.model_path}")
             logging.info(f"📦 Loading transformer from: {self.transformer_path}")
 
             # Load the model and transformer objects
-            self.model = load_object(self.model_path)
-            self.transformer = load_object(self.transformer_path)
+            self.model = self.load_artifact(self.model_path)
+            self.transformer = self.load_artifact(self.transformer_path)
+            feature_names = getattr(self.model, "feature_names", None)
+            if feature_names and list(self.transformer.get_feature_names_out()) != feature_names:
+                raise ArtifactIntegrityError("Model feature order does not match the transformer's output")
+
+            # Per-loan-type models (TrainPipeline(loan_type_models=True)); loan types
+            # without one, and requests without Loan_Type, use the global model.
+            self.loan_type_model_paths = {}
+            index_file_path = os.path.join(model_dir, "loan_type_models", "loan_type_models.json")
+            if os.path.exists(index_file_path):
+                with open(index_file_path, "r") as f:
+                    index = json.load(f)
+                self.loan_type_model_paths = {
+                    loan_type: os.path.join(os.path.dirname(index_file_path), entry["file"])
+                    for loan_type, entry in index["models"].items()
+                }
+                logging.info(f"🔀 Routing by {ROUTING_COLUMN}: {sorted(self.loan_type_model_paths)}")
+            self.model_cache = LRUModelCache(self.load_artifact, int(model_cache_max_mb * 2**20))
+
+            # Observers see every request and its result (drift monitoring, auditing).
+            self.observers = []
+            self.drift_monitor = None
+            drift_reference_path = os.path.join(transformation_dir, DRIFT_REFERENCE_FILE)
+            if os.path.exists(drift_reference_path):
+                self.drift_monitor = DriftMonitor.from_file(drift_reference_path)
+                self.add_observer(self.drift_monitor)
+            # Without a segment model (older runs) loans are aggregated under Segment_Name "Unknown".
+            self.portfolio = PortfolioAggregator.from_segment_file(os.path.join(transformation_dir, SEGMENTS_FILE))
+            self.add_observer(self.portfolio)
+            self.portfolio_snapshot_path = portfolio_snapshot_path
+            self._portfolio_snapshot = (None, None)  # (file mtime, aggregator)
+            self._portfolio_snapshot_lock = threading.Lock()
+            self.audit_log = None
+            if audit_dir:
+                self.audit_log = AuditLog(audit_dir, self.model_version, model_name_for=self.model_name_for)
+                self.add_observer(self.audit_log)
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def load_artifact(self, file_path: str):
+        mapped_path = mapped_artifact_path(file_path)
+        if self.artifact_format == "mapped" and os.path.exists(mapped_path):
+            return load_mapped_object(mapped_path)
+        return load_object(file_path)
+
+    def add_observer(self, observer) -> None:
+        """
+        :param observer: any object with ``observe_record(record, result)`` and
+            ``observe_batch(input_df, result_df)``; called after each prediction.
+        """
+        self.observers.append(observer)
+
+    def _notify(self, method: str, *args) -> None:
+        # A failing observer must never fail the prediction it is observing.
+        for observer in self.observers:
+            try:
+                getattr(observer, method)(*args)
+            except Exception as e:
+                logging.warning("⚠️ %s.%s failed: %s", type(observer).__name__, method, e)
+
+    def model_name_for(self, loan_type=None) -> str:
+        return f"{ROUTING_COLUMN}={loan_type}" if loan_type in self.loan_type_model_paths else "global"
+
+    def model_for(self, loan_type=None):
+        """
+        The model serving ``loan_type``: its own model if one was trained, else the global one.
+        """
+        path = self.loan_type_model_paths.get(loan_type) if loan_type is not None else None
+        return self.model_cache.get(path) if path else self.model
+
+    def _predict_scores(self, transformed_data, loan_types=None) -> np.ndarray:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if not self.loan_type_model_paths or loan_types is None:
+                return self.model.predict_proba(transformed_data)[:, 1]
+
+            # One vectorized call per loan type present in the batch.
+            risk_scores = np.empty(transformed_data.shape[0])
+            codes, uniques = pd.factorize(loan_types)
+            for code, loan_type in enumerate(uniques):
+                positions = np.flatnonzero(codes == code)
+                model = self.model_for(loan_type)
+                risk_scores[positions] = model.predict_proba(transformed_data[positions])[:, 1]
+            return risk_scores
+
+    @property
+    def similar_case_index(self):
+        # Loaded on first lookup: it is as large as the training set and most requests never need it.
+        if self._similar_case_index is None:
+            with self._similar_case_lock:
+                if self._similar_case_index is None:
+                    if not os.path.exists(self.similar_cases_path):
+                        raise FileNotFoundError(f"No similar-case index for this model: {self.similar_cases_path}")
+                    self._similar_case_index = load_object(self.similar_cases_path)
+                    logging.info("🔎 Loaded similar-case index from: %s", self.similar_cases_path)
+        return self._similar_case_index
+
+    def similar_cases(self, input_data: dict, k: int = 5) -> list:
+        """
+        The ``k`` historical loans most similar to ``input_data`` (closest first),
+        with how each was recovered (``Recovery_Status``, ``Collection_Method``).
+        """
+        try:
+            return self.similar_case_index.query(input_data, k)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @staticmethod
+    def _build_explainer(model, path: str) -> TreeExplainer:
+        try:
+            return TreeExplainer.from_model(model)
+        except ValueError:
+            # Mapped files written before node cover was stored.
+            return TreeExplainer.from_model(load_object(path))
+
+    def explainer_for(self, loan_type=None) -> TreeExplainer:
+        """
+        The explainer of the model serving ``loan_type``, built on first use. A
+        per-loan-type model's explainer is cached with the model in ``model_cache``
+        (counted towards ``MODEL_CACHE_MAX_MB`` and evicted with it); the global
+        model's is kept for as long as the model itself.
+        """
+        path = self.loan_type_model_paths.get(loan_type) if loan_type is not None else None
+        if path:
+            return self.model_cache.companion(path, "explainer", lambda model: self._build_explainer(model, path))
+        if self._explainer is None:
+            with self._explainer_lock:
+                if self._explainer is None:
+                    self._explainer = self._build_explainer(self.model, self.model_path)
+        return self._explainer
+
+    def explain(self, input_df: pd.DataFrame) -> tuple:
+        """
+        Exact per-feature contributions to each loan's ``Risk_Score`` (see
+        ``src.utils.tree_explainer``), with one-hot columns summed back into the
+        ``schema.yaml`` feature they encode.
+
+        :return: ``(contributions_df, expected_values)``: one column per input
+            feature, aligned with ``input_df``; each row sums to the loan's
+            ``Risk_Score`` minus its model's expected value.
+        """
+        try:
+            transformed_data = self.transformer.transform(input_df)
+            sources = source_features(self.transformer)
+            features = list(dict.fromkeys(sources))
+            # Output column -> input feature, as a matrix that sums one-hot groups.
+            grouping = np.zeros((len(sources), len(features)))
+            grouping[np.arange(len(sources)), [features.index(source) for source in sources]] = 1.0
+
+            # One explainer call per model, as in ``_predict_scores``.
+            if self.loan_type_model_paths and ROUTING_COLUMN in input_df.columns:
+                codes, uniques = pd.factorize(input_df[ROUTING_COLUMN].astype(str).to_numpy())
+            else:
+                codes, uniques = np.zeros(len(input_df), dtype=int), [None]
+            contributions = np.empty((len(input_df), len(features)))
+            expected_values = np.empty(len(input_df))
+            for code, loan_type in enumerate(uniques):
+                positions = np.flatnonzero(codes == code)
+                explainer = self.explainer_for(loan_type)
+                contributions[positions] = explainer.shap_values(transformed_data[positions]) @ grouping
+                expected_values[positions] = explainer.expected_value
+
+            return pd.DataFrame(contributions, columns=features, index=input_df.index), expected_values
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def top_contributors(self, input_data: dict, k: int = 5) -> dict:
+        """
+        The ``k`` features that moved ``input_data``'s ``Risk_Score`` most, largest
+        first, each with its value and signed contribution, and the model's
+        expected score they are measured from.
+        """
+        try:
+            contributions_df, expected_values = self.explain(pd.DataFrame([input_data]))
+            contributions = contributions_df.iloc[0]
+            top = contributions.abs().sort_values(ascending=False, kind="stable").index[:k]
+            return {
+                "Expected_Risk_Score": float(expected_values[0]),
+                "Top_Contributors": [
+                    {"feature": feature, "value": input_data.get(feature),
+                     "contribution": float(contributions[feature])}
+                    for feature in top
+                ],
+            }
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _score_frame(self, input_df: pd.DataFrame) -> pd.DataFrame:
+        transformed_data = self.transformer.transform(input_df)
+        loan_types = (input_df[ROUTING_COLUMN].astype(str).to_numpy()
+                      if ROUTING_COLUMN in input_df.columns else None)
+        risk_scores = self._predict_scores(transformed_data, loan_types)
+
+        return pd.DataFrame({
+            "Risk_Score": risk_scores,
+            "Predicted_High_Risk": (risk_scores > 0.5).astype(int)
+        }, index=input_df.index)
+
+    def predict_batch(self, input_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score many loans with one transform and one predict_proba call per model
+        (grouped by ``Loan_Type`` when per-loan-type models are available).
+        Returns ``Risk_Score`` and ``Predicted_High_Risk`` aligned with ``input_df``.
+        """
+        try:
+            result_df = self._score_frame(input_df)
+            self._notify("observe_batch", input_df, result_df)
+            return result_df
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def portfolio_summary(self, by: list = None) -> dict:
+        """
+        Portfolio totals grouped ``by`` dimensions (see ``PortfolioAggregator.summary``):
+        the rescoring worker's book-wide snapshot when there is one, re-read when
+        the file changes, else this process's own running totals. ``source`` says which.
+        """
+        try:
+            path = self.portfolio_snapshot_path
+            if not path or not os.path.exists(path):
+                return {**self.portfolio.summary(by), "source": "process"}
+            mtime = os.stat(path).st_mtime_ns
+            with self._portfolio_snapshot_lock:
+                if self._portfolio_snapshot[0] != mtime:
+                    snapshot = PortfolioAggregator(dimensions=self.portfolio.dimensions)
+                    self._portfolio_snapshot = (mtime, snapshot.load_snapshot(path, with_keys=False))
+                snapshot = self._portfolio_snapshot[1]
+            return {**snapshot.summary(by), "source": "snapshot"}
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def score_scenarios(self, base_loan: dict, grid: dict = None, scenarios: list = None) -> list:
+        """
+        Score what-if variants of one loan in a single transform and predict call.
+
+        :param base_loan: the loan as sent to ``predict``.
+        :param grid: field -> list of candidate values; every combination becomes a scenario.
+        :param scenarios: explicit scenarios, each a dict of fields to override.
+        :return: one dict per scenario (grid combinations first) with the overridden
+            fields, ``Risk_Score``, ``Predicted_High_Risk`` and ``Recovery_Strategy``.
+
+        Scenarios are hypothetical, so observers (drift monitoring, audit log) are not notified.
+        """
+        try:
+            grid = grid or {}
+            not_lists = sorted(field for field, values in grid.items() if not isinstance(values, (list, tuple)))
+            if not_lists:
+                raise ValueError(f"Grid values must be lists of candidates: {not_lists}")
+            # Counted before expanding, so an oversized grid is never materialised.
+            n_scenarios = (math.prod(len(values) for values in grid.values()) if grid else 0) + len(scenarios or [])
+            if n_scenarios > MAX_SCENARIOS:
+                raise ValueError(f"{n_scenarios} scenarios requested; at most {MAX_SCENARIOS} are allowed")
+
+            overrides = list(scenarios or [])
+            if grid:
+                fields = list(grid)
+                overrides = [dict(zip(fields, values)) for values in itertools.product(*grid.values())] + overrides
+            if not overrides:
+                raise ValueError("Give a grid or a list of scenarios")
+            unknown = {field for override in overrides for field in override} - set(base_loan)
+            if unknown:
+                raise ValueError(f"Scenario fields not in the base loan: {sorted(unknown)}")
+
+            # One row per scenario: the base loan, with each scenario's overrides applied column-wise.
+            changed_fields = set().union(*overrides)
+            scenario_df = pd.DataFrame({
+                field: [override.get(field, value) for override in overrides] if field in changed_fields
+                else value
+                for field, value in base_loan.items()
+            }, index=pd.RangeIndex(len(overrides)))
+
+            risk_scores = self._score_frame(scenario_df)["Risk_Score"].to_numpy()
+            scored = zip(risk_scores.tolist(), (risk_scores > 0.5).astype(int).tolist(),
+                         assign_recovery_strategies(risk_scores).tolist())
+            return [
+                {**override, "Risk_Score": score, "Predicted_High_Risk": flag, "Recovery_Strategy": strategy}
+                for override, (score, flag, strategy) in zip(overrides, scored)
+            ]
+
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def allocate_portfolio(self, loans_df: pd.DataFrame, capacities: dict, method: str = "price") -> tuple:
+        """
+        Assign recovery strategies across a book of loans within the teams' capacities
+        (see ``src.utils.portfolio_allocator``). Loans without a ``Risk_Score`` column
+        are scored first; like scenarios, this planning pass does not notify observers
+        (drift monitoring, audit log, portfolio aggregates).
+
+        :return: ``(allocation_df, summary)``; ``allocation_df`` is aligned with
+            ``loans_df`` and has ``Loan_ID`` (when given), ``Risk_Score``,
+            ``Recovery_Strategy`` and ``Expected_Recovery``.
+        """
+        try:
+            if "Risk_Score" in loans_df.columns:
+                risk_scores = loans_df["Risk_Score"].to_numpy(dtype=np.float64)
+            else:
+                risk_scores = self._score_frame(loans_df)["Risk_Score"].to_numpy()
+
+            allocation = allocate_strategies(
+                risk_scores, loans_df["Outstanding_Loan_Amount"].to_numpy(dtype=np.float64),
+                loans_df["Collateral_Value"].to_numpy(dtype=np.float64), capacities, method=method
+            )
+            allocation_df = pd.DataFrame({
+                "Risk_Score": risk_scores,
+                "Recovery_Strategy": allocation["strategies"],
+                "Expected_Recovery": allocation["expected_recovery"],
+            }, index=loans_df.index)
+            if "Loan_ID" in loans_df.columns:
+                allocation_df.insert(0, "Loan_ID", loans_df["Loan_ID"])
+            logging.info("📦 Allocated %d loans: %s", len(loans_df),
+                         {strategy: row["cases"] for strategy, row in allocation["summary"]["strategies"].items()})
+            return allocation_df, allocation["summary"]
 
         except Exception as e:
             raise USvisaException(e, sys)
@@ -61,7 +438,8 @@ class PredictionPipeline:
             # Suppress feature name warnings from sklearn
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                risk_scores = self.model.predict_proba(transformed_data)[:, 1]
+                model = self.model_for(input_data.get(ROUTING_COLUMN))
+                risk_scores = model.predict_proba(transformed_data)[:, 1]
                 predicted_flags = (risk_scores > 0.5).astype(int)
 
             result = {
@@ -69,7 +447,9 @@ class PredictionPipeline:
                 "Predicted_High_Risk": int(predicted_flags[0])
             }
 
-            logging.info(f"✅ Prediction complete. Result: {result}")
+            self._notify("observe_record", input_data, result)
+            logging.info("✅ Prediction complete. Risk_Score=%.4f Predicted_High_Risk=%d",
+                         result["Risk_Score"], result["Predicted_High_Risk"])
             return result
 
         except Exception as e:
@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from src.configuration.mongo_db_connection import MongoDBClient
+from src.configuration.local_document_store import LocalCollection
+from src.constants import SCHEMA_FILE_PATH
+from src.entity.config_entity import RescoringConfig
+from src.exception import USvisaException
+from src.logger import logging
+from src.pipline.prediction_pipeline import PredictionPipeline, ROUTING_COLUMN
+from src.monitoring.portfolio import KEY_COLUMN
+from src.utils.main_utils import read_yaml_file
+from src.utils.recovery_strategy import assign_recovery_strategies
+
+
+def _encode_watermark(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_watermark(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def _like(moment, stored):
+    """
+    ``moment`` in the form ``stored`` (an ``Updated_At`` value) has, so the two
+    compare: a ``str()`` in the local:// store, a naive UTC datetime from pymongo.
+    """
+    if not isinstance(moment, datetime):
+        return moment
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    if isinstance(stored, str):
+        return str(moment)
+    if isinstance(stored, datetime) and stored.tzinfo is None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class RescoringWorker:
+    """
+    Keeps ``Risk_Score``, ``Predicted_High_Risk`` and ``Recovery_Strategy`` current
+    in the loan collection. Changed loans are picked up from a change stream, or
+    by polling ``Updated_At`` where change streams are unavailable (standalone
+    servers, the local:// store), scored in micro-batches through one cached
+    ``PredictionPipeline`` and written back with an unordered ``bulk_write``.
+
+    Progress (the change stream resume token or the polling watermark) is kept in
+    ``state_file_path`` so a restarted worker only scores what changed meanwhile.
+    Loans are scored with their ``Loan_ID`` (``_id`` when missing), so the
+    pipeline's portfolio aggregates count each loan once at its latest score;
+    they are written to ``portfolio_snapshot_path`` before progress is saved,
+    restored on restart, and read by the serving processes.
+    """
+
+    def __init__(self, rescoring_config: Optional[RescoringConfig] = None,
+                 prediction_pipeline: Optional[PredictionPipeline] = None):
+        try:
+            self.rescoring_config = rescoring_config or RescoringConfig()
+            mongo_client = MongoDBClient(max_pool_size=self.rescoring_config.max_pool_size)
+            self.collection = mongo_client.database[self.rescoring_config.collection_name]
+            self.required_columns = read_yaml_file(SCHEMA_FILE_PATH)["loan_recovery"]["required_columns"]
+            self._prediction_pipeline = prediction_pipeline
+            self.state = self._load_state()
+            self.stats = {"scored": 0, "skipped": 0, "batches": 0, "modified": 0}
+            self._portfolio_dirty = False
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @property
+    def prediction_pipeline(self) -> PredictionPipeline:
+        if self._prediction_pipeline is None:
+            pipeline = PredictionPipeline(artifact_dir=self.rescoring_config.model_artifact_dir)
+            snapshot_path = self.rescoring_config.portfolio_snapshot_path
+            if snapshot_path and os.path.exists(snapshot_path):
+                pipeline.portfolio.load_snapshot(snapshot_path)
+                logging.info(f"📊 Restored portfolio totals from: {snapshot_path}")
+            self._prediction_pipeline = pipeline
+        return self._prediction_pipeline
+
+    def _load_state(self) -> dict:
+        path = self.rescoring_config.state_file_path
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            state = json.load(f)
+        state["watermark"] = _decode_watermark(state.get("watermark"))
+        state["scored_versions"] = {loan_id: _decode_watermark(updated_at)
+                                    for loan_id, updated_at in state.get("scored_versions", {}).items()}
+        return state
+
+    def _save_portfolio(self) -> None:
+        # Written before progress, so saved progress never covers loans the snapshot lacks.
+        if self._portfolio_dirty and self.rescoring_config.portfolio_snapshot_path:
+            self.prediction_pipeline.portfolio.save_snapshot(self.rescoring_config.portfolio_snapshot_path)
+            self._portfolio_dirty = False
+
+    def _save_state(self) -> None:
+        self._save_portfolio()
+        path = self.rescoring_config.state_file_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**self.state, "watermark": _encode_watermark(self.state.get("watermark")),
+                       "scored_versions": {loan_id: _encode_watermark(updated_at) for loan_id, updated_at
+                                           in self.state.get("scored_versions", {}).items()}},
+                      f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def score_documents(self, documents: List[dict]) -> int:
+        """
+        Score one micro-batch of loan documents and write the results back.
+        Loans missing a required feature are skipped. Returns the number scored.
+        """
+        try:
+            if not documents:
+                return 0
+            df = pd.DataFrame(documents).replace({"na": np.nan})
+            # Unordered writes may apply in any order, so keep only the latest version of a loan.
+            df = df.drop_duplicates(subset="_id", keep="last")
+
+            missing_columns = [col for col in self.required_columns if col not in df.columns]
+            complete = (df.reindex(columns=self.required_columns).notna().all(axis=1)
+                        if not missing_columns else pd.Series(False, index=df.index))
+            skipped = int((~complete).sum())
+            if skipped:
+                logging.warning(f"⚠️ Skipping {skipped} loans with missing features")
+            df = df.loc[complete]
+
+            if len(df):
+                # Loan_Type lets the pipeline route to per-loan-type models; the key lets the
+                # portfolio aggregates replace a rescored loan's contribution instead of adding it again.
+                features = self.required_columns + ([ROUTING_COLUMN] if ROUTING_COLUMN in df.columns else [])
+                ids = df["_id"].astype(str)
+                keys = df[KEY_COLUMN].astype(object).fillna(ids) if KEY_COLUMN in df.columns else ids
+                predictions = self.prediction_pipeline.predict_batch(
+                    df[features].assign(**{KEY_COLUMN: keys.astype(str).to_numpy()})
+                )
+                self._portfolio_dirty = True
+                strategies = assign_recovery_strategies(predictions["Risk_Score"].to_numpy())
+                scored_at = datetime.now(timezone.utc)
+                requests = [
+                    UpdateOne({"_id": loan_id}, {"$set": {
+                        "Risk_Score": float(score),
+                        "Predicted_High_Risk": int(flag),
+                        "Recovery_Strategy": strategy,
+                        self.rescoring_config.scored_at_field: scored_at,
+                    }})
+                    for loan_id, score, flag, strategy in zip(
+                        df["_id"], predictions["Risk_Score"], predictions["Predicted_High_Risk"], strategies
+                    )
+                ]
+                result = self.collection.bulk_write(requests, ordered=False)
+                self.stats["modified"] += result.modified_count
+
+            self.stats["scored"] += len(df)
+            self.stats["skipped"] += skipped
+            self.stats["batches"] += 1
+            logging.info(f"🔁 Rescored {len(df)} loans (batch {self.stats['batches']})")
+            return len(df)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _micro_batches(self, documents: Iterable[dict]) -> Iterator[List[dict]]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.rescoring_config.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _projection(self) -> dict:
+        fields = self.required_columns + ["_id", KEY_COLUMN, ROUTING_COLUMN, self.rescoring_config.updated_at_field]
+        return {field: 1 for field in fields}
+
+    def run_once(self) -> int:
+        """
+        One polling pass: score every loan whose ``Updated_At`` is at or after the
+        stored watermark (the whole book on the first run), then advance it.
+
+        The cursor is not sorted, and a loan can be committed with an ``Updated_At``
+        older than loans this pass already read. So the next watermark stays
+        ``watermark_lag_s`` behind the pass start (or at the newest loan seen, if
+        older), and ``$gte`` re-reads the loans sitting on it. Loans re-read
+        with the same ``Updated_At`` as when they were scored are skipped.
+        """
+        try:
+            updated_at_field = self.rescoring_config.updated_at_field
+            pass_started = datetime.now(timezone.utc)
+            cutoff = pass_started - timedelta(seconds=self.rescoring_config.watermark_lag_s)
+            watermark = self.state.get("watermark")
+            scored_versions = self.state.get("scored_versions", {})  # _id -> Updated_At, at/after the watermark
+            query = {updated_at_field: {"$gte": watermark}} if watermark is not None else {}
+
+            newest, at_newest, after_cutoff = None, {}, {}
+
+            def unscored(documents: Iterable[dict]) -> Iterator[dict]:
+                nonlocal newest, at_newest
+                for document in documents:
+                    updated_at = document.get(updated_at_field)
+                    if updated_at is not None:
+                        loan_id = str(document["_id"])
+                        if newest is None or updated_at > newest:
+                            newest, at_newest = updated_at, {}
+                        if updated_at == newest:
+                            at_newest[loan_id] = updated_at
+                        if updated_at >= _like(cutoff, updated_at):
+                            after_cutoff[loan_id] = updated_at
+                        if scored_versions.get(loan_id, None) == updated_at:
+                            continue
+                    yield document
+
+            scored = 0
+            for batch in self._micro_batches(unscored(self.collection.find(query, self._projection()))):
+                scored += self.score_documents(batch)
+
+            if newest is None:
+                # Nothing changed, or (first run) nothing carries Updated_At yet: only
+                # changes made from now on count.
+                next_watermark = watermark if watermark is not None else cutoff
+                versions = {}
+            else:
+                next_watermark = min(newest, _like(cutoff, newest))
+                if watermark is not None and next_watermark < _like(watermark, newest):
+                    next_watermark = _like(watermark, newest)
+                versions = {loan_id: updated_at for loan_id, updated_at in {**at_newest, **after_cutoff}.items()
+                            if updated_at >= next_watermark}
+            self._save_portfolio()
+            if next_watermark != watermark or versions != scored_versions:
+                self.state["watermark"] = next_watermark
+                self.state["scored_versions"] = versions
+                self._save_state()
+            return scored
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _change_stream_pipeline(self) -> list:
+        # Our own write-back only touches score fields, so it never re-triggers scoring.
+        feature_updated = [
+            {f"updateDescription.updatedFields.{col}": {"$exists": True}} for col in self.required_columns
+        ]
+        return [{"$match": {"$or": [{"operationType": {"$in": ["insert", "replace"]}}] + feature_updated}}]
+
+    def run_change_stream(self, stop_event: threading.Event) -> None:
+        """
+        Score inserted/replaced loans and loans whose features were updated, as
+        they happen. A partial batch is flushed after ``max_batch_wait_s``.
+        """
+        max_await_ms = int(self.rescoring_config.max_batch_wait_s * 1000)
+        with self.collection.watch(self._change_stream_pipeline(), full_document="updateLookup",
+                                   resume_after=self.state.get("resume_token"),
+                                   max_await_time_ms=max_await_ms) as stream:
+            batch, batch_started = [], time.monotonic()
+            while not stop_event.is_set():
+                change = stream.try_next()
+                if change is not None and change.get("fullDocument"):
+                    batch.append(change["fullDocument"])
+
+                waited = time.monotonic() - batch_started
+                if batch and (len(batch) >= self.rescoring_config.batch_size
+                              or change is None or waited >= self.rescoring_config.max_batch_wait_s):
+                    self.score_documents(batch)
+                    batch, batch_started = [], time.monotonic()
+                if not batch:
+                    self.state["resume_token"] = stream.resume_token
+                    self._save_state()
+                    batch_started = time.monotonic()
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Run until ``stop_event`` is set, using a change stream when ``mode`` allows
+        and the server supports it, polling otherwise.
+        """
+        try:
+            stop_event = stop_event or threading.Event()
+            mode = self.rescoring_config.mode
+            use_change_stream = mode == "change_stream" or (
+                mode == "auto" and not isinstance(self.collection, LocalCollection)
+            )
+            if use_change_stream:
+                try:
+                    logging.info("👀 Watching loan collection change stream")
+                    self.run_change_stream(stop_event)
+                    return
+                except OperationFailure as e:
+                    if mode == "change_stream":
+                        raise
+                    logging.warning(f"⚠️ Change streams unavailable ({e}); polling {self.rescoring_config.updated_at_field}")
+
+            logging.info(f"⏲️ Polling loan collection every {self.rescoring_config.poll_interval_s}s")
+            while not stop_event.is_set():
+                self.run_once()
+                stop_event.wait(self.rescoring_config.poll_interval_s)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore loans whose features changed and write scores back.")
+    parser.add_argument("--mode", choices=["auto", "change_stream", "poll"], default="auto")
+    parser.add_argument("--once", action="store_true", help="Run a single polling pass and exit")
+    parser.add_argument("--batch-size", type=int, default=RescoringConfig.batch_size)
+    parser.add_argument("--max-batch-wait", type=float, default=RescoringConfig.max_batch_wait_s)
+    parser.add_argument("--poll-interval", type=float, default=RescoringConfig.poll_interval_s)
+    parser.add_argument("--max-pool-size", type=int, default=RescoringConfig.max_pool_size)
+    parser.add_argument("--artifact-dir", default=None, help="Model run (artifact/<ts>) to score with")
+    parser.add_argument("--state-file", default=RescoringConfig.state_file_path)
+    args = parser.parse_args(argv)
+
+    worker = RescoringWorker(RescoringConfig(
+        mode=args.mode,
+        batch_size=args.batch_size,
+        max_batch_wait_s=args.max_batch_wait,
+        poll_interval_s=args.poll_interval,
+        max_pool_size=args.max_pool_size,
+        model_artifact_dir=args.artifact_dir,
+        state_file_path=args.state_file,
+    ))
+    if args.once:
+        worker.run_once()
+    else:
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            pass
+    logging.info(f"🔁 Rescoring stats: {worker.stats}")
+    print(json.dumps(worker.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.exception import USvisaException
+from src.logger import logging
+
+
+class StageCheckFailed(Exception):
+    """
+    Raised when a stage finished but its ``check`` rejected the artifact
+    (e.g. data validation returned ``validation_status=False``).
+    """
+
+    def __init__(self, stage_name: str, message: str):
+        super().__init__(f"Stage '{stage_name}' failed its check: {message}")
+        self.stage_name = stage_name
+
+
+@dataclass
+class PipelineStage:
+    """
+    One node of the training DAG.
+
+    :param name: stage name, also used for checkpoints and profiling.
+    :param run: callable receiving the consumed artifacts positionally, in ``consumes`` order.
+    :param consumes: artifact dataclasses this stage reads; each must be produced by another stage.
+    :param produces: artifact dataclass this stage returns.
+    :param after: names of stages that must succeed first without passing an artifact
+        (a gate, e.g. training waits for validation).
+    :param check: optional callable returning an error message when the produced
+        artifact means the pipeline must stop.
+    """
+    name: str
+    run: Callable
+    produces: type
+    consumes: Tuple[type, ...] = ()
+    after: Tuple[str, ...] = ()
+    check: Optional[Callable] = None
+    depends_on: Tuple[str, ...] = field(init=False, default=())
+
+
+class StageScheduler:
+    """
+    Runs a DAG of ``PipelineStage`` on a thread pool, starting every stage as soon
+    as the stages it depends on have succeeded, so end-to-end wall time approaches
+    the critical path. On the first failure the cancel event is set, queued stages
+    are dropped, and the error is raised once the stages already running (which
+    cannot be interrupted) have returned; their results are discarded.
+    """
+
+    def __init__(self, stages: List[PipelineStage], max_workers: int = 2,
+                 cancel_event: Optional[threading.Event] = None):
+        try:
+            self.stages = {stage.name: stage for stage in stages}
+            self.max_workers = max_workers
+            self.cancel_event = cancel_event or threading.Event()
+
+            producers = {stage.produces: stage.name for stage in stages}
+            for stage in stages:
+                missing = [t.__name__ for t in stage.consumes if t not in producers]
+                if missing:
+                    raise ValueError(f"Stage '{stage.name}' consumes artifacts nobody produces: {missing}")
+                stage.depends_on = tuple(dict.fromkeys(
+                    [producers[t] for t in stage.consumes] + list(stage.after)
+                ))
+            self._check_acyclic()
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline stages at '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _execute(self, stage: PipelineStage, artifacts: Dict[type, object]):
+        inputs = [artifacts[t] for t in stage.consumes]
+        artifact = stage.run(*inputs)
+        if not isinstance(artifact, stage.produces):
+            raise TypeError(f"Stage '{stage.name}' returned {type(artifact).__name__}, "
+                            f"expected {stage.produces.__name__}")
+        if stage.check is not None:
+            error = stage.check(artifact)
+            if error:
+                raise StageCheckFailed(stage.name, error)
+        return artifact
+
+    def run(self) -> Dict[type, object]:
+        """
+        Execute all stages and return the produced artifacts keyed by dataclass type.
+        """
+        artifacts: Dict[type, object] = {}
+        completed, running = set(), {}
+        pending = dict(self.stages)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(dep in completed for dep in s.depends_on)]
+                for stage in ready:
+                    del pending[stage.name]
+                    logging.info(f"▶️ Scheduling stage '{stage.name}'")
+                    running[executor.submit(self._execute, stage, artifacts)] = stage
+
+                if not running:
+                    raise RuntimeError(f"Stages can never become ready: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        self.cancel_event.set()
+                        for other in running:
+                            other.cancel()
+                        cancelled = sorted(list(pending) + [s.name for s in running.values()])
+                        logging.error(f"❌ Stage '{stage.name}' failed; cancelling {cancelled}")
+                        raise error
+                    artifacts[stage.produces] = future.result()
+                    completed.add(stage.name)
+            return artifacts
+        finally:
+            # Wait for in-flight stages even after a failure, so none of them outlives
+            # the caller's context (e.g. keeps logging to an MLflow run it has ended).
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import mlflow
 
 from src.entity.config_entity import (
@@ -8,7 +9,9 @@ from src.entity.config_entity import (
     DataTransformationConfig,
     ModelTrainerConfig,
     ModelEvaluationConfig,
-    TrainingPipelineConfig
+    LoanTypeTrainerConfig,
+    TrainingPipelineConfig,
+    ProfilingConfig
 )
 
 from src.entity.artifact_entity import (
@@ -16,7 +19,9 @@ from src.entity.artifact_entity import (
     DataValidationArtifact,
     DataTransformationArtifact,
     ModelTrainerArtifact,
-    ModelEvaluationArtifact
+    ModelEvaluationArtifact,
+    LoanTypeModelsArtifact,
+    ProfilingArtifact
 )
 
 from src.components.data_ingestion import DataIngestion
@@ -24,36 +29,169 @@ from src.components.data_validation import DataValidation
 from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
 from src.components.model_evaluation import ModelEvaluation
+from src.components.loan_type_trainer import LoanTypeModelTrainer
 
 from src.logger import logging
 from src.exception import USvisaException
-from src.constants import MODEL_EVALUATION_FILE_NAME
+from src.utils.profiling import StageProfiler
+from src.entity.run_manifest import RunManifest
+from src.pipline.stage_scheduler import PipelineStage, StageScheduler, StageCheckFailed
+from src.constants import (
+    MODEL_EVALUATION_FILE_NAME,
+    MLFLOW_TRACKING_URI,
+    MLFLOW_EXPERIMENT_NAME,
+    RUN_MANIFEST_FILE_NAME
+)
 
 
 class TrainPipeline:
-    def __init__(self):
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = None,
+                 profile: bool = False, cprofile: bool = False, resume_dir: str = None,
+                 max_workers: int = 2, chunk_size: int = None, loan_type_models: bool = False):
+        """
+        :param loan_type_models: also train one model per ``Loan_Type`` (in parallel
+            with the global model), which ``PredictionPipeline`` routes requests to.
+        :param chunk_size: train out-of-core, reading and transforming at most this
+            many rows at a time; ``None`` keeps the whole dataset in memory.
+        :param max_workers: threads used to run independent stages concurrently;
+            1 runs the stage graph strictly in sequence.
+        :param resume_dir: an existing ``artifact/<ts>`` directory; stages recorded as
+            completed in its run manifest are skipped and their artifacts reused.
+        :param profile: record wall/CPU time, peak RSS and tracemalloc top allocations
+            per stage into ``<artifact_dir>/profiling/`` and MLflow metrics.
+        :param cprofile: additionally dump a cProfile ``.prof`` file per stage.
+        """
         try:
             logging.info("🚀 Initializing TrainPipeline")
 
             # ✅ MLflow setup (only once)
-            mlflow.set_tracking_uri("https://dagshub.com/shobanjatoth/News-dashboard-MLops.mlflow")
-            mlflow.set_experiment("LoanRecoveryExperiment")
+            mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+            mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
 
             # Pipeline configs
-            self.training_pipeline_config = TrainingPipelineConfig()
+            if resume_dir:
+                resume_dir = os.path.normpath(resume_dir)
+                if not os.path.isfile(os.path.join(resume_dir, RUN_MANIFEST_FILE_NAME)):
+                    raise FileNotFoundError(f"No run manifest found in: {resume_dir}")
+                training_pipeline_config = TrainingPipelineConfig(
+                    artifact_dir=resume_dir, timestamp=os.path.basename(resume_dir)
+                )
+            self.training_pipeline_config = training_pipeline_config or TrainingPipelineConfig()
+            if chunk_size:
+                self.training_pipeline_config.chunk_size = chunk_size
+            self.manifest = RunManifest(
+                os.path.join(self.training_pipeline_config.artifact_dir, RUN_MANIFEST_FILE_NAME)
+            )
+            # A checkpoint is reused only while none of the stage's upstream stages re-executed.
+            self._resuming = bool(resume_dir)
+            self._executed_stages = set()
+            self._cancel_event = threading.Event()
+            self.max_workers = max_workers
 
             self.data_ingestion_config = DataIngestionConfig(self.training_pipeline_config)
             self.data_validation_config = DataValidationConfig(self.training_pipeline_config)
             self.data_transformation_config = DataTransformationConfig(self.training_pipeline_config)
             self.model_trainer_config = ModelTrainerConfig(self.training_pipeline_config)
+            self.loan_type_trainer_config = (
+                LoanTypeTrainerConfig(self.training_pipeline_config) if loan_type_models else None
+            )
+            if loan_type_models and self.training_pipeline_config.chunk_size and max_workers > 1:
+                # Both trainers then run at once, each with a process pool: split the CPUs.
+                cpus = os.cpu_count() or 2
+                self.model_trainer_config.n_jobs = max(1, cpus // 2)
+                self.loan_type_trainer_config.n_jobs = max(1, cpus - cpus // 2)
 
             model_eval_dir = os.path.join(self.training_pipeline_config.artifact_dir, "model_evaluation")
             report_path = os.path.join(model_eval_dir, MODEL_EVALUATION_FILE_NAME)
-            self.model_evaluation_config = ModelEvaluationConfig(report_file_path=report_path)
+            self.model_evaluation_config = ModelEvaluationConfig(
+                report_file_path=report_path, chunk_size=self.training_pipeline_config.chunk_size
+            )
+
+            # Stage profiling is opt-in; when off, stages are called directly.
+            self.profiler = None
+            if profile or cprofile:
+                self.profiling_config = ProfilingConfig(self.training_pipeline_config, use_cprofile=cprofile)
+                self.profiler = StageProfiler(
+                    self.profiling_config.profiling_dir,
+                    use_tracemalloc=self.profiling_config.use_tracemalloc,
+                    use_cprofile=self.profiling_config.use_cprofile
+                )
 
         except Exception as e:
             raise USvisaException(e, sys)
 
+    def _run_stage(self, stage_name: str, stage_fn, *args, depends_on=(), **kwargs):
+        upstream_reran = any(dep in self._executed_stages for dep in depends_on)
+        if self._resuming and not upstream_reran and self.manifest.is_completed(stage_name):
+            artifact = self.manifest.get_artifact(stage_name)
+            logging.info(f"⏭️ Skipping completed stage '{stage_name}', reusing: {artifact}")
+            return artifact
+        self._executed_stages.add(stage_name)
+
+        try:
+            if self.profiler is None:
+                artifact = stage_fn(*args, **kwargs)
+            else:
+                with self.profiler.profile_stage(stage_name):
+                    artifact = stage_fn(*args, **kwargs)
+        except Exception as e:
+            self.manifest.mark_failed(stage_name, str(e))
+            raise
+
+        if self._cancel_event.is_set():
+            logging.info(f"🛑 Discarding result of stage '{stage_name}': pipeline was cancelled")
+            return artifact
+        self.manifest.mark_completed(stage_name, artifact)
+        return artifact
+
+    def _stage_task(self, stage_name: str, stage_fn, depends_on: tuple):
+        def task(*args):
+            return self._run_stage(stage_name, stage_fn, *args, depends_on=depends_on)
+        return task
+
+    def build_stage_graph(self) -> list:
+        """
+        The pipeline as a DAG: validation and transformation both only need the
+        ingested file and run concurrently; training is gated on validation.
+        Per-loan-type models, when enabled, train alongside the global model.
+        """
+        def validation_check(artifact: DataValidationArtifact):
+            return None if artifact.validation_status else artifact.message
+
+        stages = [
+            PipelineStage("data_ingestion", self.start_data_ingestion,
+                          produces=DataIngestionArtifact),
+            PipelineStage("data_validation", self.start_data_validation,
+                          consumes=(DataIngestionArtifact,), produces=DataValidationArtifact,
+                          check=validation_check),
+            PipelineStage("data_transformation", self.start_data_transformation,
+                          consumes=(DataIngestionArtifact,), produces=DataTransformationArtifact),
+            PipelineStage("model_trainer", self.start_model_training,
+                          consumes=(DataTransformationArtifact,), produces=ModelTrainerArtifact,
+                          after=("data_validation",)),
+            PipelineStage("model_evaluation", self.start_model_evaluation,
+                          consumes=(ModelTrainerArtifact, DataTransformationArtifact),
+                          produces=ModelEvaluationArtifact),
+        ]
+        if self.loan_type_trainer_config is not None:
+            stages.append(PipelineStage("loan_type_trainer", self.start_loan_type_training,
+                                        consumes=(DataTransformationArtifact,),
+                                        produces=LoanTypeModelsArtifact,
+                                        after=("data_validation",)))
+        return stages
+
+    def save_profile(self) -> ProfilingArtifact:
+        report_file_path = self.profiler.write_report(self.profiling_config.report_file_path)
+        mlflow.log_metrics(self.profiler.metrics())
+        mlflow.log_artifacts(self.profiling_config.profiling_dir, artifact_path="profiling")
+
+        artifact = ProfilingArtifact(
+            report_file_path=report_file_path,
+            total_wall_s=sum(stats["wall_s"] for stats in self.profiler.stages.values())
+        )
+        logging.info(f"⏱️ Profiling Artifact: {artifact}")
+        return artifact
+
     def start_data_ingestion(self) -> DataIngestionArtifact:
         logging.info("📥 Starting data ingestion...")
         ingestion = DataIngestion(self.data_ingestion_config)
@@ -69,11 +207,25 @@ class TrainPipeline:
         transformation = DataTransformation(ingestion_artifact, self.data_transformation_config)
         return transformation.initiate_data_transformation()
 
-    def start_model_training(self) -> ModelTrainerArtifact:
+    def start_model_training(
+        self, transformation_artifact: DataTransformationArtifact = None
+    ) -> ModelTrainerArtifact:
         logging.info("🏗️ Starting model training...")
+        if transformation_artifact is not None:
+            self.model_trainer_config.transformed_train_file_path = transformation_artifact.transformed_train_file_path
+            self.model_trainer_config.split_file_path = transformation_artifact.split_file_path
+            self.model_trainer_config.drift_reference_file_path = transformation_artifact.drift_reference_file_path
+            self.model_trainer_config.transformer_object_path = transformation_artifact.transformer_object_path
         trainer = ModelTrainer(self.model_trainer_config)
         return trainer.train_model()
 
+    def start_loan_type_training(
+        self, transformation_artifact: DataTransformationArtifact
+    ) -> LoanTypeModelsArtifact:
+        logging.info("🏗️ Starting per-loan-type model training...")
+        trainer = LoanTypeModelTrainer(transformation_artifact, self.loan_type_trainer_config)
+        return trainer.initiate_loan_type_training()
+
     def start_model_evaluation(
         self,
         model_trainer_artifact: ModelTrainerArtifact,
@@ -91,27 +243,32 @@ class TrainPipeline:
         try:
             logging.info("🏁 Pipeline execution started")
 
-            # ✅ Start MLflow run for entire pipeline
-            with mlflow.start_run(run_name="LoanRecoveryPipeline"):
-                ingestion_artifact = self.start_data_ingestion()
-
-                validation_artifact = self.start_data_validation(ingestion_artifact)
-                if not validation_artifact.validation_status:
-                    raise Exception("❌ Data validation failed. Stopping pipeline.")
-
-                transformation_artifact = self.start_data_transformation(ingestion_artifact)
-                logging.info(f"✅ Data transformation completed.")
-
-                self.model_trainer_config.transformed_train_file_path = transformation_artifact.transformed_train_file_path
-
-                model_trainer_artifact = self.start_model_training()
-                logging.info(f"✅ Model training completed.")
-
-                evaluation_artifact = self.start_model_evaluation(
-                    model_trainer_artifact=model_trainer_artifact,
-                    data_transformation_artifact=transformation_artifact
-                )
-                logging.info(f"📄 Evaluation Report: {evaluation_artifact}")
+            # ✅ Start MLflow run for entire pipeline (a resumed run continues the same MLflow run)
+            with mlflow.start_run(run_name="LoanRecoveryPipeline", run_id=self.manifest.mlflow_run_id) as run:
+                self.manifest.mlflow_run_id = run.info.run_id
+                # Stages run on worker threads, which have no active MLflow run of their
+                # own (MLflow tracks it per thread): they log to this run by id instead.
+                for config in (self.model_trainer_config, self.loan_type_trainer_config,
+                               self.model_evaluation_config):
+                    if config is not None:
+                        config.mlflow_run_id = run.info.run_id
+
+                stages = self.build_stage_graph()
+                scheduler = StageScheduler(stages, max_workers=self.max_workers,
+                                           cancel_event=self._cancel_event)
+                for stage in stages:
+                    stage.run = self._stage_task(stage.name, stage.run, stage.depends_on)
+
+                try:
+                    artifacts = scheduler.run()
+                except StageCheckFailed as e:
+                    self.manifest.mark_failed(e.stage_name, str(e))
+                    raise Exception(f"❌ {e}. Stopping pipeline.")
+
+                logging.info(f"📄 Evaluation Report: {artifacts[ModelEvaluationArtifact]}")
+
+                if self.profiler is not None:
+                    self.save_profile()
 
         except Exception as e:
             raise USvisaException(e, sys)
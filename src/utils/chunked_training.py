@@ -0,0 +1,226 @@
+"""
+Helpers for training forests in worker processes: per-chunk sub-forests that are
+merged into one ``RandomForestClassifier`` (out-of-core mode), per-loan-type
+models, and binary metrics accumulated chunk by chunk.
+
+Kept free of MLflow/pipeline imports so worker processes start quickly.
+"""
+
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
+from sklearn.ensemble import RandomForestClassifier
+
+from src.utils.mapped_artifact import mapped_artifact_path, save_mapped_model
+
+
+def iter_row_blocks(n_rows: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, n_rows, chunk_size):
+        yield start, min(start + chunk_size, n_rows)
+
+
+def split_estimators(n_estimators: int, n_groups: int) -> List[int]:
+    """
+    Spread exactly ``n_estimators`` trees over ``n_groups`` sub-forests (at least
+    one tree each, so ``n_groups`` may not exceed ``n_estimators``).
+    """
+    if not 1 <= n_groups <= n_estimators:
+        raise ValueError(f"Cannot spread {n_estimators} trees over {n_groups} sub-forests")
+    base, remainder = divmod(n_estimators, n_groups)
+    return [base + (1 if i < remainder else 0) for i in range(n_groups)]
+
+
+def plan_sub_forests(n_rows: int, chunk_size: int, n_estimators: int) -> List[Tuple[int, int, int]]:
+    """
+    Assign the trees of one forest to row ranges as ``(start, stop, n_trees)``.
+    Each range is one chunk, or several consecutive chunks when there are more
+    chunks than trees, so the merged forest always has ``n_estimators`` trees.
+    Pass ``chunk_size`` as ``max_rows`` to ``fit_sub_forest`` so no fit reads a
+    whole multi-chunk range.
+    """
+    blocks = list(iter_row_blocks(n_rows, chunk_size))
+    groups = np.array_split(np.arange(len(blocks)), min(len(blocks), n_estimators))
+    ranges = [(blocks[group[0]][0], blocks[group[-1]][1]) for group in groups]
+    return [(start, stop, n_trees)
+            for (start, stop), n_trees in zip(ranges, split_estimators(n_estimators, len(ranges)))]
+
+
+def _training_rows(data: np.ndarray, test_mask: np.ndarray, positions,
+                   loan_types: np.ndarray = None, loan_type: str = None) -> np.ndarray:
+    keep = ~np.asarray(test_mask[positions])
+    if loan_types is not None:
+        keep &= np.asarray(loan_types[positions]) == loan_type
+    return np.asarray(data[positions][keep])
+
+
+def _fit_forest(rows: np.ndarray, n_estimators: int, random_state: int, forest_params: dict,
+                bootstrap: bool = True) -> Optional[RandomForestClassifier]:
+    X, y = rows[:, :-1], rows[:, -1]
+    if len(np.unique(y)) < 2:
+        return None
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state,
+                                   bootstrap=bootstrap, **forest_params)
+    return model.fit(X, y)
+
+
+def fit_sub_forest(train_file_path: str, split_file_path: str, start: int, stop: int,
+                   n_estimators: int, random_state: int, forest_params: dict,
+                   max_rows: int = None, loan_type_file_path: str = None,
+                   loan_type: str = None) -> Optional[RandomForestClassifier]:
+    """
+    Fit a small forest on the training rows in ``[start, stop)`` of the
+    memory-mapped transformed array, reading at most ``max_rows`` rows per fit.
+    With ``loan_type_file_path``, only rows of ``loan_type`` are used.
+
+    A range that fits in ``max_rows`` is loaded and fit directly. A longer range
+    is never loaded whole: each tree is fit on its own bootstrap sample of
+    ``max_rows`` rows drawn from it. Trees whose sample holds a single class are
+    dropped, since they could not be merged with the others, so the result may
+    have fewer than ``n_estimators`` trees, or be ``None``.
+    """
+    data = np.load(train_file_path, mmap_mode="r")
+    test_mask = np.load(split_file_path, mmap_mode="r")
+    loan_types = np.load(loan_type_file_path, mmap_mode="r") if loan_type_file_path else None
+
+    if max_rows is None or stop - start <= max_rows:
+        return _fit_forest(_training_rows(data, test_mask, slice(start, stop), loan_types, loan_type),
+                           n_estimators, random_state, forest_params)
+
+    rng = np.random.default_rng(random_state)
+    trees = []
+    for seed in rng.integers(0, np.iinfo(np.int32).max, n_estimators):
+        # Drawn with replacement, so the sample already is the tree's bootstrap.
+        positions = np.sort(rng.integers(start, stop, max_rows))
+        tree = _fit_forest(_training_rows(data, test_mask, positions, loan_types, loan_type),
+                           1, int(seed), forest_params, bootstrap=False)
+        if tree is not None:
+            trees.append(tree)
+    return merge_forests(trees) if trees else None
+
+
+def fit_loan_type_forest(train_file_path: str, loan_type_file_path: str, loan_type: str,
+                         split_file_path: str, model_path: str, n_estimators: int, random_state: int,
+                         forest_params: dict, chunk_size: int = None) -> Optional[dict]:
+    """
+    Fit a forest on the training rows of one loan type, save it to ``model_path``
+    and return its row counts and held-out metrics, or ``None`` when the type's
+    training rows hold a single class.
+
+    Uses the same sub-forest plan as the global model: with ``chunk_size`` no
+    fit or evaluation step reads more than ``chunk_size`` rows.
+    """
+    import joblib
+
+    data = np.load(train_file_path, mmap_mode="r")
+    test_mask = np.load(split_file_path, mmap_mode="r")
+    loan_types = np.load(loan_type_file_path, mmap_mode="r")
+    n_rows = data.shape[0]
+    chunk_size = chunk_size or n_rows
+
+    plan = plan_sub_forests(n_rows, chunk_size, n_estimators)
+    forests = [
+        fit_sub_forest(train_file_path, split_file_path, start, stop, n_trees, random_state + index,
+                       forest_params, chunk_size, loan_type_file_path, loan_type)
+        for index, (start, stop, n_trees) in enumerate(plan)
+    ]
+    fitted = [(rows, forest) for rows, forest in zip(plan, forests) if forest is not None]
+    if not fitted:
+        return None
+    missing = n_estimators - sum(len(forest.estimators_) for _, forest in fitted)
+    if missing:
+        (start, stop, _), _ = fitted[0]
+        forests.append(fit_sub_forest(train_file_path, split_file_path, start, stop, missing,
+                                      random_state + len(plan), forest_params, chunk_size,
+                                      loan_type_file_path, loan_type))
+    model = merge_forests([forest for forest in forests if forest is not None])
+    joblib.dump(model, model_path)
+    save_mapped_model(mapped_artifact_path(model_path), model)
+
+    metrics = StreamingBinaryMetrics()
+    n_train = 0
+    for start, stop in iter_row_blocks(n_rows, chunk_size):
+        of_type = np.asarray(loan_types[start:stop]) == loan_type
+        is_test = np.asarray(test_mask[start:stop])
+        n_train += int(np.count_nonzero(of_type & ~is_test))
+        test_rows = np.asarray(data[start:stop][of_type & is_test])
+        if len(test_rows):
+            metrics.update(test_rows[:, -1], model.predict_proba(test_rows[:, :-1])[:, 1])
+
+    result = {"n_train": n_train, "n_test": metrics.n_samples}
+    if metrics.n_samples:
+        result["accuracy"] = metrics.accuracy()
+        if not np.isnan(metrics.roc_auc()):
+            result["roc_auc"] = metrics.roc_auc()
+    return result
+
+
+def merge_forests(forests: List[RandomForestClassifier]) -> RandomForestClassifier:
+    """
+    Concatenate the trees of several fitted forests into the first one.
+    """
+    model = forests[0]
+    for other in forests[1:]:
+        if not np.array_equal(other.classes_, model.classes_):
+            raise ValueError(f"Cannot merge forests with classes {other.classes_} and {model.classes_}")
+    model.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    model.n_estimators = len(model.estimators_)
+    return model
+
+
+class StreamingBinaryMetrics:
+    """
+    Accuracy, ROC-AUC and a ``classification_report``-shaped dict for a binary
+    problem, accumulated in constant memory. ROC-AUC is computed from score
+    histograms with ``n_bins`` buckets, exact when scores are tied within a bucket
+    (as forest probabilities with <= ``n_bins`` trees are).
+    """
+
+    def __init__(self, n_bins: int = 1000, threshold: float = 0.5):
+        self.n_bins = n_bins
+        self.threshold = threshold
+        self.pos_hist = np.zeros(n_bins, dtype=np.int64)
+        self.neg_hist = np.zeros(n_bins, dtype=np.int64)
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # [true, predicted]
+
+    def update(self, y_true: np.ndarray, y_prob: np.ndarray) -> None:
+        y_true = np.asarray(y_true).astype(int)
+        y_pred = (np.asarray(y_prob) > self.threshold).astype(int)
+        bins = np.minimum((np.asarray(y_prob) * self.n_bins).astype(int), self.n_bins - 1)
+        self.pos_hist += np.bincount(bins[y_true == 1], minlength=self.n_bins)
+        self.neg_hist += np.bincount(bins[y_true == 0], minlength=self.n_bins)
+        np.add.at(self.confusion, (y_true, y_pred), 1)
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.confusion.sum())
+
+    def accuracy(self) -> float:
+        return float(np.trace(self.confusion) / max(self.n_samples, 1))
+
+    def roc_auc(self) -> float:
+        positives, negatives = self.pos_hist.sum(), self.neg_hist.sum()
+        if positives == 0 or negatives == 0:
+            return float("nan")
+        negatives_below = np.cumsum(self.neg_hist) - self.neg_hist
+        return float(np.sum(self.pos_hist * (negatives_below + 0.5 * self.neg_hist)) / (positives * negatives))
+
+    def classification_report(self) -> dict:
+        report = {}
+        supports = self.confusion.sum(axis=1)
+        for label in (0, 1):
+            tp = self.confusion[label, label]
+            predicted = self.confusion[:, label].sum()
+            precision = float(tp / predicted) if predicted else 0.0
+            recall = float(tp / supports[label]) if supports[label] else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            report[str(label)] = {"precision": precision, "recall": recall,
+                                  "f1-score": f1, "support": float(supports[label])}
+
+        report["accuracy"] = self.accuracy()
+        for name, weights in (("macro avg", np.array([1.0, 1.0])), ("weighted avg", supports.astype(float))):
+            weights = weights / weights.sum() if weights.sum() else weights
+            report[name] = {
+                key: float(sum(report[str(label)][key] * weights[label] for label in (0, 1)))
+                for key in ("precision", "recall", "f1-score")
+            }
+            report[name]["support"] = float(supports.sum())
+        return report
@@ -0,0 +1,79 @@
+import sys
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from src.exception import USvisaException
+from src.utils.main_utils import read_yaml_file
+from src.constants import SCHEMA_FILE_PATH, MODEL_INPUT_DTYPE, MAX_CATEGORY_RATIO
+
+
+def frame_memory_mb(df: DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / 2**20
+
+
+class DtypePolicy:
+    """
+    Compact pandas dtypes derived from ``column_dtypes`` in config/schema.yaml.
+
+    - ``str`` columns become ``category``; other string columns (Loan_Type,
+      Recovery_Status, ...) too when they have few distinct values, while IDs stay objects.
+    - ``int`` columns are downcast to the narrowest signed integer holding the
+      observed values (columns with missing values are left as floats).
+    - ``float`` columns keep float64 so exported amounts stay exact; the matrices
+      fed to the model use ``MODEL_INPUT_DTYPE`` (float32, what the trees use internally).
+    """
+
+    def __init__(self, column_dtypes: dict, max_category_ratio: float = MAX_CATEGORY_RATIO):
+        self.column_dtypes = column_dtypes
+        self.max_category_ratio = max_category_ratio
+        self.model_input_dtype = np.dtype(MODEL_INPUT_DTYPE)
+
+    @classmethod
+    def from_schema(cls, schema_file_path: str = SCHEMA_FILE_PATH, **kwargs) -> "DtypePolicy":
+        try:
+            schema = read_yaml_file(schema_file_path)["loan_recovery"]
+            return cls(schema["column_dtypes"], **kwargs)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @property
+    def categorical_columns(self) -> list:
+        return [col for col, dtype in self.column_dtypes.items() if dtype == "str"]
+
+    @property
+    def integer_columns(self) -> list:
+        return [col for col, dtype in self.column_dtypes.items() if dtype == "int"]
+
+    def read_csv_dtypes(self) -> dict:
+        """
+        ``dtype=`` mapping for ``pd.read_csv`` so schema strings are parsed straight
+        into categoricals instead of materialising Python objects first.
+        """
+        return {col: "category" for col in self.categorical_columns}
+
+    def apply(self, df: DataFrame) -> DataFrame:
+        """
+        Return ``df`` with compact dtypes; columns missing from ``df`` are ignored.
+        """
+        try:
+            df = df.copy(deep=False)
+            for col in df.columns:
+                series = df[col]
+                if col in self.column_dtypes and self.column_dtypes[col] == "str":
+                    df[col] = series.astype("category")
+                elif col in self.integer_columns and pd.api.types.is_integer_dtype(series):
+                    df[col] = pd.to_numeric(series, downcast="integer")
+                elif (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)) and len(series):
+                    if series.nunique(dropna=True) <= self.max_category_ratio * len(series):
+                        df[col] = series.astype("category")
+            return df
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    def to_model_input(self, array) -> np.ndarray:
+        """
+        Densify a (possibly sparse) transformer output as a ``MODEL_INPUT_DTYPE`` array.
+        """
+        array = array.toarray() if hasattr(array, "toarray") else array
+        return np.asarray(array, dtype=self.model_input_dtype)
@@ -1,6 +1,5 @@
 import os
 import sys
-import yaml
 import joblib
 import numpy as np
 from pandas import DataFrame
@@ -10,6 +9,7 @@ from src.logger import logging
 
 def read_yaml_file(file_path: str) -> dict:
     try:
+        import yaml  # only needed by training-side callers; keeps serving imports light
         with open(file_path, "rb") as yaml_file:
             return yaml.safe_load(yaml_file)
     except Exception as e:
@@ -18,6 +18,7 @@ def read_yaml_file(file_path: str) -> dict:
 
 def write_yaml_file(file_path: str, content: object, replace: bool = False) -> None:
     try:
+        import yaml
         if replace and os.path.exists(file_path):
             os.remove(file_path)
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -28,25 +29,45 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
 
 
 def save_object(file_path: str, obj: object) -> None:
-    logging.info("Entered the save_object method of utils")
+    logging.debug("Entered the save_object method of utils")
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         joblib.dump(obj, file_path)
-        logging.info("Exited the save_object method of utils")
+        logging.debug("Exited the save_object method of utils")
     except Exception as e:
         raise USvisaException(e, sys) from e
 
 
 def load_object(file_path: str) -> object:
-    logging.info("Entered the load_object method of utils")
+    logging.debug("Entered the load_object method of utils")
     try:
         obj = joblib.load(file_path)
-        logging.info("Exited the load_object method of utils")
+        logging.debug("Exited the load_object method of utils")
         return obj
     except Exception as e:
         raise USvisaException(e, sys) from e
 
 
+def save_mapped_object(file_path: str, obj: object, feature_names: list = None) -> None:
+    """
+    Save ``obj`` in the memory-mapped artifact format (see ``src.utils.mapped_artifact``).
+    """
+    try:
+        from src.utils.mapped_artifact import save_mapped_model
+        save_mapped_model(file_path, obj, feature_names=feature_names)
+        logging.info(f"🗺️ Saved mapped artifact: {file_path}")
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
+def load_mapped_object(file_path: str, verify: bool = True) -> object:
+    try:
+        from src.utils.mapped_artifact import load_mapped_model
+        return load_mapped_model(file_path, verify=verify)
+    except Exception as e:
+        raise USvisaException(e, sys) from e
+
+
 def save_numpy_array_data(file_path: str, array: np.array):
     try:
         dir_path = os.path.dirname(file_path)
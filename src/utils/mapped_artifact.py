@@ -0,0 +1,229 @@
+"""
+Memory-mapped artifact format for the model and transformer.
+
+One file holds a JSON manifest followed by uncompressed arrays, each starting
+on a page boundary::
+
+    b"LRMAP\\0\\0\\1" | manifest length (uint64 LE) | manifest JSON | pad | array | pad | array ...
+
+Loading maps the file read-only and wraps each array in place with
+``np.frombuffer``, so nothing is deserialised or copied and every process
+serving the same file shares one page-cache copy. The manifest records the
+format version, the offset, dtype, shape and CRC-32 of every array, the total
+file size and the feature order. A truncated or partially replaced file fails
+the size or checksum test at load instead of producing wrong predictions.
+
+Random forests are stored as flat node arrays (``MappedForest``) rather than
+pickled sklearn trees, whose ``__setstate__`` copies every node array into
+private memory.
+"""
+
+import os
+import json
+import mmap
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+
+MAGIC = b"LRMAP\x00\x00\x01"
+MAPPED_SUFFIX = ".mmap"
+FORMAT_VERSION = 1
+PAGE_SIZE = 4096
+_HEADER = struct.Struct("<8sQ")
+
+
+class ArtifactIntegrityError(ValueError):
+    pass
+
+
+def mapped_artifact_path(file_path: str) -> str:
+    """
+    The mapped twin of a joblib artifact, e.g. ``risk_classifier.pkl`` -> ``risk_classifier.mmap``.
+    """
+    return os.path.splitext(file_path)[0] + MAPPED_SUFFIX
+
+
+def _align(offset: int) -> int:
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+
+def _crc32(buffer) -> int:
+    return zlib.crc32(buffer) & 0xFFFFFFFF
+
+
+def save_mapped_artifact(file_path: str, kind: str, arrays: dict, metadata: dict = None) -> str:
+    """
+    Write ``arrays`` (name -> ndarray) and ``metadata`` as one page-aligned file.
+    The file is written next to its destination and renamed into place, so a
+    reader never sees a partial write.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "nbytes": array.nbytes,
+                         "crc32": _crc32(memoryview(array).cast("B"))}
+
+    # Offsets depend on the manifest's own length; they are only a few digits, so one
+    # re-layout with a generous estimate is enough.
+    manifest = {"format_version": FORMAT_VERSION, "kind": kind, "metadata": metadata or {}, "arrays": entries}
+    for _ in range(2):
+        header_size = _HEADER.size + len(json.dumps(manifest).encode()) + 64
+        offset = _align(header_size)
+        for entry in entries.values():
+            entry["offset"] = offset
+            offset = _align(offset + entry["nbytes"])
+        manifest["file_size"] = offset
+    manifest_bytes = json.dumps(manifest).encode()
+    if _HEADER.size + len(manifest_bytes) > min(entry["offset"] for entry in entries.values()):
+        raise RuntimeError("Manifest outgrew its reserved space")
+
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for name, array in arrays.items():
+            f.seek(entries[name]["offset"])
+            f.write(memoryview(array).cast("B"))
+        f.truncate(manifest["file_size"])
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def load_mapped_artifact(file_path: str, verify: bool = True) -> tuple:
+    """
+    Map ``file_path`` and return ``(arrays, manifest)``; the arrays are read-only
+    views of the mapping. The header, version and file size are always checked;
+    ``verify`` also checks every array's CRC-32.
+    """
+    with open(file_path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size < _HEADER.size:
+            raise ArtifactIntegrityError(f"{file_path}: truncated header")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, manifest_length = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ArtifactIntegrityError(f"{file_path}: not a mapped artifact")
+    manifest = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + manifest_length]))
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ArtifactIntegrityError(f"{file_path}: format version {manifest['format_version']}, "
+                                     f"expected {FORMAT_VERSION}")
+    if file_size != manifest["file_size"]:
+        raise ArtifactIntegrityError(f"{file_path}: {file_size} bytes, manifest says {manifest['file_size']}")
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        view = memoryview(buffer)[entry["offset"]:entry["offset"] + entry["nbytes"]]
+        if verify and _crc32(view) != entry["crc32"]:
+            raise ArtifactIntegrityError(f"{file_path}: checksum mismatch in {name!r}")
+        arrays[name] = np.frombuffer(view, dtype=np.dtype(entry["dtype"])).reshape(entry["shape"])
+    return arrays, manifest
+
+
+class MappedForest:
+    """
+    ``predict_proba`` of a fitted binary ``RandomForestClassifier`` evaluated
+    from flat node arrays, all trees at once: every sample walks every tree one
+    level per step, so the loop runs ``max_depth`` times regardless of batch size.
+    Splits compare float32 inputs with ``<=`` exactly as sklearn does, so scores match.
+    """
+
+    kind = "random_forest"
+
+    def __init__(self, arrays: dict, metadata: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.leaf_proba = arrays["leaf_proba"]
+        self.roots = arrays["roots"]
+        self.cover = arrays.get("cover")  # absent in files written before explanations
+        self.max_depth = metadata["max_depth"]
+        self.n_features_in_ = metadata["n_features"]
+        self.feature_names = metadata.get("feature_names")
+        self.classes_ = np.asarray(metadata["classes"])
+
+    @staticmethod
+    def arrays_from_sklearn(forest) -> tuple:
+        if len(forest.classes_) != 2 or forest.n_outputs_ != 1:
+            raise ValueError("MappedForest supports single-output binary classifiers only")
+        feature, threshold, left, right, proba, cover, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            # Global node ids; a leaf points at itself so extra steps leave it in place.
+            node_ids = np.arange(offset, offset + tree.node_count)
+            left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            value = tree.value[:, 0, :]
+            proba.append(value[:, 1] / value.sum(axis=1))
+            cover.append(tree.weighted_n_node_samples)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "children_left": np.concatenate(left).astype(np.int32),
+            "children_right": np.concatenate(right).astype(np.int32),
+            "leaf_proba": np.concatenate(proba).astype(np.float64),
+            # Training samples per node, for ``TreeExplainer``; not needed to predict.
+            "cover": np.concatenate(cover).astype(np.float64),
+            "roots": np.asarray(roots, dtype=np.int32),
+        }
+        metadata = {"max_depth": int(max_depth), "n_features": int(forest.n_features_in_),
+                    "classes": forest.classes_.tolist(), "n_estimators": len(forest.estimators_)}
+        return arrays, metadata
+
+    def predict_proba(self, X, block_size: int = 1024) -> np.ndarray:
+        X = X.toarray() if hasattr(X, "toarray") else X
+        X = np.asarray(X, dtype=np.float32)
+        positive = np.empty(len(X))
+        # Blocks keep the (rows x trees) node-id arrays cache-sized.
+        for start in range(0, len(X), block_size):
+            block = X[start:start + block_size]
+            flat, row_offsets = block.ravel(), (np.arange(len(block)) * block.shape[1])[:, None]
+            nodes = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+            for _ in range(self.max_depth):
+                go_left = flat.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+                nodes = np.where(go_left, self.children_left.take(nodes), self.children_right.take(nodes))
+            positive[start:start + block_size] = self.leaf_proba.take(nodes).mean(axis=1)
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def save_mapped_model(file_path: str, model, feature_names: list = None) -> str:
+    """
+    Save a forest as node arrays, anything else (e.g. the ColumnTransformer,
+    whose arrays are small) as a checksummed pickle blob. ``feature_names`` is
+    recorded as the expected input feature order.
+    """
+    try:
+        arrays, metadata = MappedForest.arrays_from_sklearn(model)
+        kind = MappedForest.kind
+    except (AttributeError, ValueError):
+        arrays = {"pickle": np.frombuffer(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)}
+        metadata, kind = {}, "pickle"
+    if feature_names is None and hasattr(model, "feature_names_in_"):
+        feature_names = list(model.feature_names_in_)
+    metadata["feature_names"] = [str(name) for name in feature_names] if feature_names is not None else None
+    if hasattr(model, "get_feature_names_out"):
+        metadata["output_feature_names"] = [str(name) for name in model.get_feature_names_out()]
+    return save_mapped_artifact(file_path, kind, arrays, metadata)
+
+
+def load_mapped_model(file_path: str, verify: bool = True):
+    arrays, manifest = load_mapped_artifact(file_path, verify=verify)
+    if manifest["kind"] == MappedForest.kind:
+        return MappedForest(arrays, manifest["metadata"])
+    return pickle.loads(arrays["pickle"])
@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from src.logger import logging
+
+
+class LRUModelCache:
+    """
+    Loads models on first use and keeps the most recently used ones while their
+    combined size stays under ``max_bytes``; the least recently used are dropped
+    first. Sizes are estimated from the pickle file size, which tracks the
+    in-memory footprint of a forest closely. Objects derived from a model (e.g.
+    its explainer) can be cached with it through ``companion``; they count towards
+    ``max_bytes`` and are evicted together with the model. Safe to share between
+    request threads.
+    """
+
+    def __init__(self, loader: Callable[[str], object], max_bytes: int):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()  # path -> [model, size, companions]
+        self._lock = threading.Lock()
+        self._building = {}  # (path, companion name) -> Event set when its build finishes
+        self.current_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, path: str):
+        with self._lock:
+            return self._entry(path)[0]
+
+    def companion(self, path: str, name: str, build: Callable[[object], object]):
+        """
+        The object ``name`` derived from the model at ``path``, built with
+        ``build(model)`` on first use. Its size is taken from its ``nbytes``.
+
+        ``build`` runs outside the cache lock, so other models stay available
+        meanwhile; concurrent requests for the same companion wait for the one
+        build in flight instead of repeating it.
+        """
+        key = (path, name)
+        while True:
+            with self._lock:
+                entry = self._entry(path)
+                if name in entry[2]:
+                    return entry[2][name]
+                in_flight = self._building.get(key)
+                if in_flight is None:
+                    in_flight = self._building[key] = threading.Event()
+                    break
+            in_flight.wait()
+
+        try:
+            built = build(entry[0])
+            with self._lock:
+                # The model may have been evicted meanwhile; then the companion is not kept.
+                if self._models.get(path) is entry:
+                    entry[2][name] = built
+                    size = int(getattr(built, "nbytes", 0))
+                    entry[1] += size
+                    self.current_bytes += size
+                    self._evict()
+            return built
+        finally:
+            with self._lock:
+                del self._building[key]
+            in_flight.set()
+
+    def _entry(self, path: str) -> list:
+        if path in self._models:
+            self._models.move_to_end(path)
+            self.stats["hits"] += 1
+            return self._models[path]
+
+        # Loading under the lock keeps concurrent requests from loading the same model twice.
+        self.stats["misses"] += 1
+        entry = [self.loader(path), os.path.getsize(path), {}]
+        self._models[path] = entry
+        self.current_bytes += entry[1]
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        # The most recently used entry is last, so it is never the one evicted.
+        while self.current_bytes > self.max_bytes and len(self._models) > 1:
+            evicted, (_, evicted_size, _) = self._models.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.stats["evictions"] += 1
+            logging.info("♻️ Evicted model from cache: %s", evicted)
+
+    def __len__(self) -> int:
+        return len(self._models)
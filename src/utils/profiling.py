@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import tracemalloc
+import cProfile
+from contextlib import contextmanager
+
+from src.exception import USvisaException
+from src.logger import logging
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Non-Linux fallback: high-water mark instead of the current value.
+        return max_rss_bytes()
+
+
+def max_rss_bytes() -> int:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+# tracemalloc is process-wide; overlapping samplers (stages running concurrently)
+# share one tracing session, started by the first and stopped by the last.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+        return peak, snapshot
+
+
+class PeakMemorySampler:
+    """
+    Samples process RSS on a background thread while the block runs, and
+    optionally tracks the Python heap peak with tracemalloc. Samples are
+    process-wide, so blocks that overlap in time see each other's allocations.
+    """
+
+    def __init__(self, interval: float = 0.01, use_tracemalloc: bool = False):
+        self.interval = interval
+        self.use_tracemalloc = use_tracemalloc
+        self.peak_rss = 0
+        self.start_rss = 0
+        self.peak_traced = None
+        self.snapshot = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        if self.use_tracemalloc:
+            _start_tracemalloc()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+        if self.use_tracemalloc:
+            self.peak_traced, self.snapshot = _stop_tracemalloc()
+        return False
+
+
+class StageProfiler:
+    """
+    Collects wall/CPU time, peak RSS, tracemalloc top allocations and optional
+    cProfile dumps for named pipeline stages, and writes them as one report.
+    """
+
+    def __init__(self, profiling_dir: str, use_tracemalloc: bool = True,
+                 use_cprofile: bool = False, top_allocations: int = 10):
+        try:
+            self.profiling_dir = profiling_dir
+            self.use_tracemalloc = use_tracemalloc
+            self.use_cprofile = use_cprofile
+            self.top_allocations = top_allocations
+            self.stages = {}
+            os.makedirs(self.profiling_dir, exist_ok=True)
+        except Exception as e:
+            raise USvisaException(e, sys)
+
+    @contextmanager
+    def profile_stage(self, stage_name: str):
+        profiler = cProfile.Profile() if self.use_cprofile else None
+        with PeakMemorySampler(use_tracemalloc=self.use_tracemalloc) as sampler:
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            if profiler:
+                profiler.enable()
+            try:
+                yield
+            finally:
+                if profiler:
+                    profiler.disable()
+                wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+        stats = {
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "peak_rss_mb": sampler.peak_rss / 2**20,
+            "rss_growth_mb": (sampler.peak_rss - sampler.start_rss) / 2**20,
+            "max_rss_mb": max_rss_bytes() / 2**20,
+        }
+        if sampler.snapshot is not None:
+            stats["peak_traced_mb"] = sampler.peak_traced / 2**20
+            stats["top_allocations"] = [
+                {"location": str(stat.traceback), "size_mb": stat.size / 2**20, "count": stat.count}
+                for stat in sampler.snapshot.statistics("lineno")[:self.top_allocations]
+            ]
+        if profiler:
+            cprofile_path = os.path.join(self.profiling_dir, f"{stage_name}.prof")
+            profiler.dump_stats(cprofile_path)
+            stats["cprofile_path"] = cprofile_path
+
+        self.stages[stage_name] = stats
+        logging.info(f"⏱️ Stage '{stage_name}': {wall:.2f}s wall, {cpu:.2f}s CPU, "
+                     f"peak RSS {stats['peak_rss_mb']:.1f} MB")
+
+    def metrics(self) -> dict:
+        """
+        Flat numeric metrics suitable for ``mlflow.log_metrics``.
+        """
+        metrics = {}
+        for stage_name, stats in self.stages.items():
+            for key in ("wall_s", "cpu_s", "peak_rss_mb", "peak_traced_mb"):
+                if key in stats:
+                    metrics[f"profile_{stage_name}_{key}"] = stats[key]
+        return metrics
+
+    def write_report(self, report_file_path: str) -> str:
+        try:
+            os.makedirs(os.path.dirname(report_file_path), exist_ok=True)
+            with open(report_file_path, "w") as f:
+                json.dump({
+                    "stages": self.stages,
+                    "total_wall_s": sum(stats["wall_s"] for stats in self.stages.values()),
+                }, f, indent=2)
+            return report_file_path
+        except Exception as e:
+            raise USvisaException(e, sys)
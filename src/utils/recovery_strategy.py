@@ -0,0 +1,32 @@
+"""
+Recovery strategy rules shared by the web app and the batch/rescoring paths.
+Kept free of heavy imports so app.py stays fast to start.
+"""
+
+STRATEGY_LEGAL = "Immediate legal notices & aggressive recovery attempts"
+STRATEGY_SETTLEMENT = "Settlement offers & repayment plans"
+STRATEGY_MONITORING = "Automated reminders & monitoring"
+
+
+# Risk strategy logic
+def assign_recovery_strategy(risk_score):
+    if risk_score > 0.75:
+        return STRATEGY_LEGAL
+    elif 0.50 <= risk_score <= 0.75:
+        return STRATEGY_SETTLEMENT
+    else:
+        return STRATEGY_MONITORING
+
+
+def assign_recovery_strategies(risk_scores):
+    """
+    Vectorized ``assign_recovery_strategy`` for an array of scores.
+    """
+    import numpy as np
+
+    scores = np.asarray(risk_scores, dtype=float)
+    return np.select(
+        [scores > 0.75, scores >= 0.50],
+        [STRATEGY_LEGAL, STRATEGY_SETTLEMENT],
+        default=STRATEGY_MONITORING
+    ).astype(object)
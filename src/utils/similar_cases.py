@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.neighbors import KDTree
+
+
+def encode_case_chunk(values) -> tuple:
+    """
+    One chunk of a case column as ``(codes, uniques)``; missing values get code -1.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+def combine_case_chunks(chunks: list) -> pd.Categorical:
+    """
+    Join per-chunk ``encode_case_chunk`` results into one categorical column,
+    re-coding each chunk against the categories of all of them.
+    """
+    global_codes, categories = pd.factorize(np.concatenate([uniques for _, uniques in chunks]))
+    codes = np.empty(sum(len(chunk_codes) for chunk_codes, _ in chunks), dtype=np.int32)
+    offset = unique_offset = 0
+    for chunk_codes, uniques in chunks:
+        # The appended -1 keeps missing values (code -1) missing.
+        mapping = np.append(global_codes[unique_offset:unique_offset + len(uniques)], -1).astype(np.int32)
+        codes[offset:offset + len(chunk_codes)] = mapping[chunk_codes]
+        offset += len(chunk_codes)
+        unique_offset += len(uniques)
+    return pd.Categorical.from_codes(codes, categories)
+
+
+class SimilarCaseIndex:
+    """
+    Nearest historical loans in the standardised ``CLUSTER_FEATURES`` space that
+    ``DataTransformation`` segments borrowers in, with what happened to each
+    (``Recovery_Status``, ``Collection_Method``, ...).
+
+    ``exact`` mode searches a KD-tree. ``approximate`` mode is an inverted-file
+    index: points are bucketed by their nearest of ``n_lists`` k-means centroids
+    and a query scans only the ``n_probe`` closest buckets, so its cost depends on
+    the bucket size rather than on the number of historical loans.
+    """
+
+    def __init__(self, features: list, mean, scale, cases: dict, mode: str = "exact",
+                 leaf_size: int = 40, n_lists: int = None, n_probe: int = 8, random_state: int = 42):
+        """
+        :param features: raw feature names, in the order of the indexed columns.
+        :param mean: per-feature mean used to standardise queries (the fitted scaler's ``mean_``).
+        :param scale: per-feature scale (the fitted scaler's ``scale_``).
+        :param cases: column name -> values per historical loan (e.g. from
+            ``combine_case_chunks``), returned with each match.
+        """
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.cases = {column: pd.Categorical(values) for column, values in cases.items()}
+        self.mode = mode
+        self.leaf_size = leaf_size
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+        self.n_cases = 0
+
+    @property
+    def _case_codes(self) -> dict:
+        return {column: (values.codes, np.asarray(values.categories, dtype=object))
+                for column, values in self.cases.items()}
+
+    def build(self, points: np.ndarray) -> "SimilarCaseIndex":
+        """
+        Index ``points``, the already standardised features of every case (one row each).
+        A float32 memory-mapped array is read in place rather than copied.
+        """
+        points = np.ascontiguousarray(points, dtype=np.float32)
+        self.n_cases = len(points)
+        if self.mode == "exact":
+            self._tree = KDTree(points, leaf_size=self.leaf_size)
+        else:
+            self._build_inverted_file(points)
+        self._codes = self._case_codes
+        return self
+
+    def _build_inverted_file(self, points: np.ndarray) -> None:
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(points))))
+        rng = np.random.default_rng(self.random_state)
+        sample = points[np.sort(rng.choice(len(points), size=min(len(points), 64 * n_lists), replace=False))]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state, n_init=1,
+                                 batch_size=max(1024, 4 * n_lists)).fit(sample)
+
+        labels = np.concatenate([kmeans.predict(points[start:start + 100_000])
+                                 for start in range(0, len(points), 100_000)])
+        self._order = np.argsort(labels, kind="stable")
+        self._offsets = np.searchsorted(labels[self._order], np.arange(n_lists + 1))
+        self._points = points[self._order]
+        self._centroids = kmeans.cluster_centers_.astype(np.float32)
+        # Squared norms, so squared distances are |p|^2 - 2 p.q (+ |q|^2, constant per query).
+        self._point_norms = np.einsum("ij,ij->i", self._points, self._points)
+        self._centroid_norms = np.einsum("ij,ij->i", self._centroids, self._centroids)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._codes = self._case_codes
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_codes", None)
+        return state
+
+    def standardise(self, record: dict) -> np.ndarray:
+        values = np.array([float(record[feature]) for feature in self.features])
+        return ((values - self.mean) / self.scale).astype(np.float32)
+
+    def _search(self, query: np.ndarray, k: int) -> tuple:
+        if self.mode == "exact":
+            distances, indices = self._tree.query(query[None, :], k=min(k, self.n_cases))
+            return distances[0], indices[0]
+
+        centroid_distances = self._centroid_norms - 2 * (self._centroids @ query)
+        n_probe = min(self.n_probe, len(self._centroids))
+        probed = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+
+        # Buckets are contiguous, so each probed one is scanned as a slice.
+        positions, distances = [], []
+        for i in probed:
+            start, stop = self._offsets[i], self._offsets[i + 1]
+            positions.append(np.arange(start, stop))
+            distances.append(self._point_norms[start:stop] - 2 * (self._points[start:stop] @ query))
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+
+        k = min(k, len(positions))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        squared = np.maximum(distances[nearest] + query @ query, 0)
+        return np.sqrt(squared), self._order[positions[nearest]]
+
+    def query(self, record: dict, k: int = 5) -> list:
+        """
+        The ``k`` most similar historical loans to ``record``, closest first, each
+        with its stored case columns and its ``distance`` in standard deviations.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        distances, indices = self._search(self.standardise(record), k)
+        matches = []
+        for distance, index in zip(distances, indices):
+            match = {column: categories[codes[index]] if codes[index] >= 0 else None
+                     for column, (codes, categories) in self._codes.items()}
+            match["distance"] = float(distance)
+            matches.append(match)
+        return matches
@@ -0,0 +1,206 @@
+"""
+Exact per-feature contributions to a random forest's ``Risk_Score``.
+
+``TreeExplainer`` computes path-dependent TreeSHAP values from the fitted tree
+structure alone: a feature's contribution is its Shapley value when a missing
+feature is handled as the tree does during training, by following both
+branches in proportion to the training samples ("cover") that went each way.
+The contributions of a loan add up to its score minus ``expected_value``, the
+forest's average score over the training data.
+
+The computation is organised by leaf rather than by sample. For a leaf with
+value ``v`` whose path tests the distinct features ``j = 1..d``, let ``z_j`` be
+the fraction of cover that follows the path at the splits on ``j``, and
+``o_j`` whether the loan satisfies all of them. Feature ``i`` then receives::
+
+    v * (o_i - z_i) * sum_k w_k * [t^k] prod_{j != i} (z_j + o_j t),   w_k = k! (d - k - 1)! / d!
+
+which depends on the loan only through the ``d`` bits ``o``. Leaves are grouped
+by ``d`` and, where it fits in memory, the value for all ``2^d`` bit patterns is
+tabulated once, so explaining a batch is a vectorised comparison, a table
+lookup and one sparse product per group.
+"""
+
+from math import factorial
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+TABLE_MAX_BYTES = 64 * 2**20  # per path-length group
+BLOCK_ELEMENTS = 4_000_000  # (rows x leaves x polynomial terms) per block
+
+
+def source_features(transformer) -> list:
+    """
+    The input column behind each output column of a fitted ``ColumnTransformer``,
+    e.g. ``cat__Employment_Type_Salaried`` -> ``Employment_Type``.
+    """
+    sources = []
+    for name, step, columns in transformer.transformers_:
+        if step == "drop" or (name == "remainder" and not len(columns)):
+            continue
+        columns = list(columns)
+        if step == "passthrough":
+            sources.extend(columns)
+            continue
+        for output_name in step.get_feature_names_out(columns):
+            if output_name in columns:
+                sources.append(output_name)
+                continue
+            # One-hot outputs are "<column>_<category>"; prefer the longest column name.
+            matches = [column for column in columns if str(output_name).startswith(f"{column}_")]
+            if not matches:
+                raise ValueError(f"Cannot map transformed column {output_name!r} back to an input column")
+            sources.append(max(matches, key=len))
+    return sources
+
+
+def _shapley_weights(d: int) -> np.ndarray:
+    return np.array([factorial(k) * factorial(d - k - 1) / factorial(d) for k in range(d)])
+
+
+def _leaf_contributions(on_path: np.ndarray, zero_fraction: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """
+    Contributions of each path feature for ``on_path`` bits of shape (rows, leaves, d).
+    """
+    rows, leaves, d = on_path.shape
+    weights = _shapley_weights(d)
+
+    # Coefficients of prod_j (z_j + o_j t), lowest power first.
+    poly = np.zeros((rows, leaves, d + 1))
+    poly[..., 0] = 1.0
+    for j in range(d):
+        shifted = poly[..., :-1] * on_path[..., j, None]
+        poly *= zero_fraction[None, :, j, None]
+        poly[..., 1:] += shifted
+
+    contributions = np.empty((rows, leaves, d))
+    for i in range(d):
+        z, o = zero_fraction[None, :, i], on_path[..., i]
+        # Divide out (z_i + o_i t): by z_i when o_i = 0, by synthetic division when o_i = 1.
+        divided = (poly[..., :d] * weights).sum(axis=-1) / z
+        unwound, total = poly[..., d], np.zeros((rows, leaves))
+        for k in range(d - 1, -1, -1):
+            total += weights[k] * unwound
+            unwound = poly[..., k] - z * unwound
+        contributions[..., i] = value[None, :] * (o - z) * np.where(o > 0, total, divided)
+    return contributions
+
+
+class _PathGroup:
+    """
+    All leaves whose paths test ``d`` distinct features.
+    """
+
+    def __init__(self, features, lower, upper, zero_fraction, value, n_features: int):
+        self.features = np.asarray(features, dtype=np.intp)
+        self.lower = np.asarray(lower)
+        self.upper = np.asarray(upper)
+        self.zero_fraction = np.asarray(zero_fraction)
+        self.value = np.asarray(value)
+        n_leaves, d = self.features.shape
+        self.d = d
+        # Sums each (leaf, position) contribution into its feature's column.
+        self.scatter = csr_matrix((np.ones(n_leaves * d), (np.arange(n_leaves * d), self.features.ravel())),
+                                  shape=(n_leaves * d, n_features))
+        self.table = None
+        if n_leaves * 2**d * d * 8 <= TABLE_MAX_BYTES:
+            patterns = (np.arange(2**d)[:, None] >> np.arange(d)) & 1
+            on_path = np.broadcast_to(patterns[:, None, :], (2**d, n_leaves, d)).astype(np.float64)
+            self.table = _leaf_contributions(on_path, self.zero_fraction, self.value).transpose(1, 0, 2).copy()
+            self.bits = 1 << np.arange(d)
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        n_leaves = len(self.value)
+        values = X[:, self.features]
+        on_path = (values > self.lower) & (values <= self.upper)
+        if self.table is not None:
+            pattern = on_path.astype(np.intp) @ self.bits
+            per_leaf = self.table[np.arange(n_leaves), pattern]
+        else:
+            per_leaf = _leaf_contributions(on_path.astype(np.float64), self.zero_fraction, self.value)
+        return (self.scatter.T @ per_leaf.reshape(len(X), -1).T).T
+
+
+class TreeExplainer:
+    def __init__(self, feature, threshold, children_left, children_right, leaf_value, cover, roots,
+                 n_features: int, feature_names: list = None):
+        """
+        :param leaf_value: the positive-class probability at every node (only leaves are used).
+        :param cover: training samples (weighted) reaching every node.
+        :param roots: index of each tree's root in the flat node arrays.
+        """
+        self.n_features = n_features
+        self.feature_names = feature_names
+        n_trees = len(roots)
+        by_length = {}
+        self.expected_value = 0.0
+        for root in roots:
+            stack = [(int(root), {})]
+            while stack:
+                node, conditions = stack.pop()
+                left, right = int(children_left[node]), int(children_right[node])
+                if left < 0 or left == node:
+                    value = float(leaf_value[node]) / n_trees
+                    features = sorted(conditions)
+                    self.expected_value += value * float(np.prod([conditions[f][2] for f in features]))
+                    if features:
+                        by_length.setdefault(len(features), []).append(
+                            (features, *zip(*(conditions[f] for f in features)), value)
+                        )
+                    continue
+                f, t = int(feature[node]), float(threshold[node])
+                lower, upper, zero_fraction = conditions.get(f, (-np.inf, np.inf, 1.0))
+                for child, bounds in ((left, (lower, min(upper, t))), (right, (max(lower, t), upper))):
+                    stack.append((child, {**conditions, f: (*bounds, zero_fraction * cover[child] / cover[node])}))
+
+        self.groups = [
+            _PathGroup(*(np.array(column) for column in zip(*leaves)), n_features=n_features)
+            for _, leaves in sorted(by_length.items())
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [array for group in self.groups for array in (
+            group.features, group.lower, group.upper, group.zero_fraction, group.value, group.table,
+            group.scatter.data, group.scatter.indices, group.scatter.indptr
+        ) if array is not None]
+        return sum(array.nbytes for array in arrays)
+
+    @classmethod
+    def from_model(cls, model, feature_names: list = None) -> "TreeExplainer":
+        """
+        :param model: a fitted binary ``RandomForestClassifier`` or a ``MappedForest``
+            saved with node cover.
+        """
+        from src.utils.mapped_artifact import MappedForest
+
+        if isinstance(model, MappedForest):
+            if model.cover is None:
+                raise ValueError("This mapped model was saved without node cover; explain the joblib model")
+            arrays = {"feature": model.feature, "threshold": model.threshold, "children_left": model.children_left,
+                      "children_right": model.children_right, "leaf_proba": model.leaf_proba,
+                      "cover": model.cover, "roots": model.roots}
+            feature_names = feature_names or model.feature_names
+        elif hasattr(model, "estimators_"):
+            arrays, _ = MappedForest.arrays_from_sklearn(model)
+        else:
+            raise ValueError(f"Cannot explain a {type(model).__name__}; a random forest is required")
+        return cls(arrays["feature"], arrays["threshold"], arrays["children_left"], arrays["children_right"],
+                   arrays["leaf_proba"], arrays["cover"], arrays["roots"], model.n_features_in_, feature_names)
+
+    def shap_values(self, X) -> np.ndarray:
+        """
+        Contributions of every model input column to the positive-class probability,
+        shape (rows, n_features); each row sums to the score minus ``expected_value``.
+        """
+        X = X.toarray() if hasattr(X, "toarray") else X
+        # Compared as float32, like the forest itself.
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        phi = np.zeros((len(X), self.n_features))
+        for group in self.groups:
+            terms = len(group.value) * (group.d if group.table is not None else group.d * (group.d + 1))
+            block = max(1, BLOCK_ELEMENTS // max(terms, 1))
+            for start in range(0, len(X), block):
+                phi[start:start + block] += group.contributions(X[start:start + block])
+        return phi
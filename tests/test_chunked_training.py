@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import src.utils.chunked_training as chunked_training
+from src.utils.chunked_training import fit_sub_forest, merge_forests, plan_sub_forests
+
+FOREST_PARAMS = {"max_depth": 3}
+
+
+@pytest.fixture
+def train_files(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((6000, 4)).astype(np.float32)
+    y = (X[:, 0] + 0.3 * rng.standard_normal(6000) > 0).astype(np.float32)
+    train_file_path, split_file_path = str(tmp_path / "train.npy"), str(tmp_path / "split.npy")
+    np.save(train_file_path, np.c_[X, y])
+    np.save(split_file_path, rng.random(6000) < 0.2)
+    return train_file_path, split_file_path
+
+
+@pytest.mark.parametrize("chunk_size", [50, 700, 6000])
+def test_every_fit_reads_at_most_chunk_size_rows(train_files, monkeypatch, chunk_size):
+    fitted_rows = []
+    fit_forest = chunked_training._fit_forest
+
+    def recording_fit(rows, *args, **kwargs):
+        fitted_rows.append(len(rows))
+        return fit_forest(rows, *args, **kwargs)
+
+    monkeypatch.setattr(chunked_training, "_fit_forest", recording_fit)
+    plan = plan_sub_forests(6000, chunk_size, n_estimators=10)
+    forests = [fit_sub_forest(*train_files, start, stop, n_trees, index, FOREST_PARAMS, chunk_size)
+               for index, (start, stop, n_trees) in enumerate(plan)]
+
+    assert max(fitted_rows) <= chunk_size
+    assert len(merge_forests(forests).estimators_) == 10
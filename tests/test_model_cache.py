@@ -0,0 +1,72 @@
+import threading
+
+import numpy as np
+
+from src.utils.model_cache import LRUModelCache
+
+
+def write_models(tmp_path, sizes: dict) -> dict:
+    paths = {}
+    for name, size in sizes.items():
+        paths[name] = str(tmp_path / f"{name}.pkl")
+        with open(paths[name], "wb") as f:
+            f.write(b"\0" * size)
+    return paths
+
+
+def test_companions_count_towards_the_budget_and_are_evicted_with_their_model(tmp_path):
+    paths = write_models(tmp_path, {"auto": 100, "home": 100})
+    built = []
+    cache = LRUModelCache(loader=lambda path: path, max_bytes=1000)
+
+    def build(model):
+        built.append(model)
+        return np.zeros(50)  # 400 bytes
+
+    explainer = cache.companion(paths["auto"], "explainer", build)
+    assert cache.companion(paths["auto"], "explainer", build) is explainer
+    assert built == [paths["auto"]]
+    assert cache.current_bytes == 500
+
+    # home and two companions take the total to 1400: auto and its explainer go together.
+    cache.companion(paths["home"], "explainer", build)
+    cache.companion(paths["home"], "other", build)
+    assert len(cache) == 1 and cache.stats["evictions"] == 1
+    assert cache.current_bytes == 900
+
+    cache.companion(paths["auto"], "explainer", build)
+    assert built == [paths["auto"], paths["home"], paths["home"], paths["auto"]]
+
+
+def test_get_shares_the_entry_with_companions(tmp_path):
+    paths = write_models(tmp_path, {"auto": 10})
+    cache = LRUModelCache(loader=lambda path: object(), max_bytes=1000)
+    model = cache.get(paths["auto"])
+    assert cache.companion(paths["auto"], "explainer", lambda m: m) is model
+    assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_companion_builds_outside_the_lock_and_only_once(tmp_path):
+    paths = write_models(tmp_path, {"auto": 10, "home": 10})
+    cache = LRUModelCache(loader=lambda path: path, max_bytes=1000)
+    started, release = threading.Event(), threading.Event()
+    built = []
+
+    def slow_build(model):
+        built.append(model)
+        started.set()
+        release.wait(5)
+        return np.zeros(1)
+
+    threads = [threading.Thread(target=cache.companion, args=(paths["auto"], "explainer", slow_build))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # Another model can be loaded while the build holds no lock.
+    assert cache.get(paths["home"]) == paths["home"]
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert built == [paths["auto"]]
+    assert cache.companion(paths["auto"], "explainer", slow_build).nbytes == 8
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring.drift import SCORE_BIN_EDGES
+from src.monitoring.portfolio import PortfolioAggregator
+from src.utils.recovery_strategy import assign_recovery_strategies
+
+SEGMENTS = ["Moderate Income, High Loan Burden", "High Income, Low Default Risk", "High Loan, Higher Default Risk"]
+EMPLOYMENT = ["Salaried", "Self-Employed", "Business Owner"]
+
+
+def random_scored_loans(rng, n_loans: int, n_ids: int) -> tuple:
+    loans = pd.DataFrame({
+        "Loan_ID": [f"LN_{i}" for i in rng.integers(0, n_ids, n_loans)],
+        "Segment_Name": rng.choice(SEGMENTS, n_loans),
+        "Employment_Type": rng.choice(EMPLOYMENT, n_loans),
+        "Outstanding_Loan_Amount": rng.uniform(1_000, 100_000, n_loans).round(2),
+    })
+    results = pd.DataFrame({"Risk_Score": rng.integers(0, 101, n_loans) / 100})
+    return loans, results
+
+
+def expected_summary(latest: pd.DataFrame, by: list) -> dict:
+    latest = latest.assign(
+        Recovery_Strategy=assign_recovery_strategies(latest["Risk_Score"].to_numpy()),
+        expected_loss=latest["Risk_Score"] * latest["Outstanding_Loan_Amount"],
+        score_bin=np.searchsorted(SCORE_BIN_EDGES, latest["Risk_Score"].to_numpy(), side="right"),
+    )
+    groups = {}
+    for key, group in latest.groupby(by):
+        key = key if isinstance(key, tuple) else (key,)
+        groups[" | ".join(map(str, key))] = {
+            "loans": len(group),
+            "exposure": group["Outstanding_Loan_Amount"].sum(),
+            "mean_risk_score": group["Risk_Score"].mean(),
+            "expected_loss": group["expected_loss"].sum(),
+            "score_histogram": np.bincount(group["score_bin"], minlength=len(SCORE_BIN_EDGES) + 1).tolist(),
+        }
+    return groups
+
+
+def assert_matches_groupby(report: dict, latest: pd.DataFrame, by: list) -> None:
+    expected = expected_summary(latest, by)
+    actual = report["groups"][" x ".join(by)]
+    assert set(actual) == set(expected)
+    for key, row in expected.items():
+        assert actual[key]["loans"] == row["loans"]
+        assert actual[key]["score_histogram"] == row["score_histogram"]
+        for column in ("exposure", "mean_risk_score", "expected_loss"):
+            assert actual[key][column] == pytest.approx(row[column], rel=1e-9)
+
+
+@pytest.mark.parametrize("by", [["Segment_Name"], ["Employment_Type", "Recovery_Strategy"],
+                                ["Segment_Name", "Employment_Type", "Recovery_Strategy"]])
+def test_rescored_loans_count_once_with_their_latest_score(by):
+    rng = np.random.default_rng(0)
+    aggregator = PortfolioAggregator()
+    history = []
+    # Batches overlap in Loan_ID (and repeat IDs within a batch), as repeated rescoring passes do.
+    for _ in range(5):
+        loans, results = random_scored_loans(rng, 400, 600)
+        aggregator.observe_batch(loans, results)
+        history.append(loans.assign(Risk_Score=results["Risk_Score"].to_numpy()))
+    for record in history[0].sample(50, random_state=1).to_dict("records"):
+        record["Risk_Score"] = float(rng.integers(0, 101) / 100)
+        aggregator.observe_record(record, {"Risk_Score": record["Risk_Score"]})
+        history.append(pd.DataFrame([record]))
+
+    latest = pd.concat(history, ignore_index=True).drop_duplicates("Loan_ID", keep="last")
+    report = aggregator.summary(by)
+    assert report["n_loans"] == len(latest)
+    assert_matches_groupby(report, latest, by)
+
+
+def test_snapshot_round_trip_keeps_totals_and_keys(tmp_path):
+    rng = np.random.default_rng(1)
+    aggregator = PortfolioAggregator()
+    loans, results = random_scored_loans(rng, 300, 200)
+    aggregator.observe_batch(loans, results)
+    path = aggregator.save_snapshot(str(tmp_path / "portfolio.npz"))
+
+    restored = PortfolioAggregator().load_snapshot(path)
+    assert restored.summary() == aggregator.summary()
+
+    # Rescoring after a restart replaces contributions instead of adding to them.
+    restored.observe_batch(loans, results)
+    assert restored.summary()["n_loans"] == aggregator.summary()["n_loans"]
+
+    totals_only = PortfolioAggregator().load_snapshot(path, with_keys=False)
+    assert totals_only.summary(["Segment_Name"])["groups"] == aggregator.summary(["Segment_Name"])["groups"]
+
+
+def test_requests_without_loan_id_stay_out_of_the_book(tmp_path):
+    rng = np.random.default_rng(2)
+    aggregator = PortfolioAggregator()
+    loans, results = random_scored_loans(rng, 200, 1000)
+    aggregator.observe_batch(loans, results)
+    book = aggregator.summary()
+
+    form_post = loans.drop(columns="Loan_ID").iloc[0].to_dict()
+    for _ in range(3):
+        aggregator.observe_record(form_post, {"Risk_Score": 0.9})
+    aggregator.observe_record({**form_post, "Loan_ID": None}, {"Risk_Score": 0.9})
+    aggregator.observe_batch(loans.drop(columns="Loan_ID").head(5), results.head(5))
+    aggregator.observe_batch(loans.head(4).assign(Loan_ID=[None, "", "LN_new", None]), results.head(4))
+
+    report = aggregator.summary()
+    assert report["n_unkeyed_requests"] == 3 + 1 + 5 + 3
+    assert report["n_loans"] == book["n_loans"] + 1
+    assert report["groups"]["Employment_Type"] != book["groups"]["Employment_Type"]
+    restored = PortfolioAggregator().load_snapshot(aggregator.save_snapshot(str(tmp_path / "portfolio.npz")))
+    assert restored.summary()["n_unkeyed_requests"] == report["n_unkeyed_requests"]
+
+    without_new = PortfolioAggregator()
+    without_new.observe_batch(loans, results)
+    without_new.observe_batch(loans.head(4).assign(Loan_ID=[None, "", "LN_new", None]), results.head(4))
+    assert without_new.summary()["groups"] == report["groups"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.utils.portfolio_allocator import LIMITED_STRATEGIES, allocate_strategies
+
+
+def random_book(seed: int, n_loans: int):
+    rng = np.random.default_rng(seed)
+    # Forest scores are multiples of 1/n_trees, so many loans tie; keep that here.
+    risk_scores = rng.integers(0, 101, n_loans) / 100
+    outstanding = rng.uniform(1_000, 200_000, n_loans).round(-2)
+    collateral = np.where(rng.random(n_loans) < 0.4, 0.0, rng.uniform(0, 300_000, n_loans).round(-2))
+    return risk_scores, outstanding, collateral
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_price_method_matches_lp(seed):
+    rng = np.random.default_rng(1000 + seed)
+    n_loans = int(rng.integers(20, 400))
+    capacities = {"legal": int(rng.integers(0, n_loans // 3 + 1)),
+                  "settlement": int(rng.integers(0, n_loans // 2 + 1))}
+    book = random_book(seed, n_loans)
+
+    price = allocate_strategies(*book, capacities, method="price")
+    lp = allocate_strategies(*book, capacities, method="lp")
+
+    assert price["summary"]["expected_recovery"] == pytest.approx(lp["summary"]["expected_recovery"], rel=1e-9)
+    for strategy in LIMITED_STRATEGIES:
+        row = price["summary"]["strategies"][strategy]
+        assert row["cases"] <= row["capacity"]
+
+
+def test_unlimited_capacity_takes_each_loans_best_strategy():
+    book = random_book(7, 500)
+    allocation = allocate_strategies(*book, capacities={})
+    unconstrained = allocate_strategies(*book, capacities={}, method="lp")
+    np.testing.assert_allclose(allocation["expected_recovery"], unconstrained["expected_recovery"])
+
+
+def test_allocation_never_does_worse_than_the_capacity_held_threshold_rule():
+    book = random_book(3, 2_000)
+    summary = allocate_strategies(*book, {"legal": 50, "settlement": 200})["summary"]
+    assert summary["expected_recovery"] >= summary["threshold_rule_expected_recovery"]
+
+
+def test_unknown_capacity_key_is_rejected():
+    with pytest.raises(ValueError):
+        allocate_strategies(*random_book(0, 10), {"lawyers": 5})
@@ -0,0 +1,139 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from pymongo import UpdateOne
+
+from src.configuration.local_document_store import LocalDocumentClient
+from src.configuration.mongo_db_connection import MongoDBClient
+from src.data_access.synthetic_data import SyntheticLoanDataGenerator
+from src.entity.config_entity import RescoringConfig
+from src.monitoring.portfolio import KEY_COLUMN, PortfolioAggregator
+from src.pipline.rescoring_worker import RescoringWorker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ScoringStub:
+    """
+    Stands in for ``PredictionPipeline``: scores by ``Days_Past_Due`` and feeds
+    its portfolio aggregates the way the pipeline's observers do.
+    """
+
+    def __init__(self):
+        self.portfolio = PortfolioAggregator()
+        self.scored = []
+
+    def predict_batch(self, input_df: pd.DataFrame) -> pd.DataFrame:
+        self.scored.extend(input_df[KEY_COLUMN])
+        scores = np.minimum(input_df["Days_Past_Due"].to_numpy(dtype=float), 365) / 365
+        result = pd.DataFrame({"Risk_Score": scores, "Predicted_High_Risk": (scores > 0.5).astype(int)})
+        self.portfolio.observe_batch(input_df, result)
+        return result
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)  # the worker and the generator read config/schema.yaml
+    monkeypatch.setattr(MongoDBClient, "client", LocalDocumentClient(f"local://{tmp_path / 'mongo'}"))
+    return MongoDBClient().database[RescoringConfig.collection_name]
+
+
+def make_worker(tmp_path, stub: ScoringStub = None) -> RescoringWorker:
+    config = RescoringConfig(mode="poll", batch_size=50, watermark_lag_s=60,
+                             state_file_path=str(tmp_path / "rescoring" / "state.json"),
+                             portfolio_snapshot_path=str(tmp_path / "rescoring" / "portfolio.npz"))
+    return RescoringWorker(config, stub or ScoringStub())
+
+
+def make_loans(n_loans: int, updated_at: datetime, start_index: int = 1) -> list:
+    loans = SyntheticLoanDataGenerator(seed=start_index).generate(n_loans, start_index=start_index)
+    return [{**loan, "_id": loan["Loan_ID"], "Updated_At": updated_at} for loan in loans.to_dict("records")]
+
+
+def stored(collection) -> dict:
+    return {document["_id"]: document for document in collection.find()}
+
+
+def test_duplicate_ids_in_a_batch_keep_the_last_version(tmp_path, collection):
+    first, other = make_loans(2, datetime.now(timezone.utc))
+    collection.insert_many([first, other])
+    latest = {**first, "Days_Past_Due": 365}
+    stub = ScoringStub()
+
+    assert make_worker(tmp_path, stub).score_documents([{**first, "Days_Past_Due": 0}, other, latest]) == 2
+    assert sorted(stub.scored) == sorted([first["Loan_ID"], other["Loan_ID"]])
+    assert stored(collection)[first["_id"]]["Risk_Score"] == 1.0
+
+
+def test_loans_with_missing_features_are_skipped(tmp_path, collection):
+    loans = make_loans(5, datetime.now(timezone.utc))
+    loans[1]["Monthly_Income"] = None
+    del loans[3]["Days_Past_Due"]
+    collection.insert_many(loans)
+    worker = make_worker(tmp_path)
+
+    assert worker.score_documents(loans) == 3
+    assert worker.stats["skipped"] == 2
+    scored = {loan_id for loan_id, document in stored(collection).items() if "Risk_Score" in document}
+    assert scored == {loans[i]["_id"] for i in (0, 2, 4)}
+
+
+@pytest.mark.parametrize("age", [timedelta(hours=1), timedelta(0)], ids=["settled", "inside-lag"])
+def test_second_pass_without_changes_scores_nothing(tmp_path, collection, age):
+    collection.insert_many(make_loans(120, datetime.now(timezone.utc) - age))
+    worker = make_worker(tmp_path)
+
+    assert worker.run_once() == 120
+    assert worker.run_once() == 0
+    assert make_worker(tmp_path).run_once() == 0
+
+
+def test_watermark_advances_and_a_restart_resumes_from_the_state_file(tmp_path, collection):
+    now = datetime.now(timezone.utc)
+    collection.insert_many(make_loans(120, now - timedelta(hours=2)))
+    assert make_worker(tmp_path).run_once() == 120
+    with open(tmp_path / "rescoring" / "state.json") as f:
+        assert json.load(f)["watermark"] == str(now - timedelta(hours=2))
+
+    # Changes while the worker is down: new loans, and a feature update to a scored one.
+    new_loans = make_loans(30, now - timedelta(hours=1), start_index=10_000)
+    collection.insert_many(new_loans)
+    changed = next(iter(stored(collection)))
+    collection.bulk_write([UpdateOne({"_id": changed}, {"$set": {"Days_Past_Due": 365, "Updated_At": now}})])
+
+    stub = ScoringStub()
+    assert make_worker(tmp_path, stub).run_once() == 31
+    assert sorted(stub.scored) == sorted([loan["Loan_ID"] for loan in new_loans] + [changed])
+    assert stored(collection)[changed]["Risk_Score"] == 1.0
+
+
+def test_loans_committed_late_within_the_lag_are_still_scored(tmp_path, collection):
+    now = datetime.now(timezone.utc)
+    collection.insert_many(make_loans(10, now - timedelta(seconds=5)))
+    worker = make_worker(tmp_path)
+    assert worker.run_once() == 10
+
+    # Committed after the pass, but stamped before the newest loan it read.
+    late = make_loans(1, now - timedelta(seconds=20), start_index=10_000)
+    collection.insert_many(late)
+    assert worker.run_once() == 1
+    assert worker.prediction_pipeline.scored[-1] == late[0]["Loan_ID"]
+
+
+def test_bulk_write_appends_to_an_update_log_until_compaction(tmp_path, collection):
+    loans = make_loans(50, datetime.now(timezone.utc))
+    collection.insert_many(loans)
+    before = os.stat(collection.path)
+
+    collection.bulk_write([UpdateOne({"_id": loans[0]["_id"]}, {"$set": {"Risk_Score": 0.25}})])
+    after = os.stat(collection.path)
+    assert (after.st_ino, after.st_size) == (before.st_ino, before.st_size)
+    assert stored(collection)[loans[0]["_id"]]["Risk_Score"] == 0.25
+
+    collection.close()
+    assert not os.path.exists(collection.log_path)
+    assert stored(collection)[loans[0]["_id"]]["Risk_Score"] == 0.25
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.similar_cases import SimilarCaseIndex, combine_case_chunks, encode_case_chunk
+
+
+def test_chunked_case_codes_match_the_whole_column():
+    values = ["Paid", None, "Written Off", "Paid", "Partially Paid", None, "Paid"]
+    column = pd.Series(values, dtype=object)
+    chunks = [encode_case_chunk(column[start:start + 3]) for start in range(0, len(column), 3)]
+    combined = combine_case_chunks(chunks + [encode_case_chunk(pd.Series([], dtype=object))])
+    assert list(combined) == list(combine_case_chunks([encode_case_chunk(column)]))
+    assert [value if isinstance(value, str) else None for value in combined] == values
+
+
+def test_approximate_index_builds_from_a_memory_map(tmp_path):
+    rng = np.random.default_rng(0)
+    points = np.lib.format.open_memmap(str(tmp_path / "points.npy"), mode="w+", dtype=np.float32, shape=(2000, 2))
+    points[:] = rng.standard_normal((2000, 2))
+    cases = {"Loan_ID": combine_case_chunks([encode_case_chunk([f"LN_{i}" for i in range(2000)])])}
+    index = SimilarCaseIndex(["a", "b"], [0, 0], [1, 1], cases, mode="approximate", n_probe=50).build(points)
+
+    match = index.query({"a": float(points[7, 0]), "b": float(points[7, 1])}, k=1)[0]
+    assert match["Loan_ID"] == "LN_7" and match["distance"] < 1e-6
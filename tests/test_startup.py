@@ -0,0 +1,21 @@
+import os
+
+from src.benchmark.startup import (
+    COLD_START_PROBE, FORBIDDEN_SERVING_MODULES, leaked_modules, parse_importtime, run_probe
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_app_loads_no_training_only_modules(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    loaded = [row[0] for row in parse_importtime(run_probe(COLD_START_PROBE).stderr)]
+    assert "app" in loaded
+    assert leaked_modules(loaded) == []
+
+
+def test_leak_check_matches_packages_and_their_submodules():
+    loaded = ["mlflow.tracking", "pymongo", "src.components.model_trainer", "src.componentsx", "app"]
+    assert leaked_modules(loaded, FORBIDDEN_SERVING_MODULES) == [
+        "mlflow.tracking", "pymongo", "src.components.model_trainer"
+    ]
@@ -0,0 +1,83 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import src.utils.tree_explainer as tree_explainer
+from src.utils.mapped_artifact import load_mapped_model, save_mapped_model
+from src.utils.tree_explainer import TreeExplainer
+
+N_FEATURES = 6
+
+
+@pytest.fixture(scope="module")
+def forest_and_rows():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((3000, N_FEATURES)).astype(np.float32)
+    X[:, 5] = X[:, 5] > 0
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + X[:, 5] + 0.5 * rng.standard_normal(3000) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=7, max_depth=6, random_state=0).fit(X, y)
+    return model, X[:5]
+
+
+def conditional_expectation(tree, x, known: set) -> float:
+    """
+    E[f(x) | x_known] under the tree's own cover, the value function TreeSHAP uses.
+    """
+    t = tree.tree_
+
+    def visit(node):
+        left, right = t.children_left[node], t.children_right[node]
+        if left < 0:
+            value = t.value[node, 0]
+            return value[1] / value.sum()
+        if t.feature[node] in known:
+            return visit(left if x[t.feature[node]] <= t.threshold[node] else right)
+        cover = t.weighted_n_node_samples
+        return (cover[left] * visit(left) + cover[right] * visit(right)) / cover[node]
+
+    return visit(0)
+
+
+def brute_force_shapley(model, x) -> np.ndarray:
+    phi = np.zeros(N_FEATURES)
+    for tree in model.estimators_:
+        for i in range(N_FEATURES):
+            others = [j for j in range(N_FEATURES) if j != i]
+            for size in range(N_FEATURES):
+                weight = math.factorial(size) * math.factorial(N_FEATURES - size - 1) / math.factorial(N_FEATURES)
+                for subset in itertools.combinations(others, size):
+                    phi[i] += weight * (conditional_expectation(tree, x, {*subset, i})
+                                        - conditional_expectation(tree, x, set(subset)))
+    return phi / len(model.estimators_)
+
+
+def test_matches_brute_force_shapley_values(forest_and_rows):
+    model, rows = forest_and_rows
+    phi = TreeExplainer.from_model(model).shap_values(rows)
+    for x, contributions in zip(rows, phi):
+        np.testing.assert_allclose(contributions, brute_force_shapley(model, x), atol=1e-9)
+
+
+def test_contributions_sum_to_score_minus_expected_value(forest_and_rows):
+    model, rows = forest_and_rows
+    explainer = TreeExplainer.from_model(model)
+    np.testing.assert_allclose(explainer.shap_values(rows).sum(axis=1) + explainer.expected_value,
+                               model.predict_proba(rows)[:, 1], atol=1e-9)
+
+
+def test_direct_path_matches_pattern_tables(forest_and_rows, monkeypatch):
+    model, rows = forest_and_rows
+    with_tables = TreeExplainer.from_model(model).shap_values(rows)
+    monkeypatch.setattr(tree_explainer, "TABLE_MAX_BYTES", 0)
+    np.testing.assert_allclose(TreeExplainer.from_model(model).shap_values(rows), with_tables, atol=1e-12)
+
+
+def test_mapped_forest_explains_like_sklearn(forest_and_rows, tmp_path):
+    model, rows = forest_and_rows
+    path = save_mapped_model(str(tmp_path / "model.bin"), model)
+    mapped = TreeExplainer.from_model(load_mapped_model(path))
+    np.testing.assert_allclose(mapped.shap_values(rows), TreeExplainer.from_model(model).shap_values(rows),
+                               atol=1e-9)